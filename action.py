@@ -2,14 +2,28 @@ from __future__ import annotations
 """
 Grid actions.
 Should be used in replay and undo features.
+
+A PaintAction keeps its steps packed: arrays of x, y and layer numbers, two bytes
+each per step, with the layers themselves in a small table per action. PaintStep
+objects are only made when the steps are asked for.
 """
 
-from dataclasses import dataclass, field
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator
 from layer_util import Layer
-from grid import Grid
+
+# bytes of an array holding nothing
+_EMPTY_ARRAY = sys.getsizeof(array("H"))
+
+if TYPE_CHECKING:
+    # grid imports this module to build the actions of paint_stroke
+    from grid import Grid
 
 @dataclass
 class PaintStep:
+    __slots__ = ("affected_grid_square", "affected_layer")
 
     affected_grid_square: tuple[int, int]
     affected_layer: Layer
@@ -17,31 +31,115 @@ class PaintStep:
     def undo_apply(self, grid: Grid):
         sq = grid[self.affected_grid_square[0]][self.affected_grid_square[1]]
         sq.erase(self.affected_layer)
+        grid.mark_dirty(*self.affected_grid_square)
 
     def redo_apply(self, grid: Grid):
         sq = grid[self.affected_grid_square[0]][self.affected_grid_square[1]]
         sq.add(self.affected_layer)
+        grid.mark_dirty(*self.affected_grid_square)
 
 
-@dataclass
 class PaintAction:
+    """
+    The steps of one paint action, or a special.
+    - xs, ys: the square of each step, as unsigned 16 bit arrays (widened to 32 bits if a coordinate needs it)
+    - refs: for each step, the position of its layer in layers
+    - layers: every layer used by the action, once each
+    """
+    __slots__ = ("xs", "ys", "refs", "layers", "layer_refs", "is_special")
 
-    steps: list[PaintStep] = field(default_factory=list)
-    is_special: bool = False
+    def __init__(self, steps: list[PaintStep] | None = None, is_special: bool = False) -> None:
+        self.xs = array("H")
+        self.ys = array("H")
+        self.refs = array("H")
+        self.layers: list[Layer] = []
+        # id of each layer in layers -> its position there
+        self.layer_refs: dict[int, int] = {}
+        self.is_special = is_special
+        for step in steps or ():
+            self.add_step(step)
 
     def undo_apply(self, grid: Grid):
         if self.is_special:
             grid.special()
             return
-        for step in self.steps:
-            step.undo_apply(grid)
+        for x, y, layer in self.cells():
+            grid[x][y].erase(layer)
+            grid.mark_dirty(x, y)
 
     def redo_apply(self, grid: Grid):
         if self.is_special:
             grid.special()
             return
-        for step in self.steps:
-            step.redo_apply(grid)
+        for x, y, layer in self.cells():
+            grid[x][y].add(layer)
+            grid.mark_dirty(x, y)
 
     def add_step(self, step: PaintStep):
-        self.steps.append(step)
+        self.add_cell(step.affected_grid_square[0], step.affected_grid_square[1], step.affected_layer)
+
+    def add_cell(self, x: int, y: int, layer: Layer):
+        """Adds a step painting layer onto square (x, y), without making a PaintStep."""
+        ref = self.layer_refs.get(id(layer))
+        if ref is None:
+            ref = len(self.layers)
+            self.layers.append(layer)
+            self.layer_refs[id(layer)] = ref
+        try:
+            self.xs.append(x)
+            self.ys.append(y)
+        except OverflowError:
+            # a coordinate past 65535, so both arrays are widened
+            del self.xs[len(self.ys):]
+            self.xs = array("I", self.xs)
+            self.ys = array("I", self.ys)
+            self.xs.append(x)
+            self.ys.append(y)
+        self.refs.append(ref)
+
+    def extend(self, other: PaintAction):
+        """Adds the steps of other after this action's own, so both are undone and redone as one."""
+        for x, y, layer in other.cells():
+            self.add_cell(x, y, layer)
+
+    def nbytes(self) -> int:
+        """
+        Roughly the bytes held by this action: the object, its arrays and its layer table.
+        The layers themselves are shared with the rest of the program, and are not counted.
+        """
+        arrays = sum(_EMPTY_ARRAY + len(a) * a.itemsize for a in (self.xs, self.ys, self.refs))
+        return sys.getsizeof(self) + arrays + sys.getsizeof(self.layers) + sys.getsizeof(self.layer_refs)
+
+    def cells(self) -> Iterator[tuple[int, int, Layer]]:
+        """The (x, y, layer) of each step, in order."""
+        layers = self.layers
+        for x, y, ref in zip(self.xs, self.ys, self.refs):
+            yield x, y, layers[ref]
+
+    @property
+    def steps(self) -> list[PaintStep]:
+        """
+        The steps as PaintStep objects, in a new list made on each call.
+        Changing the list does not change the action: use add_step or add_cell, or assign steps.
+        Use cells to go through the steps without making a list.
+        """
+        return [PaintStep((x, y), layer) for x, y, layer in self.cells()]
+
+    @steps.setter
+    def steps(self, steps: list[PaintStep]) -> None:
+        """Replaces every step of the action."""
+        self.xs = array("H")
+        self.ys = array("H")
+        self.refs = array("H")
+        self.layers = []
+        self.layer_refs = {}
+        for step in steps:
+            self.add_step(step)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PaintAction):
+            return NotImplemented
+        return self.is_special == other.is_special and list(self.cells()) == list(other.cells())
+
+    def __repr__(self) -> str:
+        return f"PaintAction(steps={self.steps!r}, is_special={self.is_special!r})"
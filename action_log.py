@@ -0,0 +1,77 @@
+from __future__ import annotations
+"""
+Saved action logs.
+A painting is saved as the grid it was painted on plus the actions played on it,
+in the same (action, is_undo) form the ReplayTracker keeps.
+
+The file is JSON:
+    {
+        "draw_style": "ADD", "width": 32, "height": 32,
+        "layers": ["rainbow", "lighten", ...],
+        "actions": [
+            {"undo": false, "special": false, "steps": [[x, y, layer], ...]},
+            ...
+        ]
+    }
+Steps refer to a layer by its position in "layers", which names only the layers the log uses,
+so a log can be read whatever order the layers were registered in.
+The window saves one with Ctrl+S (see Painter.on_save).
+"""
+
+import json
+from typing import Iterable
+from action import PaintAction
+from grid import Grid
+from layer_util import get_layers
+
+def write_action_log(path, draw_style, width: int, height: int, entries: Iterable[tuple[PaintAction, bool]]) -> None:
+    """Save the actions played on a draw_style grid of the given size."""
+    names = {}
+    actions = [
+        {
+            "undo": is_undo,
+            "special": action.is_special,
+            "steps": [
+                [x, y, names.setdefault(layer.name, len(names))]
+                for x, y, layer in action.cells()
+            ],
+        }
+        for action, is_undo in entries
+    ]
+    log = {
+        "draw_style": draw_style,
+        "width": width,
+        "height": height,
+        "layers": list(names),
+        "actions": actions,
+    }
+    with open(path, "w") as f:
+        json.dump(log, f)
+
+def read_action_log(path) -> tuple[Grid, list[tuple[PaintAction, bool]]]:
+    """
+    Load a saved log.
+    Returns a new empty grid of the saved style and size, and the saved actions.
+    :raises KeyError: if the log uses a layer that is not registered.
+    """
+    with open(path) as f:
+        log = json.load(f)
+    registry = get_layers()
+    layers = [registry.named(name) for name in log["layers"]]
+    entries = []
+    for entry in log["actions"]:
+        action = PaintAction(is_special=entry["special"])
+        for x, y, ref in entry["steps"]:
+            action.add_cell(x, y, layers[ref])
+        entries.append((action, entry["undo"]))
+    return Grid(log["draw_style"], log["width"], log["height"]), entries
+
+def replay_action_log(path) -> Grid:
+    """Load a saved log and play every action, returning the painted grid."""
+    grid, entries = read_action_log(path)
+    for action, is_undo in entries:
+        if is_undo:
+            action.undo_apply(grid)
+        else:
+            action.redo_apply(grid)
+    return grid
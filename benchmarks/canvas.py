@@ -0,0 +1,65 @@
+"""
+Compare the canvas modes in canvas.py.
+
+Times a frame of each canvas at several grid sizes, both when nothing
+changed since the last frame (idle) and when every square changes colour
+(a grid covered in rainbow).
+
+    python -m benchmarks.canvas [--headless] [--frames N]
+"""
+import argparse
+import time
+
+import pyglet
+
+def bench(canvas_cls, size: int, frames: int, window) -> tuple[float, float]:
+    from grid import Grid
+    from layers import rainbow, lighten, black
+
+    square = 700 / size
+    canvas = canvas_cls(size, size, square, square)
+    grid = Grid(Grid.DRAW_STYLE_SET, size, size)
+    for i in range(0, size, 3):
+        grid.grid_paint(black if i % 2 else lighten, i, (i * 7) % size, 2)
+    background = (255, 255, 255)
+
+    def frame(timestamp):
+        window.clear()
+        canvas.draw_grid(grid, timestamp, background)
+        window.ctx.finish()
+
+    frame(0)
+    start = time.perf_counter()
+    for _ in range(frames):
+        frame(0)
+    idle = (time.perf_counter() - start) / frames
+
+    for x in range(size):
+        for y in range(size):
+            grid[x][y].add(rainbow)
+            grid.mark_dirty(x, y)
+    frame(0)
+    start = time.perf_counter()
+    for i in range(frames):
+        frame(i + 1)
+    animated = (time.perf_counter() - start) / frames
+    return idle, animated
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--headless", help="Render without a display (EGL).", action="store_true")
+    p.add_argument("--frames", help="Frames timed per measurement.", type=int, default=5)
+    p.add_argument("--sizes", help="Grid sizes to time.", type=int, nargs="+", default=[32, 128, 512])
+    args = p.parse_args()
+    if args.headless:
+        pyglet.options["headless"] = True
+
+    import arcade
+    from canvas import CANVAS_MODES
+
+    window = arcade.Window(800, 700, "Canvas benchmark", visible=False)
+    print(f"{'size':>6} {'mode':>8} {'idle ms':>10} {'animated ms':>12}")
+    for size in args.sizes:
+        for mode, canvas_cls in CANVAS_MODES.items():
+            idle, animated = bench(canvas_cls, size, args.frames, window)
+            print(f"{size:>6} {mode:>8} {idle * 1000:>10.2f} {animated * 1000:>12.2f}")
@@ -0,0 +1,56 @@
+"""
+Time evaluating long stacks of lighten, darken and invert layers, fused and unfused.
+
+For each stack depth, builds a random stack and times
+- folding apply over every layer, as get_color did before chains were compiled,
+- applying the compiled chain,
+for one colour, and for a (3, n) array of colours with apply_array.
+
+    python -m benchmarks.fusion [--depths N ...] [--squares N]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from chain_compiler import fuse
+from layers import darken, invert, lighten
+
+def per_call(run, repeat: int) -> float:
+    """Seconds per call of run."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - start) / repeat
+
+def fold(chain, color, xs, ys):
+    for layer in chain:
+        color = layer.apply(color, 0, xs, ys)
+    return color
+
+def fold_array(chain, color, xs, ys):
+    for layer in chain:
+        color = layer.apply_array(color, 0, xs, ys)
+    return color
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--depths", help="Stack depths to time.", type=int, nargs="+", default=[10, 100, 1000])
+    p.add_argument("--squares", help="Colours in the array form.", type=int, default=10000)
+    args = p.parse_args()
+
+    rng = random.Random(0)
+    colors = np.array([[rng.randrange(256) for _ in range(args.squares)] for _ in range(3)], dtype=np.int64)
+    xs = np.arange(args.squares)
+    ys = np.zeros(args.squares, dtype=np.int64)
+    print(f"{'depth':>8}{'steps':>8}{'fold (us)':>12}{'fused (us)':>12}{'fold array (ms)':>18}{'fused array (ms)':>18}")
+    for depth in args.depths:
+        chain = [rng.choice([lighten, darken, invert]) for _ in range(depth)]
+        compiled = fuse(chain)
+        unfused = per_call(lambda: fold(chain, (20, 130, 250), 0, 0), 200)
+        fused = per_call(lambda: compiled.apply((20, 130, 250), 0, 0, 0), 200)
+        unfused_array = per_call(lambda: fold_array(chain, colors, xs, ys), 5)
+        fused_array = per_call(lambda: compiled.apply_array(colors, 0, xs, ys), 5)
+        print(f"{depth:>8}{len(compiled):>8}{unfused * 1e6:>12.1f}{fused * 1e6:>12.1f}"
+              f"{unfused_array * 1e3:>18.2f}{fused_array * 1e3:>18.2f}")
@@ -0,0 +1,59 @@
+"""
+Time applying chains of lighten, darken and invert to many colours, with lookup tables
+against the layers' Python functions.
+
+For each chain length, builds a random chain and times
+- applying each layer's scalar function (a generator expression per colour) to every colour,
+- composing the layers' LUTs by indexing, one table per layer,
+- looking every colour up in the composed table.
+
+    python -m benchmarks.lut [--lengths N ...] [--colours N]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from chain_compiler import CHANNELS
+from layers import darken, invert, lighten
+
+def seconds(run, repeat: int) -> float:
+    """Seconds per call of run."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - start) / repeat
+
+def scalar(chain, colours):
+    result = []
+    for colour in colours:
+        for layer in chain:
+            colour = layer.apply(colour, 0, 0, 0)
+        result.append(colour)
+    return result
+
+def compose(chain) -> np.ndarray:
+    lut = chain[0].lut
+    for layer in chain[1:]:
+        lut = layer.lut[CHANNELS, lut]
+    return lut
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--lengths", help="Chain lengths to time.", type=int, nargs="+", default=[1, 10, 100])
+    p.add_argument("--colours", help="Colours to apply each chain to.", type=int, default=10000)
+    args = p.parse_args()
+
+    rng = random.Random(0)
+    planes = np.array([[rng.randrange(256) for _ in range(args.colours)] for _ in range(3)], dtype=np.int64)
+    colours = [tuple(colour) for colour in planes.T.tolist()]
+    print(f"{'length':>8}{'python (ms)':>14}{'compose (us)':>15}{'lookup (ms)':>14}")
+    for length in args.lengths:
+        chain = [rng.choice([lighten, darken, invert]) for _ in range(length)]
+        lut = compose(chain)
+        assert [tuple(colour) for colour in lut[CHANNELS, planes].T.tolist()] == scalar(chain, colours)
+        python = seconds(lambda: scalar(chain, colours), 1)
+        composing = seconds(lambda: compose(chain), 100)
+        lookup = seconds(lambda: lut[CHANNELS, planes], 100)
+        print(f"{length:>8}{python * 1e3:>14.2f}{composing * 1e6:>15.1f}{lookup * 1e3:>14.3f}")
@@ -0,0 +1,61 @@
+"""
+Time SequenceLayerStore.special with large synthetic layer registries.
+
+For each registry size, registers synthetic layers until the registry
+has that many, then fills a store with half of the registered layers (at most MAX_LAYERS)
+and times special (remove the median name) until the store is empty,
+against sorting the applying layers by name each time.
+
+    python -m benchmarks.median [--sizes N ...]
+"""
+import argparse
+import random
+import time
+
+import layer_store
+from layer_util import Layer, get_layers, register
+
+def grow_registry(size: int, rng: random.Random) -> list[Layer]:
+    """Registers synthetic layers with random names until size layers are registered."""
+    registry = get_layers()
+    while len(registry) < size:
+        def apply(color, timestamp, x, y):
+            return color
+        apply.__name__ = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(8)) + str(len(registry))
+        register(apply)
+    return list(registry)
+
+def time_special(layers: list[Layer]) -> float:
+    """Seconds per special, removing every layer from a store."""
+    store = layer_store.SequenceLayerStore()
+    for layer in layers:
+        store.add(layer)
+    start = time.perf_counter()
+    for _ in layers:
+        store.special()
+    return (time.perf_counter() - start) / len(layers)
+
+def time_sorting(layers: list[Layer]) -> float:
+    """Seconds per median removal when the applying layers are sorted by name each time."""
+    store = layer_store.SequenceLayerStore()
+    for layer in layers:
+        store.add(layer)
+    start = time.perf_counter()
+    for _ in layers:
+        by_name = sorted(store.layers_by_index(), key=lambda layer: layer.name)
+        store.erase(by_name[(len(by_name) - 1) // 2])
+    return (time.perf_counter() - start) / len(layers)
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--sizes", help="Registry sizes to time.", type=int, nargs="+", default=[100, 1000, 5000])
+    args = p.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'registry':>10}{'applying':>10}{'special (us)':>15}{'sorting (us)':>15}")
+    for size in args.sizes:
+        registered = grow_registry(size, rng)
+        applying = rng.sample(registered, min(size // 2, layer_store.LayerStore.MAX_LAYERS))
+        special = time_special(applying)
+        sorting = time_sorting(applying)
+        print(f"{size:>10}{len(applying):>10}{special * 1e6:>15.1f}{sorting * 1e6:>15.1f}")
@@ -0,0 +1,106 @@
+"""
+Measure memory used per grid square for each draw style.
+
+Reports the bytes allocated per square (traced with tracemalloc) for
+- a single LayerStore, empty and holding a few layers,
+- a whole grid of stores and a compact grid, with every square painted.
+
+Also reports the bytes per step of the PaintActions recording a painting
+of brush strokes, against keeping each step as a list entry holding a
+PaintStep object without __slots__, as actions used to.
+
+    python -m benchmarks.memory [--size N] [--layers K]
+"""
+import argparse
+import gc
+import tracemalloc
+
+def measure(build) -> tuple[int, object]:
+    """Bytes allocated by build(), and what it built (kept alive while measuring)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, built
+
+def stores(draw_style, count: int, layers) -> list:
+    from lazy_grid import STORE_TYPES
+    result = [STORE_TYPES[draw_style]() for _ in range(count)]
+    for store in result:
+        for layer in layers:
+            store.add(layer)
+    return result
+
+def painted_grid(draw_style, size: int, layers, compact: bool):
+    from grid import Grid
+    grid = Grid(draw_style, size, size, compact=compact)
+    for x in range(size):
+        for y in range(size):
+            for layer in layers:
+                grid[x][y].add(layer)
+    return grid
+
+def paint_actions(size: int, strokes: int, layers):
+    """One PaintAction per brush stroke of size 2 across a size x size grid, as on_paint records them."""
+    from action import PaintAction
+    from grid import Grid
+    actions = []
+    for i in range(strokes):
+        action = PaintAction()
+        x, y = (i * 7) % size, (i * 13) % size
+        for dx, dy in Grid.BRUSH_STAMPS[2]:
+            if 0 <= x + dx < size and 0 <= y + dy < size:
+                action.add_cell(x + dx, y + dy, layers[i % len(layers)])
+        actions.append(action)
+    return actions
+
+def unpacked_actions(size: int, strokes: int, layers):
+    """The same steps as paint_actions, each a PaintStep-like dataclass object in a list."""
+    from dataclasses import dataclass
+    from grid import Grid
+
+    @dataclass
+    class UnslottedStep:
+        affected_grid_square: tuple
+        affected_layer: object
+
+    actions = []
+    for i in range(strokes):
+        x, y = (i * 7) % size, (i * 13) % size
+        actions.append([
+            UnslottedStep((x + dx, y + dy), layers[i % len(layers)])
+            for dx, dy in Grid.BRUSH_STAMPS[2]
+            if 0 <= x + dx < size and 0 <= y + dy < size
+        ])
+    return actions
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--size", help="Width and height of the grids measured.", type=int, default=64)
+    p.add_argument("--layers", help="Layers added to each painted square.", type=int, default=3)
+    p.add_argument("--strokes", help="Brush strokes recorded as actions.", type=int, default=10000)
+    args = p.parse_args()
+
+    from grid import Grid
+    from layer_util import get_layers
+
+    layers = list(get_layers())[:args.layers]
+    cells = args.size * args.size
+    print(f"bytes per square, {args.size}x{args.size} squares, {len(layers)} layers when painted")
+    print(f"{'style':<10}{'empty store':>14}{'painted store':>16}{'grid':>10}{'compact grid':>15}")
+    for draw_style in (Grid.DRAW_STYLE_SET, Grid.DRAW_STYLE_ADD, Grid.DRAW_STYLE_SEQUENCE):
+        empty, _ = measure(lambda: stores(draw_style, cells, []))
+        painted, _ = measure(lambda: stores(draw_style, cells, layers))
+        grid, _ = measure(lambda: painted_grid(draw_style, args.size, layers, False))
+        compact, _ = measure(lambda: painted_grid(draw_style, args.size, layers, True))
+        print(f"{draw_style:<10}{empty / cells:>14.0f}{painted / cells:>16.0f}{grid / cells:>10.0f}{compact / cells:>15.0f}")
+
+    packed, actions = measure(lambda: paint_actions(args.size, args.strokes, layers))
+    steps = sum(len(action.refs) for action in actions)
+    unpacked, _ = measure(lambda: unpacked_actions(args.size, args.strokes, layers))
+    print()
+    print(f"bytes per step, {args.strokes} strokes of {steps // args.strokes} steps")
+    print(f"{'packed':>10}{'objects':>10}")
+    print(f"{packed / steps:>10.1f}{unpacked / steps:>10.1f}")
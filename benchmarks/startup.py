@@ -0,0 +1,56 @@
+"""
+Measure how long the entry points take to import.
+
+Runs `python -X importtime` in a fresh interpreter for
+- logic: the painting logic (grid, stores, undo, replay) with no GUI,
+- headless: the headless renderer,
+- gui: main.py, which brings in arcade and pyglet,
+and reports the total import time and the packages that took longest to import.
+
+    python -m benchmarks.startup [--runs N] [--top N]
+"""
+import argparse
+import subprocess
+import sys
+
+ENTRY_POINTS = {
+    "logic": "import painter, grid, layer_store, undo, replay, action",
+    "headless": "import headless_render, action_log",
+    "gui": "import main",
+}
+
+def import_times(code: str) -> tuple[int, dict[str, int]]:
+    """
+    Total import time of code in microseconds, and the cumulative import time
+    of each package (module without a dot in its name) it imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    total = 0
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        if not name.startswith("  "):
+            total += int(cumulative)
+        name = name.strip()
+        if "." not in name:
+            times[name] = max(times.get(name, 0), int(cumulative))
+    return total, times
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--runs", help="Imports timed per entry point; the fastest is kept.", type=int, default=3)
+    p.add_argument("--top", help="Slowest packages listed per entry point.", type=int, default=6)
+    args = p.parse_args()
+
+    for entry, code in ENTRY_POINTS.items():
+        total, times = min((import_times(code) for _ in range(args.runs)), key=lambda run: run[0])
+        print(f"{entry:<10}{total / 1000:>8.1f} ms   {code}")
+        for name, micros in sorted(times.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"{'':<10}{micros / 1000:>8.1f} ms     {name}")
@@ -0,0 +1,59 @@
+"""
+Count and time the grid positions generated for mouse drags.
+
+Generates random mouse segments of a few lengths over the window's 700 pixel
+drawing panel and reports, per pixel of mouse travel, the positions generated by
+- sampling every half pixel, as MyWindow.try_draw used to,
+- rasteriser.segment_cells, which gives each square once,
+and the time each takes per segment.
+
+    python -m benchmarks.stroke [--lengths N ...] [--segments N] [--grid N]
+"""
+import argparse
+import math
+import random
+import time
+
+from rasteriser import segment_cells
+
+def sampled(start, end, width, height) -> list[tuple[int, int]]:
+    """The positions try_draw generated before, one per half pixel sample."""
+    mhat_dist = abs(end[0] - start[0]) + abs(end[1] - start[1])
+    points = []
+    for d in range(1, math.ceil(mhat_dist / 0.5) + 1):
+        distance = min(d * 0.5 / mhat_dist, 1)
+        nx = distance * (end[0] - start[0]) + start[0]
+        ny = distance * (end[1] - start[1]) + start[1]
+        points.append((int(nx // width), int(ny // height)))
+    return points
+
+def measure(generate, segments, width, height) -> tuple[int, float]:
+    """Positions generated over all segments, and seconds per segment."""
+    count = 0
+    start = time.perf_counter()
+    for a, b in segments:
+        count += len(list(generate(a, b, width, height)))
+    return count, (time.perf_counter() - start) / len(segments)
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--lengths", help="Mouse travel per segment, in pixels.", type=int, nargs="+", default=[5, 50, 500])
+    p.add_argument("--segments", help="Segments per length.", type=int, default=500)
+    p.add_argument("--grid", help="Squares across the 700 pixel panel.", type=int, default=32)
+    args = p.parse_args()
+
+    rng = random.Random(0)
+    size = 700 / args.grid
+    print(f"{'length':>8}{'sampled /px':>13}{'cells /px':>11}{'sampled (us)':>14}{'cells (us)':>12}")
+    for length in args.lengths:
+        segments = []
+        travel = 0
+        for _ in range(args.segments):
+            start = (rng.randrange(700), rng.randrange(700))
+            along = rng.randint(0, length)
+            end = (start[0] + rng.choice([-1, 1]) * along, start[1] + rng.choice([-1, 1]) * (length - along))
+            segments.append((start, end))
+            travel += length
+        old_count, old_time = measure(sampled, segments, size, size)
+        new_count, new_time = measure(segment_cells, segments, size, size)
+        print(f"{length:>8}{old_count / travel:>13.3f}{new_count / travel:>11.3f}{old_time * 1e6:>14.1f}{new_time * 1e6:>12.1f}")
@@ -0,0 +1,169 @@
+"""
+Ways of getting the grid onto the screen.
+
+Every canvas draws the frame kept by Grid.refresh_frame, and is only told
+about the squares that changed since the last draw.
+
+- rects: one draw_lrtb_rectangle_filled per square, every frame.
+- shape: one buffered shape, rebuilt whenever any square changes.
+- sprites: one solid sprite per square, with changed squares recoloured in place.
+- texture: one texture with a texel per square, stretched over the panel.
+  Changed squares are re-uploaded as a single sub-rectangle.
+"""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import math
+
+import arcade
+import numpy as np
+
+from grid import Grid
+
+
+class Canvas(ABC):
+
+    def __init__(self, grid_x: int, grid_y: int, square_width: float, square_height: float) -> None:
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.square_width = square_width
+        self.square_height = square_height
+
+    def draw_grid(self, grid: Grid, timestamp, start) -> None:
+        """Bring the canvas up to date with the grid, then draw it."""
+        squares = grid.refresh_frame(timestamp, start)
+        if squares:
+            self.update(grid.frame, squares)
+        self.draw()
+
+    @abstractmethod
+    def update(self, frame: np.ndarray, squares: list[tuple[int, int]]) -> None:
+        """Take the new colours of the given squares from frame."""
+        pass
+
+    @abstractmethod
+    def draw(self) -> None:
+        """Draw the canvas as of the last update."""
+        pass
+
+
+class RectCanvas(Canvas):
+    """Immediate mode, one draw call per square."""
+
+    def __init__(self, grid_x: int, grid_y: int, square_width: float, square_height: float) -> None:
+        super().__init__(grid_x, grid_y, square_width, square_height)
+        self.colors = None
+
+    def update(self, frame: np.ndarray, squares: list[tuple[int, int]]) -> None:
+        self.colors = frame.tolist()
+
+    def draw(self) -> None:
+        for x in range(self.grid_x):
+            for y in range(self.grid_y):
+                arcade.draw_lrtb_rectangle_filled(
+                    self.square_width * x,
+                    self.square_width * (x+1),
+                    self.square_height * (y+1),
+                    self.square_height * y,
+                    self.colors[y][x],
+                )
+
+
+class ShapeCanvas(Canvas):
+    """One buffered shape holding a quad per square."""
+
+    def __init__(self, grid_x: int, grid_y: int, square_width: float, square_height: float) -> None:
+        super().__init__(grid_x, grid_y, square_width, square_height)
+        self.points = []
+        for x in range(self.grid_x):
+            for y in range(self.grid_y):
+                left = self.square_width * x
+                right = self.square_width * (x+1)
+                top = self.square_height * (y+1)
+                bottom = self.square_height * y
+                self.points += [(left, top), (right, top), (right, bottom), (left, bottom)]
+        self.shape = None
+
+    def update(self, frame: np.ndarray, squares: list[tuple[int, int]]) -> None:
+        colors = frame.tolist()
+        point_colors = []
+        for x in range(self.grid_x):
+            for y in range(self.grid_y):
+                point_colors += [colors[y][x]] * 4
+        self.shape = arcade.create_rectangles_filled_with_colors(self.points, point_colors)
+
+    def draw(self) -> None:
+        self.shape.draw()
+
+
+class SpriteCanvas(Canvas):
+    """A white sprite per square, tinted with the square's colour."""
+
+    def __init__(self, grid_x: int, grid_y: int, square_width: float, square_height: float) -> None:
+        super().__init__(grid_x, grid_y, square_width, square_height)
+        self.sprites = arcade.SpriteList(use_spatial_hash=False)
+        self.squares = []
+        for x in range(self.grid_x):
+            column = []
+            for y in range(self.grid_y):
+                sprite = arcade.SpriteSolidColor(
+                    math.ceil(self.square_width), math.ceil(self.square_height), (255, 255, 255),
+                )
+                sprite.width = self.square_width
+                sprite.height = self.square_height
+                sprite.center_x = self.square_width * (x + 0.5)
+                sprite.center_y = self.square_height * (y + 0.5)
+                self.sprites.append(sprite)
+                column.append(sprite)
+            self.squares.append(column)
+
+    def update(self, frame: np.ndarray, squares: list[tuple[int, int]]) -> None:
+        for x, y in squares:
+            self.squares[x][y].color = tuple(frame[y, x].tolist())
+
+    def draw(self) -> None:
+        self.sprites.draw()
+
+
+class TextureCanvas(Canvas):
+    """A texture with one texel per square, drawn with nearest filtering as a single quad."""
+
+    def __init__(self, grid_x: int, grid_y: int, square_width: float, square_height: float) -> None:
+        super().__init__(grid_x, grid_y, square_width, square_height)
+        ctx = arcade.get_window().ctx
+        self.texture = ctx.texture(
+            (self.grid_x, self.grid_y), components=3, filter=(ctx.NEAREST, ctx.NEAREST),
+        )
+        self.program = ctx.load_program(
+            vertex_shader=":resources:shaders/texture_default_projection_vs.glsl",
+            fragment_shader=":resources:shaders/texture_fs.glsl",
+        )
+        # The default projection shader takes normalised device coordinates.
+        screen_width, screen_height = ctx.viewport[2], ctx.viewport[3]
+        self.quad = arcade.gl.geometry.screen_rectangle(
+            -1, -1,
+            2 * self.square_width * self.grid_x / screen_width,
+            2 * self.square_height * self.grid_y / screen_height,
+        )
+
+    def update(self, frame: np.ndarray, squares: list[tuple[int, int]]) -> None:
+        # Row 0 of both the frame and the texture is the bottom of the grid.
+        xs = [x for x, _ in squares]
+        ys = [y for _, y in squares]
+        left, right = min(xs), max(xs) + 1
+        bottom, top = min(ys), max(ys) + 1
+        self.texture.write(
+            np.ascontiguousarray(frame[bottom:top, left:right]).tobytes(),
+            viewport=(left, bottom, right - left, top - bottom),
+        )
+
+    def draw(self) -> None:
+        self.texture.use(0)
+        self.quad.render(self.program)
+
+
+CANVAS_MODES = {
+    "rects": RectCanvas,
+    "shape": ShapeCanvas,
+    "sprites": SpriteCanvas,
+    "texture": TextureCanvas,
+}
@@ -0,0 +1,215 @@
+from __future__ import annotations
+"""
+Fusing layer chains.
+
+Some layers change each channel on its own, as c -> min(hi, max(lo, a*c + b))
+with a in (-1, 0, 1): lighten and darken are saturating adds, invert is 255 - c
+and solid colours (a = 0) ignore the input. Layers declare this with the
+`channel_map` decorator in layer_util.
+
+Two such maps in a row compose into one map of the same form, so a run of
+algebraic layers of any length is evaluated as one ChannelMap. Other layers
+that map each channel on its own (`per_channel`) are composed as 256 entry
+lookup tables instead (ChannelLUT). Other layers stay as opaque steps, and
+everything before the last constant output layer is dropped. compile_chain
+caches the result for each distinct chain.
+
+The array forms look channel values up in a table, so they expect values in
+0..255, which is what every layer gives.
+"""
+
+from typing import Iterable
+import numpy as np
+from layer_util import Layer
+
+INF = float("inf")
+
+# Bounds used in place of +-infinity in the array form, where bounds must be integers.
+ARRAY_LOW = -(1 << 40)
+ARRAY_HIGH = 1 << 40
+
+# Row index of each channel, to look (3, n) channel planes up in a (3, 256) table.
+CHANNELS = np.arange(3).reshape(3, 1)
+
+class ChannelMap:
+    """
+    For each channel, c -> min(hi, max(lo, a*c + b)), with a in (-1, 0, 1) and lo <= hi.
+    Unbounded sides are +-infinity.
+    """
+
+    def __init__(self, channels) -> None:
+        """
+        channels is one (a, b, lo, hi) per channel, with None for an unbounded lo or hi.
+        complexity- O(1)
+        """
+        self.channels = tuple(
+            self.normalise(a, b, -INF if lo is None else lo, INF if hi is None else hi)
+            for a, b, lo, hi in channels
+        )
+        self.constant_output = all(a == 0 for a, _, _, _ in self.channels)
+        self.color_dependent = not self.constant_output
+        self.time_varying = False
+        self.position_varying = False
+        arrays = np.array([
+            (a, b, max(lo, ARRAY_LOW), min(hi, ARRAY_HIGH)) for a, b, lo, hi in self.channels
+        ], dtype=np.int64)
+        self.a, self.b, self.lo, self.hi = (arrays[:, i].reshape(3, 1) for i in range(4))
+        # (3, 256) table of the map, used by apply_array
+        self.lut = np.clip(self.a * np.arange(256, dtype=np.int64) + self.b, self.lo, self.hi)
+
+    @staticmethod
+    def normalise(a, b, lo, hi) -> tuple:
+        """Writes a map that ignores its input as (0, value, -inf, inf)."""
+        if a == 0:
+            return (0, min(hi, max(lo, b)), -INF, INF)
+        return (a, b, lo, hi)
+
+    def then(self, other: ChannelMap | ChannelLUT) -> ChannelMap | ChannelLUT:
+        """
+        The map applying self and then other.
+        complexity- O(1)
+        """
+        if isinstance(other, ChannelLUT):
+            return ChannelLUT(self.lut).then(other)
+        channels = []
+        for (a1, b1, l1, h1), (a2, b2, l2, h2) in zip(self.channels, other.channels):
+            # a2 * clamp(a1*c + b1, l1, h1) + b2, as one clamp
+            if a2 == 1:
+                a, b, lo, hi = a1, b1 + b2, l1 + b2, h1 + b2
+            elif a2 == -1:
+                a, b, lo, hi = -a1, b2 - b1, b2 - h1, b2 - l1
+            else:
+                a, b, lo, hi = 0, b2, -INF, INF
+            # then clamped again to [l2, h2]
+            if hi < l2:
+                a, b, lo, hi = 0, l2, -INF, INF
+            elif lo > h2:
+                a, b, lo, hi = 0, h2, -INF, INF
+            else:
+                lo, hi = max(lo, l2), min(hi, h2)
+            channels.append((a, b, lo, hi))
+        return ChannelMap(channels)
+
+    def apply(self, color, timestamp, x, y) -> tuple[int, int, int]:
+        """Same signature as a layer's apply."""
+        return tuple(
+            min(hi, max(lo, a*c + b))
+            for c, (a, b, lo, hi) in zip(color, self.channels)
+        )
+
+    def apply_array(self, color: np.ndarray, timestamp, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Same as Layer.apply_array, by table lookup, which is faster than clipping."""
+        return self.lut[CHANNELS, color]
+
+
+class ChannelLUT:
+    """
+    For each channel, c -> lut[channel][c], for a (3, 256) table of values in 0..255.
+    """
+
+    def __init__(self, lut: np.ndarray) -> None:
+        """
+        complexity- O(1)
+        """
+        self.lut = lut
+        self.constant_output = bool((lut == lut[:, :1]).all())
+        self.color_dependent = not self.constant_output
+        self.time_varying = False
+        self.position_varying = False
+
+    def then(self, other: ChannelMap | ChannelLUT) -> ChannelLUT:
+        """
+        The table applying self and then other, other's table indexed by self's.
+        complexity- O(1), 3*256 lookups
+        """
+        return ChannelLUT(other.lut[CHANNELS, self.lut])
+
+    def apply(self, color, timestamp, x, y) -> tuple[int, int, int]:
+        """Same signature as a layer's apply."""
+        return tuple(int(row[c]) for row, c in zip(self.lut, color))
+
+    def apply_array(self, color: np.ndarray, timestamp, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Same as Layer.apply_array."""
+        return self.lut[CHANNELS, color]
+
+
+class CompiledChain:
+    """
+    A layer chain as a few steps: ChannelMaps for runs of algebraic layers,
+    ChannelLUTs for runs of per channel layers, and the other layers, applied in order.
+    Also says what the chain's colour depends on.
+    """
+
+    def __init__(self, steps: list) -> None:
+        self.steps = tuple(steps)
+        self.time_varying = any(step.time_varying for step in self.steps)
+        self.position_varying = any(step.position_varying for step in self.steps)
+        self.color_dependent = not self.steps or self.steps[0].color_dependent
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def apply(self, color, timestamp, x, y) -> tuple[int, int, int]:
+        """
+        The colour the chain gives for the start colour `color`.
+        complexity- O(s*apply) where s is the number of steps
+        """
+        for step in self.steps:
+            color = step.apply(color, timestamp, x, y)
+        return color
+
+    def apply_array(self, color: np.ndarray, timestamp, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Same as apply, for (3, n) channel planes as in Layer.apply_array.
+        complexity- O(s*apply_array) where s is the number of steps
+        """
+        for step in self.steps:
+            color = step.apply_array(color, timestamp, x, y)
+        return color
+
+
+# Steps that map each channel on its own, so two in a row compose into one.
+PER_CHANNEL = (ChannelMap, ChannelLUT)
+
+def fuse(chain: Iterable[Layer]) -> CompiledChain:
+    """
+    Compile a chain without the cache.
+    complexity- O(n) where n is the length of the chain
+    """
+    steps = []
+    for layer in chain:
+        if layer.channel_map is not None:
+            step = ChannelMap(layer.channel_map)
+        elif layer.lut is not None:
+            step = ChannelLUT(layer.lut)
+        else:
+            step = layer
+        if step.constant_output:
+            steps = [step]
+        elif isinstance(step, PER_CHANNEL) and steps and isinstance(steps[-1], PER_CHANNEL):
+            steps[-1] = steps[-1].then(step)
+            if steps[-1].constant_output:
+                steps = [steps[-1]]
+        else:
+            steps.append(step)
+    return CompiledChain(steps)
+
+# Compiled chains, keyed on the identities of the layers in the chain.
+# Each entry keeps its chain alive, so those identities cannot be reused while it is cached.
+MAX_CACHED_CHAINS = 4096
+_compiled: dict[tuple[int, ...], tuple[tuple[Layer, ...], CompiledChain]] = {}
+
+def compile_chain(chain) -> CompiledChain:
+    """
+    The CompiledChain for a chain of layers, compiled once for each distinct chain.
+    complexity- O(n) where n is the length of the chain, to look it up
+    """
+    chain = tuple(chain)
+    key = tuple(map(id, chain))
+    entry = _compiled.get(key)
+    if entry is None:
+        if len(_compiled) >= MAX_CACHED_CHAINS:
+            _compiled.clear()
+        entry = (chain, fuse(chain))
+        _compiled[key] = entry
+    return entry[1]
@@ -0,0 +1,368 @@
+from __future__ import annotations
+"""
+Structure-of-arrays storage for a Grid.
+
+Instead of one LayerStore object per square, a compact grid keeps
+- SET: an int16 array of layer indices (-1 for no layer) and a boolean array of special flags.
+- ADD / SEQUENCE: int32 arrays of nodes of a LayerStackPool, where every distinct
+  stack of layer indices is stored once, as its parent stack plus one layer.
+  Adding a layer on top moves a square to a child node in O(1).
+  An ADD square holds two stacks, its layers being the base stack read top down and then the
+  top stack, so layers are added to the top and erased from the base each in O(1).
+
+Nodes are reference counted, by the squares and by the child nodes holding them,
+and are freed as soon as nothing holds them, so the pool only holds stacks still in use.
+
+Grid wide specials are O(1) for SET and ADD: for SET special_parity says whether an odd
+number of them happened, and special flags are xor-ed with it when read. Reversing every
+ADD square swaps its base and top stacks, so the two arrays are swapped.
+
+grid[x][y] gives a view object with the LayerStore methods, reading and writing the arrays,
+and behaving the same as the SetLayerStore, AdditiveLayerStore or SequenceLayerStore
+it stands in for.
+"""
+
+import numpy as np
+from layer_store import LayerStore
+from layer_util import Layer, LAYERS
+from layers import invert
+from chain_compiler import compile_chain
+
+class LayerStackPool:
+    """
+    Hash-consed stacks of layer indices.
+    Each distinct stack is one node, its parent stack plus one layer index on top,
+    so a stack shares its nodes with every stack it extends.
+    Node 0 is always the empty stack.
+    Each node counts what holds it: the squares given it with acquire, and its children.
+    When release drops a count to zero the node is freed, its number is reused, and its
+    parent loses a holder in turn.
+    """
+
+    def __init__(self) -> None:
+        """
+        complexity- O(1)
+        """
+        self.parents = [-1]
+        self.tops = [-1]
+        self.depths = [0]
+        self.refs = [0]
+        # numbers of freed nodes, reused before new ones
+        self.free = []
+        # (parent, layer index) -> node, so each stack is made once
+        self.children = {}
+
+    def push(self, node: int, index: int) -> int:
+        """
+        The node for stack node with index put on top, made the first time it is seen.
+        A new node is held by nothing until it is acquired.
+        complexity- O(1)
+        """
+        child = self.children.get((node, index))
+        if child is None:
+            if self.free:
+                child = self.free.pop()
+                self.parents[child] = node
+                self.tops[child] = index
+                self.depths[child] = self.depths[node] + 1
+                self.refs[child] = 0
+            else:
+                child = len(self.parents)
+                self.parents.append(node)
+                self.tops.append(index)
+                self.depths.append(self.depths[node] + 1)
+                self.refs.append(0)
+            self.refs[node] += 1
+            self.children[(node, index)] = child
+        return child
+
+    def intern(self, stack) -> int:
+        """
+        Returns the node of the stack, bottom first, making the nodes it needs the first time they are seen.
+        complexity- O(n) where n is the length of the stack
+        """
+        node = 0
+        for index in stack:
+            node = self.push(node, index)
+        return node
+
+    def acquire(self, node: int) -> None:
+        """
+        Record one more holder of node.
+        complexity- O(1)
+        """
+        self.refs[node] += 1
+
+    def release(self, node: int) -> None:
+        """
+        Record one less holder of node, freeing it and then any parents nothing else holds.
+        complexity- O(1) amortised, as each node is freed once for each time it was made
+        """
+        self.refs[node] -= 1
+        while node != 0 and self.refs[node] == 0:
+            parent = self.parents[node]
+            del self.children[(parent, self.tops[node])]
+            self.free.append(node)
+            self.refs[parent] -= 1
+            node = parent
+
+    def depth(self, node: int) -> int:
+        """
+        The number of layers in the stack.
+        complexity- O(1)
+        """
+        return self.depths[node]
+
+    def __getitem__(self, node: int) -> tuple[int, ...]:
+        """
+        The stack as a tuple of layer indices, bottom first.
+        complexity- O(n) where n is the length of the stack
+        """
+        indices = []
+        while node != 0:
+            indices.append(self.tops[node])
+            node = self.parents[node]
+        return tuple(reversed(indices))
+
+    def __len__(self) -> int:
+        """The number of nodes in use, counting the empty stack."""
+        return len(self.parents) - len(self.free)
+
+
+class CompactColumn:
+    """One column of a compact grid, so that grid[x][y] works as it does for a grid of stores."""
+
+    def __init__(self, storage: CompactStorage, x: int) -> None:
+        self.storage = storage
+        self.x = x
+
+    def __len__(self) -> int:
+        return self.storage.height
+
+    def __getitem__(self, y: int) -> LayerStore:
+        if not 0 <= y < self.storage.height:
+            raise IndexError(y)
+        return self.storage.view(self.x, y)
+
+
+class CompactStorage:
+    """
+    The arrays behind a compact grid.
+    complexity- O(x*y) to allocate the arrays, with no Python object per square
+    """
+    MAX_LAYERS = LayerStore.MAX_LAYERS
+
+    def __init__(self, draw_style, width: int, height: int) -> None:
+        self.draw_style = draw_style
+        self.width = width
+        self.height = height
+        # odd number of grid wide specials, for SET
+        self.special_parity = False
+        if draw_style == "SET":
+            self.layer_ids = np.full((width, height), -1, dtype=np.int16)
+            self.special_flags = np.zeros((width, height), dtype=bool)
+        else:
+            self.stack_ids = np.zeros((width, height), dtype=np.int32)
+            self.pool = LayerStackPool()
+        if draw_style == "ADD":
+            # the stack under stack_ids, read top down
+            self.base_ids = np.zeros((width, height), dtype=np.int32)
+
+    def view(self, x: int, y: int) -> LayerStore:
+        """A LayerStore view of square (x, y)."""
+        if self.draw_style == "SET":
+            return CompactSetStore(self, x, y)
+        if self.draw_style == "ADD":
+            return CompactAdditiveStore(self, x, y)
+        return CompactSequenceStore(self, x, y)
+
+    def special(self) -> None:
+        """
+        Special on every square.
+        complexity- O(1) for SET and ADD, O(p*special) for SEQUENCE where p is the number of painted squares
+        """
+        if self.draw_style == "SET":
+            self.special_parity = not self.special_parity
+            return
+        if self.draw_style == "ADD":
+            # reversing every square's layers swaps its base and top stacks
+            self.stack_ids, self.base_ids = self.base_ids, self.stack_ids
+            return
+        for x, y in zip(*np.nonzero(self.stack_ids)):
+            self.view(int(x), int(y)).special()
+
+    def set_node(self, ids: np.ndarray, x: int, y: int, node: int) -> None:
+        """
+        Point square (x, y) of ids (stack_ids or base_ids) at node, releasing the node it held.
+        complexity- O(1) amortised, see LayerStackPool.release
+        """
+        old = int(ids[x, y])
+        if old != node:
+            self.pool.acquire(node)
+            ids[x, y] = node
+            self.pool.release(old)
+
+    def chain_key(self, x: int, y: int) -> int:
+        """
+        A number identifying the layer chain of square (x, y).
+        Squares with equal keys have equal chains.
+        complexity- O(1)
+        """
+        if self.draw_style == "SET":
+            return int(self.layer_ids[x, y]) * 2 + int(self.special_flags[x, y] != self.special_parity)
+        if self.draw_style == "ADD":
+            return int(self.base_ids[x, y]) << 32 | int(self.stack_ids[x, y])
+        return int(self.stack_ids[x, y])
+
+    def chain(self, key: int) -> tuple[Layer, ...]:
+        """
+        The layer chain for a key from chain_key.
+        complexity- O(n) where n is the length of the chain
+        """
+        if self.draw_style == "SET":
+            index, special = divmod(key, 2)
+            if index < 0:
+                return ()
+            return (LAYERS[index], invert) if special else (LAYERS[index],)
+        if self.draw_style == "ADD":
+            base, top = key >> 32, key & 0xFFFFFFFF
+            stack = self.pool[base][::-1] + self.pool[top]
+        else:
+            stack = self.pool[key]
+        return tuple(LAYERS[index] for index in stack)
+
+
+class CompactSetStore(LayerStore):
+    """View of one square of a compact SET grid. Behaves as SetLayerStore."""
+
+    def __init__(self, storage: CompactStorage, x: int, y: int) -> None:
+        self.storage = storage
+        self.x = x
+        self.y = y
+
+    def add(self, layer: Layer) -> bool:
+        self.storage.layer_ids[self.x, self.y] = layer.index
+        return True
+
+    def erase(self, layer: Layer) -> bool:
+        self.storage.layer_ids[self.x, self.y] = -1
+        return True
+
+    def special(self):
+        self.storage.special_flags[self.x, self.y] = not self.storage.special_flags[self.x, self.y]
+
+    def layer_chain(self) -> tuple[Layer, ...]:
+        return self.storage.chain(self.storage.chain_key(self.x, self.y))
+
+    def get_color(self, start, timestamp, x, y) -> tuple[int, int, int]:
+        return compile_chain(self.layer_chain()).apply(start, timestamp, x, y)
+
+
+class CompactStackStore(LayerStore):
+    """View of one square of a compact ADD or SEQUENCE grid, holding a stack of layer indices."""
+
+    def __init__(self, storage: CompactStorage, x: int, y: int) -> None:
+        self.storage = storage
+        self.x = x
+        self.y = y
+
+    @property
+    def node(self) -> int:
+        return int(self.storage.stack_ids[self.x, self.y])
+
+    @node.setter
+    def node(self, node: int) -> None:
+        self.storage.set_node(self.storage.stack_ids, self.x, self.y, node)
+
+    @property
+    def stack(self) -> tuple[int, ...]:
+        return self.storage.pool[self.node]
+
+    @stack.setter
+    def stack(self, stack: tuple[int, ...]) -> None:
+        self.node = self.storage.pool.intern(stack)
+
+    def layer_chain(self) -> tuple[Layer, ...]:
+        return self.storage.chain(self.storage.chain_key(self.x, self.y))
+
+    def get_color(self, start, timestamp, x, y) -> tuple[int, int, int]:
+        return compile_chain(self.layer_chain()).apply(start, timestamp, x, y)
+
+
+class CompactAdditiveStore(CompactStackStore):
+    """View of one square of a compact ADD grid. Behaves as AdditiveLayerStore."""
+
+    # The square's layers are its base stack read top down, then its top stack (node).
+    # Adding pushes onto the top stack and erasing pops the base stack, each O(1).
+    # Once the base stack is empty, erasing splits what is left of the top stack between the two,
+    # so each layer is moved O(1) times on average.
+
+    @property
+    def base(self) -> int:
+        return int(self.storage.base_ids[self.x, self.y])
+
+    @base.setter
+    def base(self, node: int) -> None:
+        self.storage.set_node(self.storage.base_ids, self.x, self.y, node)
+
+    def add(self, layer: Layer) -> bool:
+        pool = self.storage.pool
+        if pool.depth(self.base) + pool.depth(self.node) >= CompactStorage.MAX_LAYERS:
+            return False
+        self.node = pool.push(self.node, layer.index)
+        return True
+
+    def erase(self, layer: Layer) -> bool:
+        pool = self.storage.pool
+        base = self.base
+        if base != 0:
+            self.base = pool.parents[base]
+            return True
+        stack = self.stack
+        if not stack:
+            return False
+        rest = stack[1:]
+        half = len(rest) // 2
+        self.base = pool.intern(reversed(rest[:half]))
+        self.stack = rest[half:]
+        return True
+
+    def special(self):
+        ids = self.storage.stack_ids, self.storage.base_ids
+        x, y = self.x, self.y
+        ids[0][x, y], ids[1][x, y] = ids[1][x, y], ids[0][x, y]
+
+
+class CompactSequenceStore(CompactStackStore):
+    """View of one square of a compact SEQUENCE grid. Behaves as SequenceLayerStore."""
+
+    def __contains__(self, layer: Layer) -> bool:
+        return layer.index in self.stack
+
+    def add(self, layer: Layer) -> bool:
+        if type(layer) != Layer:
+            return False
+        pool = self.storage.pool
+        if pool.depth(self.node) == 0 or layer.index > pool.tops[self.node]:
+            # goes on top of the sorted stack
+            self.node = pool.push(self.node, layer.index)
+            return True
+        stack = self.stack
+        if layer.index not in stack:
+            self.stack = tuple(sorted(stack + (layer.index,)))
+        return True
+
+    def erase(self, layer: Layer) -> bool:
+        stack = self.stack
+        if not stack:
+            return False
+        self.stack = tuple(index for index in stack if index != layer.index)
+        return True
+
+    def special(self):
+        stack = self.stack
+        if not stack:
+            raise ValueError("nothing to apply special to ")
+        by_name = sorted(stack, key=lambda index: LAYERS[index].name)
+        median = by_name[(len(by_name) - 1) // 2]
+        self.stack = tuple(index for index in stack if index != median)
@@ -3,6 +3,7 @@
 """
 
 from __future__ import annotations
+from typing import Iterator
 from data_structures.set_adt import Set
 
 class BSet(Set[int]):
@@ -34,6 +35,17 @@ class BSet(Set[int]):
             raise TypeError('Set elements should be integers')
         return (self.elems >> (item - 1)) & 1
 
+    def __iter__(self) -> Iterator[int]:
+        """ Iterates over the elements in increasing order.
+        Each step strips the lowest set bit, so this is O(1) per element
+        rather than O(1) per bit.
+        """
+        elems = self.elems
+        while elems:
+            lowest = elems & -elems
+            yield lowest.bit_length()
+            elems ^= lowest
+
     def __len__(self) -> int:
         """
         Size computation. The most expensive operation.
@@ -116,3 +128,4 @@ if __name__ == '__main__':
 
     print(f'S union T = {s.union(t)}')
     print(f'S intersect T = {s.intersection(t)}')
+    print(f'elements of S union T = {list(s.union(t))}')
@@ -8,7 +8,7 @@ __docformat__ = 'reStructuredText'
 
 import unittest
 from abc import ABC, abstractmethod
-from typing import Generic
+from typing import Generic, Iterator
 from data_structures.referential_array import ArrayR, T
 
 class Queue(ABC, Generic[T]):
@@ -89,10 +89,69 @@ class CircularQueue(Queue[T]):
         self.front = (self.front+1) % len(self.array)
         return item
 
+    def append_front(self, item: T) -> None:
+        """ Adds an element in front of the queue's front, so it is served next.
+        :pre: queue is not full
+        :raises Exception: if the queue is full
+        """
+        if self.is_full():
+            raise Exception("Queue is full")
+
+        self.front = (self.front - 1) % len(self.array)
+        self.array[self.front] = item
+        self.length += 1
+
+    def serve_rear(self) -> T:
+        """ Deletes and returns the element at the queue's rear, the last one appended.
+        :pre: queue is not empty
+        :raises Exception: if the queue is empty
+        """
+        if self.is_empty():
+            raise Exception("Queue is empty")
+
+        self.length -= 1
+        self.rear = (self.rear - 1) % len(self.array)
+        return self.array[self.rear]
+
     def is_full(self) -> bool:
         """ True if the queue is full and no element can be appended. """
         return len(self) == len(self.array)
 
+    def __iter__(self) -> Iterator[T]:
+        """ Iterates over the elements from front to rear, without serving them.
+        :complexity: O(1) per element, with no array allocated
+        """
+        array = self.array
+        capacity = len(array)
+        front = self.front
+        for i in range(len(self)):
+            yield array[(front + i) % capacity]
+
+    def __reversed__(self) -> Iterator[T]:
+        """ Iterates over the elements from rear to front, without serving them.
+        :complexity: O(1) per element, with no array allocated
+        """
+        array = self.array
+        capacity = len(array)
+        front = self.front
+        for i in range(len(self) - 1, -1, -1):
+            yield array[(front + i) % capacity]
+
+    def resize(self, new_capacity: int) -> None:
+        """ Moves the elements, front first, into an array of new_capacity.
+        :pre: new_capacity is at least the length of the queue
+        :raises ValueError: if the elements would not fit
+        :complexity: O(new_capacity)
+        """
+        if new_capacity < len(self):
+            raise ValueError("Queue does not fit in the new capacity")
+        new_array = ArrayR(max(self.MIN_CAPACITY, new_capacity))
+        for i in range(len(self)):
+            new_array[i] = self.array[(self.front + i) % len(self.array)]
+        self.array = new_array
+        self.front = 0
+        self.rear = len(self) % len(self.array)
+
     def clear(self) -> None:
         """ Clears all elements from the queue. """
         Queue.__init__(self)
@@ -178,6 +237,45 @@ class TestQueue(unittest.TestCase):
             for i in range(nitems):
                 self.assertEqual(queue.serve(), i)
 
+    def test_iter(self):
+        queue = CircularQueue(3)
+        for i in range(3):
+            queue.append(i)
+        queue.serve()
+        queue.append(3)
+        self.assertEqual(list(queue), [1, 2, 3])
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(list(self.empty_queue), [])
+
+    def test_both_ends(self):
+        queue = CircularQueue(4)
+        queue.append(1)
+        queue.append_front(0)
+        queue.append(2)
+        self.assertEqual(list(queue), [0, 1, 2])
+        self.assertEqual(list(reversed(queue)), [2, 1, 0])
+        self.assertEqual(queue.serve_rear(), 2)
+        self.assertEqual(queue.serve(), 0)
+        queue.append_front(5)
+        queue.append(6)
+        queue.append(7)
+        self.assertTrue(queue.is_full())
+        self.assertRaises(Exception, queue.append_front, 8)
+        self.assertEqual([queue.serve_rear() for _ in range(4)], [7, 6, 1, 5])
+        self.assertRaises(Exception, queue.serve_rear)
+
+    def test_resize(self):
+        queue = CircularQueue(4)
+        for i in range(4):
+            queue.append(i)
+        queue.serve()
+        queue.append(4)
+        queue.resize(8)
+        self.assertFalse(queue.is_full())
+        queue.append(5)
+        self.assertEqual([queue.serve() for _ in range(len(queue))], [1, 2, 3, 4, 5])
+        self.assertRaises(ValueError, self.large_queue.resize, 2)
+
     def test_clear(self):
         for queue in self.queues:
             queue.clear()
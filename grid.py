@@ -1,18 +1,31 @@
 from __future__ import annotations
-from data_structures.stack_adt import ArrayStack
+import numpy as np
 from data_structures.queue_adt import CircularQueue
 from data_structures.referential_array import ArrayR
-from data_structures.array_sorted_list import ArraySortedList
-from data_structures.sorted_list_adt import ListItem
-from layer_store import SetLayerStore
-from layer_store import AdditiveLayerStore
-from layer_store import SequenceLayerStore
-from layer_store import LayerStore
+from layer_store import GridSpecials
+from compact_grid import CompactColumn, CompactStorage
+from lazy_grid import LazyColumn
+from chain_compiler import compile_chain
+from action import PaintAction
 
 from layer_util import *
 from layers import *
 
 
+def brush_stamp(brush_size: int) -> tuple[tuple[int, int], ...]:
+    """
+    The (dx, dy) offsets painted by a brush, i.e. every offset within manhattan distance brush_size.
+    Offsets are sorted by dx and then dy, so painting them in order visits squares in the same order
+    as scanning the grid by x and then y.
+    complexity- O(b^2 log b) where b is the brush size
+    """
+    return tuple(sorted(
+        (dx, dy)
+        for dx in range(-brush_size, brush_size + 1)
+        for dy in range(-(brush_size - abs(dx)), brush_size - abs(dx) + 1)
+    ))
+
+
 class Grid:
     DRAW_STYLE_SET = "SET"
     DRAW_STYLE_ADD = "ADD"
@@ -26,8 +39,9 @@ class Grid:
     DEFAULT_BRUSH_SIZE = 2
     MAX_BRUSH = 5
     MIN_BRUSH = 0
+    BRUSH_STAMPS = tuple(brush_stamp(size) for size in range(MAX_BRUSH + 1))
 
-    def __init__(self, draw_style, x, y) -> None:
+    def __init__(self, draw_style, x, y, compact=False) -> None:
         """
         Initialise the grid object.
         should also intialise the brush size to the DEFAULT provided as a class variable.
@@ -37,10 +51,12 @@ class Grid:
             Should be one of DRAW_STYLE_OPTIONS
             This draw style determines the LayerStore used on each grid square.
             - x, y: The dimensions of the grid. (int)
+            - compact: store the grid as arrays (see compact_grid.py) instead of one LayerStore per square. (bool)
+            a compact grid only holds layers registered in LAYERS, and its squares skip the colour cache, so it is opt in.
         returns-
             - none
-        best and worst case time complexity- the complexity of this function would also be O(n^2), where n is the number of grid squares for its length and width of the grid. 
-        since the grid always requires n^2 squares to store the layer stores (this is done through a nested loop)
+        best and worst case time complexity- O(x) for the layer store columns, as no layer store is created until its square is painted (see lazy_grid.py).
+        a compact grid is O(x*y) to allocate its arrays, but creates no object per square.
         """
         #initialising the variables that will be used within the class Grid
         #worst case complexity = O(1)
@@ -52,36 +68,32 @@ class Grid:
         #worst case complexity = O(1)
         self.y=y #y height of the grid
         #worst case complexity = O(1)
-        self.grid = ArrayR(x) #creating an array for the grid
-        #worst case complexity = O(n) where n is the width
-        for i in range(x):  # this creates an array for each existing array position- x and y coordinate, hence making a grid
-            #worst case complexity = O(1)
-            self.grid[i] = ArrayR(y)
+        self.compact = None
         #worst case complexity = O(1)
-        if self.draw_style == 'SET': #checks if draw style chosen by user is for set layer store
-            #worst case complexity = O(x) where x is the width
-            for xvals in range(x): #goes through each x and y value in the grid
-                #worst case complexity = O(y) where y is the height
-                for yvals in range(y):
-                    #worst case complexity = O(1)
-                    self.grid[xvals][yvals] = SetLayerStore() #allocates each grid square to set layer store type
+        self.specials = GridSpecials() if draw_style in (Grid.DRAW_STYLE_SET, Grid.DRAW_STYLE_ADD) else None #grid wide specials, see special
         #worst case complexity = O(1)
-        elif self.draw_style == 'SEQUENCE': #checks if draw style chosen by user is sequence layer store
+        if compact:
+            #worst case complexity = O(x*y) to allocate the arrays, with no objects per square
+            self.compact = CompactStorage(draw_style, x, y)
+            #worst case complexity = O(x)
+            self.grid = ArrayR(x)
+            for i in range(x):
+                self.grid[i] = CompactColumn(self.compact, i)
+        else:
+            #worst case complexity = O(1)
+            self.grid = ArrayR(x) #creating an array for the grid
             #worst case complexity = O(x) where x is the width
-            for xvals in range(x): #goes through each x and y value in the grid
-                #worst case complexity = O(y) where y is the width
-                for yvals in range(y):
-                    #worst case complexity = O(1)
-                    self.grid[xvals][yvals]= SequenceLayerStore() #allocates each grid square to sequence layer store type
-
+            for i in range(x):  # each column only allocates a layer store for a square once that square is changed
+                #worst case complexity = O(1)
+                self.grid[i] = LazyColumn(self.draw_style, y, self.specials)
         #worst case complexity = O(1)
-        elif self.draw_style == 'ADD':# checks if draw style chosen by user is add layer store
-            #worst case complexity = O(x) where x is the width
-            for xvals in range(x): #goes through each x and y value in the grid
-                #worst case complexity = O(y) where y is the width
-                for yvals in range(y):
-                    #worst case complexity = O(1)
-                    self.grid[xvals][yvals] = AdditiveLayerStore() #allocates each grid square to additive layer store type
+        self.dirty = set() #squares whose layers changed since the frame was last refreshed
+        #worst case complexity = O(1)
+        self.animated = set() #squares holding a time varying layer, recomposited whenever the timestamp changes
+        #worst case complexity = O(1)
+        self.frame = None #the frame kept up to date by refresh_frame
+        self.frame_timestamp = None
+        self.frame_start = None
             
         
     
@@ -90,7 +102,6 @@ class Grid:
         Increases the size of the brush by 1,
         if the brush size is already MAX_BRUSH,
         then do nothing.
-        raises: value error if brush size is already at max
         complexity- the best and worst case complexity of this function is o(1) as it is constant and doesnt depend on input values
         """
         #checks if brush size is less than max brush size
@@ -98,10 +109,6 @@ class Grid:
         if self.brush_size <Grid.MAX_BRUSH: #comparison 
             #worst case complexity = O(1)
             self.brush_size+=1 #increases brush size by one #assignment and addition 
-        #worst case complexity = O(1)
-        else:
-            #worst case complexity = O(1)
-            raise ValueError("Brush Size is already Max") #if brush size is not less than max brush size value error is raised
 
     def decrease_brush_size(self):
         """
@@ -109,7 +116,6 @@ class Grid:
         if the brush size is already MIN_BRUSH,
         then do nothing.
         no values returned
-        raises: value error if the brush size is already at min
         complexity- the best and worst case complexity of this function is o(1) as it is constant and doesnt depend on input values
         """
         #checks if brush size is greater than min brush size
@@ -117,24 +123,35 @@ class Grid:
         if self.brush_size>Grid.MIN_BRUSH:
             #worst case complexity = O(1)
             self.brush_size-=1 #reduces brush size by one 
-            #worst case complexity = O(1)
-        else:
-            #worst case complexity = O(1)
-            raise ValueError("Brush Size is already Min") #if brush size is not greater than min brush size value error is raised
         
 
     def special(self):
         """
         Activate the special affect on all grid squares.
-        complexity- the best and worst case is o(n^2*special), where n is the height and width of the grid. the grid will always go through the range of x and y causing a nested loop.
-        mupltiplied by the complexity of special depending on the layer store
+        For SET and ADD grids this only counts the special in self.specials (a compact grid flips its SET parity or swaps its ADD stacks),
+        each square allows for it when read and applies it the next time it is changed, so untouched squares are never visited.
+        A SEQUENCE special removes a layer from each square, so it visits every painted square, skipping empty ones.
+        complexity- O(1) for SET and ADD grids.
+        O(p*special) for SEQUENCE grids, where p is the number of painted squares
         """
-        #worst case complexity = O(n) where n is hte size of width
-        for i in range(self.x):#goes through all x values in grid
-            #worst case complexity = O(n) where n is the height
-            for j in range(self.y): #for each x value, it selects each grid square by selecting the corresponding y value
-                #worst case complexity = O(special) as special depends on which layerstore is sued
-                LayerStore.special(self) #activates special to every grid square
+        #worst case complexity = O(1)
+        if self.compact is not None:
+            #worst case complexity = O(1) for SET and ADD, O(p*special) for SEQUENCE
+            self.compact.special()
+        #worst case complexity = O(1)
+        elif self.specials is not None:
+            #worst case complexity = O(1)
+            self.specials.count += 1 #every square allows for this when read, and applies it when next changed
+        else:
+            #worst case complexity = O(p*special) where p is the number of painted squares
+            for i in range(self.x):
+                for store in self.grid[i].stores.values():
+                    #worst case complexity = O(1)
+                    if store.count > 0: #an empty sequence has no median to remove
+                        #worst case complexity = O(special)
+                        store.special()
+        #worst case complexity = O(1)
+        self.mark_all_dirty()
 
 
     def grid_paint(self, layer: Layer, x, y, brush_size):
@@ -147,34 +164,192 @@ class Grid:
             px: x position of the brush.(int)
             py: y position of the brush.(Int)
             brush_size= the brush size chosen by the user which will paint onto the grid  (int)
-        return- coordinates in a queue
-        complexity- The best and worst time complexity of this function is O(n^2)+o(add), where n is the x and y direction of the grid.
-        this is because it needs to iterate through all the grid squares in the x and y directions.
-        the manhattan_distance function is called, but it has constant complexity.
+        return- coordinates in a queue, ordered by x and then y
+        complexity- The best and worst time complexity of this function is O(b^2*add), where b is the brush size.
+        only the squares of the precomputed brush stamp are visited, so the size of the grid does not matter.
         the add method would have complexity o(add) depending on its implementation
         """
         #worst case complexity = O(1)
-        coordinate_queue = CircularQueue(1000) #creating an empty circular queue to return with the coordinates at the end of the function
-        #worst case complexity = O(1)
         self.brush_size = brush_size 
-        #worst case complexity = O(n) where n is size of n
-        for i in range(self.x): #goes through all grid squares (each x and corresponding y coordinate)
-            #worst case complexity = O(n) where n is size of y
-            for j in range(self.y):
+        #worst case complexity = O(1)
+        stamp = Grid.BRUSH_STAMPS[brush_size]
+        #worst case complexity = O(1)
+        coordinate_queue = CircularQueue(len(stamp)) #creating an empty circular queue to return with the coordinates at the end of the function
+        #worst case complexity = O(b^2) where b is the brush size
+        for dx, dy in stamp: #goes through the squares within manhattan distance of the brush
+            i = x + dx
+            j = y + dy
+            #worst case complexity = O(1)
+            if 0 <= i < self.x and 0 <= j < self.y: #squares outside of the grid are ignored
+                #worst case complexity = O(add)
+                self.grid[i][j].add(layer) #the coordinates within  manhattan distance will have the layer applied to them
+                #worst case complexity = O(1)
+                self.mark_dirty(i, j)
                 #worst case complexity = O(1)
-                distance = abs(x-i) + abs(y-j) #distance is the manhattan distance calculated by this formula
-                #distance = self.manhattan_distance(x,y,i,j) 
-                # #worst case complexity = O(1) 
-                if distance < self.brush_size: #checks that the manhattan distance is less than the brush size
+                coordinate_queue.append((i,j)) #adds the x y coordinates to the list we created
+        #worst case complexity = O(1)
+        return coordinate_queue #returns circular queue with the x y coordinates 
+
+    def paint_stroke(self, layer: Layer, points, brush_size, action: PaintAction | None = None, painted: set | None = None) -> PaintAction:
+        """
+        Paints a whole stroke at once: the union of the brush stamps at every point of the stroke.
+        Each square in the union has the layer added once, in the order the stroke first reaches it,
+        so squares under several points of the stroke are not painted again for each of them.
+        A stroke painted bit by bit, as the mouse moves, passes the same action and painted set each time,
+        so the whole stroke is one action and still paints each square once.
+        arguments-
+            layer: The layer being applied. (Layer)
+            points: the (x, y) brush positions along the stroke, in order (iterable of tuples)
+            brush_size: the brush size used for every point (int)
+            action: the action of the stroke so far, a new one if None (PaintAction)
+            painted: the squares the stroke has painted so far, added to as squares are painted (set of tuples)
+        return- the stroke's PaintAction, holding a step for each painted square, in painting order
+        complexity- O(p*b^2 + s*add) where p is the number of points, b the brush size and s the number of painted squares.
+        only the stamps of the points are visited, so the size of the grid does not matter.
+        """
+        #worst case complexity = O(1)
+        self.brush_size = brush_size
+        #worst case complexity = O(1)
+        stamp = Grid.BRUSH_STAMPS[brush_size]
+        #worst case complexity = O(1)
+        if painted is None:
+            painted = set() #squares already in the stroke
+        #worst case complexity = O(1)
+        if action is None:
+            action = PaintAction()
+        #worst case complexity = O(p*b^2) where p is the number of points and b the brush size
+        for x, y in points:
+            for dx, dy in stamp:
+                i = x + dx
+                j = y + dy
+                #worst case complexity = O(1)
+                if 0 <= i < self.x and 0 <= j < self.y and (i, j) not in painted: #squares outside of the grid are ignored
+                    #worst case complexity = O(1)
+                    painted.add((i, j))
+                    #worst case complexity = O(add)
+                    self.grid[i][j].add(layer)
                     #worst case complexity = O(1)
-                    self.grid[i][j].add(layer) #the coordinates within  manhattan distance will have the layer applied to them
+                    self.mark_dirty(i, j)
                     #worst case complexity = O(1)
-                    coordinate_queue.append((i,j)) #adds the x y coordinates to the list we created
+                    action.add_cell(i, j, layer)
         #worst case complexity = O(1)
-        return coordinate_queue #returns circular queue with the x y coordinates 
-    
-    
+        return action
+
+    def mark_dirty(self, x, y):
+        """
+        Record that the layers of grid[x][y] changed, so refresh_frame recomposites it.
+        complexity- O(1)
+        """
+        #worst case complexity = O(1)
+        self.dirty.add((x, y))
+
+    def mark_all_dirty(self):
+        """
+        Record that every square may have changed, so the next refresh_frame recomposites the whole grid.
+        complexity- O(1)
+        """
+        #worst case complexity = O(1)
+        self.frame = None
+
+    def render(self, timestamp, start=(255, 255, 255)) -> np.ndarray:
+        """
+        Composite every grid square into one image, for drawing the whole grid at once.
+        Squares holding the same layers in the same order are grouped, and each layer is applied
+        to every square of a group in a single apply_array call, or to one square when the group's
+        colour does not depend on position.
+        arguments-
+            timestamp: the timestamp passed to each layer (float)
+            start: the colour beneath all layers, as given to get_color (r,g,b)
+        return- uint8 array of shape (y, x, 3), where frame[j][i] is the colour of grid[i][j]
+        complexity- O(x*y + g*apply_array) where g is the number of distinct layer chains,
+        as every square is visited once to group it and each group applies its layers once
+        """
+        #worst case complexity = O(1)
+        frame = np.empty((self.y, self.x, 3), dtype=np.uint8)
+        #worst case complexity = O(x*y + g*apply_array)
+        self._composite(self._all_squares(), timestamp, start, frame)
+        return frame
+
+    def refresh_frame(self, timestamp, start=(255, 255, 255)) -> list[tuple[int, int]]:
+        """
+        Bring self.frame up to date, only recompositing squares that could have changed:
+        squares marked dirty, plus squares holding a time varying layer when the timestamp moved on.
+        The whole grid is recomposited the first time, after mark_all_dirty, or when start changes.
+        arguments-
+            timestamp: the timestamp passed to each layer (float)
+            start: the colour beneath all layers (r,g,b)
+        return- the squares that were recomposited, empty when nothing changed
+        complexity- O(d*apply) where d is the number of recomposited squares, O(1) when nothing changed
+        """
+        #worst case complexity = O(1)
+        if self.frame is None or tuple(start) != self.frame_start:
+            #worst case complexity = O(x*y)
+            self.frame = np.empty((self.y, self.x, 3), dtype=np.uint8)
+            self.frame_start = tuple(start)
+            squares = self._all_squares()
+        else:
+            #worst case complexity = O(d) where d is the number of dirty and animated squares
+            squares = list(self.dirty)
+            if timestamp != self.frame_timestamp:
+                squares.extend(self.animated - self.dirty)
+        #worst case complexity = O(1)
+        self.frame_timestamp = timestamp
+        self.dirty = set()
+        #worst case complexity = O(d*apply)
+        if squares:
+            self._composite(squares, timestamp, start, self.frame)
+        return squares
+
+    def _all_squares(self) -> list[tuple[int, int]]:
+        """
+        Every square of the grid, in x-then-y order.
+        complexity- O(x*y)
+        """
+        return [(i, j) for i in range(self.x) for j in range(self.y)]
+
+    def _composite(self, squares, timestamp, start, frame: np.ndarray):
+        """
+        Write the colour of each of the given squares into frame, grouping squares by layer chain.
+        Each distinct chain is compiled by chain_compiler, so only its end from the last constant output layer
+        is applied and runs of per channel layers are applied as one step. A chain that does not depend on
+        position gives every square of its group the same colour, so it is worked out once and broadcast.
+        Also records which of these squares hold a time varying layer.
+        complexity- O(n + g*apply_array) where n is the number of squares and g the number of distinct chains
+        """
+        #worst case complexity = O(n) to group every square by its layer chain
+        groups = {}
+        for i, j in squares:
+            if self.compact is not None:
+                #worst case complexity = O(1), reading the arrays directly
+                key = self.compact.chain_key(i, j)
+                if key not in groups:
+                    groups[key] = (from_last_constant(self.compact.chain(key)), [], [])
+            else:
+                #worst case complexity = O(n) where n is the length of the chain, untouched squares share the empty store
+                chain = from_last_constant(self.grid[i].store_at(j).layer_chain())
+                key = tuple(layer.index for layer in chain)
+                if key not in groups:
+                    groups[key] = (chain, [], [])
+            groups[key][1].append(i)
+            groups[key][2].append(j)
 
+        #worst case complexity = O(g*apply_array) where g is the number of groups
+        for chain, xs, ys in groups.values():
+            compiled = compile_chain(chain)
+            if compiled.time_varying:
+                self.animated.update(zip(xs, ys))
+            else:
+                self.animated.difference_update(zip(xs, ys))
+            xs = np.array(xs)
+            ys = np.array(ys)
+            if not compiled.position_varying:
+                #worst case complexity = O(apply_array) for one square, then O(k) to broadcast it to the k squares
+                color = np.array(start, dtype=np.int64).reshape(3, 1)
+                frame[ys, xs] = compiled.apply_array(color, timestamp, xs[:1], ys[:1]).T
+                continue
+            color = np.empty((3, len(xs)), dtype=np.int64)
+            color[:] = np.array(start, dtype=np.int64).reshape(3, 1)
+            frame[ys, xs] = compiled.apply_array(color, timestamp, xs, ys).T
 
     def __getitem__(self,item):
         """
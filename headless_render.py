@@ -0,0 +1,142 @@
+"""
+Render paintings without a window.
+
+Frames come from Grid.refresh_frame and are written to disk as soon as they
+are composited, so only one frame is held in memory however long the
+animation is. Output is either a directory of PNG files or a single
+animated PNG (APNG), both written with zlib alone.
+
+    python -m headless_render painting.json out/ --start 0 --stop 10 --fps 20
+    python -m headless_render painting.json out.png --apng --scale 8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import zlib
+from fractions import Fraction
+from typing import Iterable
+
+import numpy as np
+
+from grid import Grid
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    """A PNG chunk: length, type, data and CRC."""
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def _image_data(frame: np.ndarray, scale: int) -> bytes:
+    """Compressed PNG scanlines of a frame, top row first, each square scale x scale pixels."""
+    image = frame[::-1]
+    if scale > 1:
+        image = image.repeat(scale, axis=0).repeat(scale, axis=1)
+    # Every scanline starts with filter type 0 (none).
+    rows = np.zeros((image.shape[0], 1 + image.shape[1] * 3), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(image.shape[0], -1)
+    return zlib.compress(rows.tobytes())
+
+def _header(frame: np.ndarray, scale: int) -> bytes:
+    height, width = frame.shape[0] * scale, frame.shape[1] * scale
+    # 8 bit RGB, default compression, filtering and no interlacing.
+    return b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+def write_png(path, frame: np.ndarray, scale: int = 1) -> None:
+    """Write a single frame from Grid.render as a PNG."""
+    with open(path, "wb") as f:
+        f.write(_header(frame, scale))
+        f.write(_chunk(b"IDAT", _image_data(frame, scale)))
+        f.write(_chunk(b"IEND", b""))
+
+def frames(grid: Grid, timestamps: Iterable[float], start=(255, 255, 255)) -> Iterable[np.ndarray]:
+    """
+    The grid's frame at each timestamp, in order.
+    The same array is updated in place and yielded each time, so it must be
+    used before asking for the next frame.
+    """
+    for timestamp in timestamps:
+        grid.refresh_frame(timestamp, start)
+        yield grid.frame
+
+def frame_delay(fps: float) -> tuple[int, int]:
+    """
+    The delay between frames at fps frames per second, as the numerator and denominator
+    of an APNG fcTL chunk. Both are unsigned shorts, so a delay over 65535 seconds is clamped to it.
+    """
+    delay = Fraction(1 / fps).limit_denominator(0xFFFF)
+    if delay.numerator > 0xFFFF:
+        return 0xFFFF, 1
+    return delay.numerator, delay.denominator
+
+def render_pngs(grid: Grid, directory, timestamps: Iterable[float], scale: int = 1, start=(255, 255, 255)) -> int:
+    """Write frame_00000.png, frame_00001.png, ... to directory. Returns the number of frames."""
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for frame in frames(grid, timestamps, start):
+        write_png(os.path.join(directory, f"frame_{count:05d}.png"), frame, scale)
+        count += 1
+    return count
+
+def render_apng(grid: Grid, path, timestamps: Iterable[float], fps: float, scale: int = 1, start=(255, 255, 255)) -> int:
+    """
+    Write every timestamp as one frame of a looping animated PNG. Returns the number of frames.
+    timestamps may be any iterable, the frame count is filled in once the last frame is written.
+    :raises ValueError: if there are no timestamps, as a PNG needs at least one image.
+    """
+    rendered = iter(frames(grid, timestamps, start))
+    frame = next(rendered, None)
+    if frame is None:
+        raise ValueError("no timestamps to render")
+    delay = frame_delay(fps)
+    height, width = frame.shape[0] * scale, frame.shape[1] * scale
+    count = 0
+    sequence = 0
+    with open(path, "wb") as f:
+        f.write(_header(frame, scale))
+        frame_count_at = f.tell()
+        f.write(_chunk(b"acTL", struct.pack(">II", 0, 0)))
+        while frame is not None:
+            f.write(_chunk(b"fcTL", struct.pack(
+                ">IIIIIHHBB", sequence, width, height, 0, 0, delay[0], delay[1], 0, 0,
+            )))
+            sequence += 1
+            if count == 0:
+                # The first frame doubles as the still image.
+                f.write(_chunk(b"IDAT", _image_data(frame, scale)))
+            else:
+                f.write(_chunk(b"fdAT", struct.pack(">I", sequence) + _image_data(frame, scale)))
+                sequence += 1
+            count += 1
+            frame = next(rendered, None)
+        f.write(_chunk(b"IEND", b""))
+        # The acTL chunk is the same size whatever the count, so it is written again in place.
+        f.seek(frame_count_at)
+        f.write(_chunk(b"acTL", struct.pack(">II", count, 0)))
+    return count
+
+def timestamps_between(start: float, stop: float, fps: float) -> list[float]:
+    """Timestamps from start (inclusive) to stop (exclusive), fps per unit of time."""
+    return [start + i / fps for i in range(max(0, int(round((stop - start) * fps))))]
+
+if __name__ == "__main__":
+    from action_log import replay_action_log
+
+    p = argparse.ArgumentParser(description="Render a saved action log to PNG frames or an animated PNG.")
+    p.add_argument("log", help="Saved action log (see action_log.py).")
+    p.add_argument("output", help="Directory for PNG frames, or the file to write with --apng.")
+    p.add_argument("--start", help="First timestamp.", type=float, default=0)
+    p.add_argument("--stop", help="Timestamp to stop before.", type=float, default=1)
+    p.add_argument("--fps", help="Frames per unit of timestamp.", type=float, default=20)
+    p.add_argument("--scale", help="Pixels per grid square.", type=int, default=1)
+    p.add_argument("--apng", help="Write one animated PNG instead of a directory of frames.", action="store_true")
+    args = p.parse_args()
+
+    grid = replay_action_log(args.log)
+    timestamps = timestamps_between(args.start, args.stop, args.fps)
+    if not timestamps:
+        p.error("--start to --stop at --fps gives no frames")
+    if args.apng:
+        count = render_apng(grid, args.output, timestamps, args.fps, args.scale)
+    else:
+        count = render_pngs(grid, args.output, timestamps, args.scale)
+    print(f"Wrote {count} frames to {args.output}")
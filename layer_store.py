@@ -1,12 +1,76 @@
 from __future__ import annotations
+from bisect import bisect_left, insort
 from abc import ABC, abstractmethod
-from data_structures.stack_adt import ArrayStack
-from layer_util import Layer
+from typing import Iterator
+from layer_util import Layer, LAYERS, name_ranks
+from layers import invert
+from chain_compiler import CompiledChain, compile_chain
 
 from data_structures.queue_adt import CircularQueue
-from data_structures.array_sorted_list import ArraySortedList
-from data_structures.sorted_list_adt import ListItem
+from data_structures.bset import BSet
+
+class ColourCacheStats:
+    """
+    Hits and misses of the get_color caches, counted over every LayerStore.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Start counting again from zero."""
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self) -> float:
+        """Fraction of cached get_color calls that were hits, 0 if there were none."""
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate()}
+
+COLOUR_CACHE_STATS = ColourCacheStats()
+
+def colour_cache_stats() -> ColourCacheStats:
+    """The get_color cache counters shared by every LayerStore."""
+    return COLOUR_CACHE_STATS
+
+class GridSpecials:
+    """
+    How many grid wide specials a grid has had, shared by the SET or ADD stores of the grid.
+    Grid.special only counts one here. Each store catches up on the specials it has not seen
+    the next time it is changed (see LayerStore.catch_up), and reads allow for them without
+    changing the store (see LayerStore.pending_special), so a grid wide special is O(1).
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+
 class LayerStore(ABC):
+    # most layers a store holds at once
+    MAX_LAYERS = 1000
+    # room allocated for layers when a store is created; containers grow from here up to MAX_LAYERS
+    INITIAL_CAPACITY = 4
+    # when a square has time varying layers, its cached colour is kept for timestamps in the same
+    # bucket of this width. None keys the cache on the exact timestamp, so colours are never stale.
+    TIME_QUANTUM = None
+
+    # get_color cache. these are class level defaults, so a store only gets its own copies
+    # once it is changed or read, and untouched stores cost nothing extra.
+    # version is bumped by every add, erase and special; the cache is only used while state() matches.
+    version = 0
+    cache_version = -1
+    cache_start = None
+    cache_position = None
+    cache_time = None
+    cache_colour = None
+    # the fused layer chain, compiled again only when state() changes
+    compiled_version = -1
+    compiled_chain = None
+    # the grid wide special count this store follows, if any, and how many of those specials it has applied
+    grid_specials = None
+    specials_seen = 0
 
     def __init__(self) -> None:
         """
@@ -19,6 +83,123 @@ class LayerStore(ABC):
         #worst case complexity = O(1)
         self.current_colour= None
 
+    def bump_version(self) -> None:
+        """
+        records that the layers changed, so a cached colour is no longer used
+        best and worst case complexity = O(1)
+        """
+        #worst case complexity = O(1)
+        self.version += 1
+
+    def pending_special(self) -> bool:
+        """
+        True if the store has missed an odd number of grid wide specials, so reads must apply one more special
+        than the store holds. two specials cancel out for SET and ADD stores, the only stores that follow a GridSpecials.
+        the store is only read, so this is safe to call while reading colours.
+        best and worst case complexity = O(1)
+        """
+        #worst case complexity = O(1)
+        if self.grid_specials is None:
+            return False
+        #worst case complexity = O(1)
+        return (self.grid_specials.count - self.specials_seen) % 2 == 1
+
+    def state(self) -> int:
+        """
+        a number that changes whenever the layers as read change: when version is bumped,
+        or when a grid wide special changes pending_special. the caches are keyed on it.
+        best and worst case complexity = O(1)
+        """
+        #worst case complexity = O(1)
+        return self.version * 2 + self.pending_special()
+
+    def catch_up(self) -> None:
+        """
+        applies the grid wide specials this store has not seen yet, so that a change starts from the layers as read.
+        only called by add, erase and special, reads use pending_special instead and leave the store as it is.
+        best and worst case complexity = O(1)
+        """
+        #worst case complexity = O(1)
+        if self.grid_specials is None or self.specials_seen == self.grid_specials.count:
+            return
+        #worst case complexity = O(1)
+        missed = self.grid_specials.count - self.specials_seen
+        self.specials_seen = self.grid_specials.count
+        #worst case complexity = O(1)
+        if missed % 2:
+            self.special()
+
+    def time_bucket(self, timestamp):
+        """
+        the timestamp as the colour cache sees it, the bucket of width TIME_QUANTUM it falls in
+        best and worst case complexity = O(1)
+        """
+        #worst case complexity = O(1)
+        if self.TIME_QUANTUM is None:
+            return timestamp
+        #worst case complexity = O(1)
+        return timestamp // self.TIME_QUANTUM
+
+    def cached_color(self, start, timestamp, x, y, state: int) -> tuple[int, int, int] | None:
+        """
+        Returns the colour get_color gave last time if the layers are the same (state is the store's state()), and the start colour,
+        position and timestamp bucket are the same or the layers do not depend on them. Returns None otherwise.
+        Counts a hit or a miss in COLOUR_CACHE_STATS.
+        best and worst case complexity = O(1)
+        """
+        #worst case complexity = O(1)
+        if (
+            self.cache_version == state
+            and (self.cache_position is None or self.cache_position == (x, y))
+            and (self.cache_start is None or self.cache_start == tuple(start))
+            and (self.cache_time is None or self.cache_time == self.time_bucket(timestamp))
+        ):
+            #worst case complexity = O(1)
+            COLOUR_CACHE_STATS.hits += 1
+            return self.cache_colour
+        #worst case complexity = O(1)
+        COLOUR_CACHE_STATS.misses += 1
+        return None
+
+    def compiled(self, state: int | None = None) -> CompiledChain:
+        """
+        Returns layer_chain compiled by chain_compiler, with runs of per channel layers fused into one step
+        and the layers before the last constant output layer dropped.
+        state is the store's state() read before the layers are, and the compiled chain is kept under it.
+        if the layers change while they are read the chain may be newer than state, but never older,
+        so the next call with the changed state compiles again rather than keeping a chain that is out of date.
+        best case complexity = O(1) when nothing changed since it was last compiled
+        worst case complexity = O(n) where n is the length of the chain
+        """
+        #worst case complexity = O(1)
+        if state is None:
+            state = self.state()
+        #worst case complexity = O(1)
+        if self.compiled_version != state:
+            #worst case complexity = O(n) where n is the length of the chain
+            self.compiled_chain = compile_chain(self.layer_chain())
+            #worst case complexity = O(1)
+            self.compiled_version = state
+        #worst case complexity = O(1)
+        return self.compiled_chain
+
+    def remember_color(self, colour, start, timestamp, x, y, chain: CompiledChain, state: int) -> tuple[int, int, int]:
+        """
+        Caches the colour get_color worked out from the compiled chain, and returns it.
+        state is the store's state() read before the chain was, so a colour worked out while the layers
+        were being changed is kept under the older state, and is not used once the change is seen.
+        If the chain does not depend on the timestamp or position, the colour is reused for every timestamp or position,
+        and if its first step ignores its input colour it is reused for every start colour.
+        best and worst case complexity = O(1)
+        """
+        #worst case complexity = O(1)
+        self.cache_version = state
+        self.cache_position = (x, y) if chain.position_varying else None
+        self.cache_start = tuple(start) if chain.color_dependent else None
+        self.cache_time = self.time_bucket(timestamp) if chain.time_varying else None
+        self.cache_colour = colour
+        return colour
+
     @abstractmethod
     def add(self, layer: Layer) -> bool:
         """
@@ -49,6 +230,14 @@ class LayerStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def layer_chain(self) -> tuple[Layer, ...]:
+        """
+        Returns the layers this square applies, in the order get_color applies them.
+        Folding `apply` over the chain gives the same colour as get_color.
+        """
+        pass
+
 class SetLayerStore(LayerStore):
     """
     Set layer store. A single layer can be stored at a time (or nothing at all)
@@ -82,6 +271,8 @@ class SetLayerStore(LayerStore):
         #worst case complexity = O(1)
         self.current_layer = layer #the current layer will be replaced by the new chosen layer
         #worst case complexity = O(1)
+        self.bump_version()
+        #worst case complexity = O(1)
         return True #function returns true if a layer is added
         
     def erase(self,layer) ->bool: #implementing erase in set layer store
@@ -97,6 +288,8 @@ class SetLayerStore(LayerStore):
         #worst case complexity = O(1)
         self.current_layer = None #the current layer will be removed 
         #worst case complexity = O(1)
+        self.bump_version()
+        #worst case complexity = O(1)
         return True #function returns true if erase is applied
     
     def get_color(self, start, timestamp, x, y) -> tuple[int, int, int]:
@@ -108,7 +301,8 @@ class SetLayerStore(LayerStore):
             x= x coordinate (int)
             y= y coordinate (int)
         return: return start as a tuple if no effect is applied, or else return the new applied colour as a tuple
-        best case complexity = O(1), if isspecial is flase only assigments and returns and comparisions are run
+        best case complexity = O(1), if isspecial is flase only assigments and returns and comparisions are run,
+        or the colour is the one cached by the last call
         worst complexity: O(n) where n is the number of items in the tuple. As it will  iterate through
         every value in the tuple in order to apply the special when is special is true
         """
@@ -118,19 +312,17 @@ class SetLayerStore(LayerStore):
             #worst case complexity = O(1)
             return start   #return the starting tuple as no effects have been added
         #worst case complexity = O(1)
-        elif self.is_special: #if special effect is applied 
-            #worst case complexity = O(1)
-            i=0
-            #worst case complexity = O(1)
-            self.current_colour = self.current_layer.apply(start, timestamp,x,y) #get the currrent colour tuple without special being applied
-            #worst and best case complexity = O(n) where n is the number of items in the tuple
-            newtuple = tuple([255 - colours for colours in self.current_colour]) #special is applied by subtracting the current tuples from 255
-            #worst case complexity = O(1)
-            return newtuple #returns the special tuple with special applied to it 
-            #worst case complexity = O(1)
-        elif not self.is_special: #if special is not applied 
+        state = self.state() #read before the layers, so a change made during this read is not cached as seen
+        #worst case complexity = O(1)
+        colour = self.cached_color(start, timestamp, x, y, state) #the colour from last time, if nothing it depends on changed
+        #worst case complexity = O(1)
+        if colour is not None:
             #worst case complexity = O(1)
-            return self.current_layer.apply(start, timestamp, x , y) #return the current colour tuple from the layer that is applied 
+            return colour
+        #worst case complexity = O(1)
+        compiled = self.compiled(state) #the layer, and the inversion when special is applied, fused into one step where they allow it
+        #worst case complexity = O(apply)
+        return self.remember_color(compiled.apply(start, timestamp, x, y), start, timestamp, x, y, compiled, state)
 
     def special(self): 
         """
@@ -138,7 +330,25 @@ class SetLayerStore(LayerStore):
         best and worst complexities = O(1) there is only one assigment statement
         """
         #worst case complexity = O(1)
+        self.catch_up() #applies any grid wide special this square has not seen yet
+        #worst case complexity = O(1)
         self.is_special = not self.is_special #acts as a toggle to switch self.special between true and false
+        #worst case complexity = O(1)
+        self.bump_version()
+
+    def layer_chain(self) -> tuple[Layer, ...]:
+        """
+        Returns the layers applied to this square in order.
+        When special is on, the inversion is the invert layer applied after the current layer.
+        best and worst case complexity = O(1)
+        """
+        #worst case complexity = O(1)
+        if self.current_layer is None:
+            return ()
+        #worst case complexity = O(1)
+        if self.is_special != self.pending_special(): #grid wide specials this square has not seen yet are allowed for, not applied
+            return (self.current_layer, invert)
+        return (self.current_layer,)
 
 class AdditiveLayerStore(LayerStore):
     """
@@ -152,28 +362,47 @@ class AdditiveLayerStore(LayerStore):
         """
         initialising the additive layer store class 
         our queue- creating an empty queue to add layers to, its operations are applied first in first out 
-        worst and best case complexity = O(1) only one assignment
+        the queue starts small and doubles when it fills, up to MAX_LAYERS
+        is reversed- when true the layers apply from the rear of the queue to the front, so the newest layer in the queue applies first
+        worst and best case complexity = O(1) only assignments
         """
         #worst case complexity = O(1)
-        self.our_queue = CircularQueue(1000) #creating the empty queue 
+        self.our_queue = CircularQueue(self.INITIAL_CAPACITY) #creating the empty queue 
+        #worst case complexity = O(1)
+        self.is_reversed = False #special flips this instead of rebuilding the queue
      
     def add(self,layer)-> bool:
         """
         adds a layer the additive layer store 
-        if the additive layer store queue is full then no layer is added and the function will return boolean false
-        if the additive layer store queue is not full then a layer is added and the function will return a boolean true
+        if the additive layer store already holds MAX_LAYERS layers then no layer is added and the function will return boolean false
+        otherwise a layer is added and the function will return a boolean true
         layer: the layer type chosen to be applied by the user 
         returns a boolean value based on whether the layer was added or not.
-        worst and best case complexity = O(1) all functions and of O(1) and the rest are return statements or assignments
+        worst case complexity = O(n) where n is the length of the queue, when the queue is full and has to double
+        amortised and best case complexity = O(1) all functions and of O(1) and the rest are return statements or assignments
 
         """
+        #worst case complexity = O(1)
+        self.catch_up() #applies any grid wide special this square has not seen yet
         #implementing add
         #worst case complexity = O(1)
-        if self.our_queue.is_full(): #checks if our queue is full
+        if len(self.our_queue) >= self.MAX_LAYERS: #checks if the store holds as many layers as it is allowed
             #worst case complexity = O(1)
-            return False #if the queue is full return false
+            return False #if the store is full return false
+        #worst case complexity = O(1)
+        if self.our_queue.is_full(): #if there is no room left in the queue, double it
+            #worst case complexity = O(n) where n is the length of the queue
+            self.our_queue.resize(min(2 * len(self.our_queue.array), self.MAX_LAYERS))
+        #worst case complexity = O(1)
+        if self.is_reversed: #the layer that applies last is at the front of the queue
+            #worst case complexity = O(1)
+            self.our_queue.append_front(layer)
+        #worst case complexity = O(1)
+        else:
             #worst case complexity = O(1)
-        self.our_queue.append(layer)  #using the queue method append to add layers to our queue if it is not full
+            self.our_queue.append(layer)  #using the queue method append to add layers to our queue if it is not full
+        #worst case complexity = O(1)
+        self.bump_version()
         #worst case complexity = O(1)
         return True #if a layer is added return true
 
@@ -188,13 +417,23 @@ class AdditiveLayerStore(LayerStore):
         all return statements are also O(1)
 
         """
+        #worst case complexity = O(1)
+        self.catch_up() #applies any grid wide special this square has not seen yet
         #implementing erase
         #worst case complexity = O(1)
         if self.our_queue.is_empty():#checking if the queue is empty 
             #worst case complexity = O(1)
             return False #return false if the queue is empty 
         #worst case complexity = O(1)
-        self.our_queue.serve() #using the queue method to remove layers from our queue if it is not empty 
+        if self.is_reversed: #the layer that applies first is at the rear of the queue
+            #worst case complexity = O(1)
+            self.our_queue.serve_rear()
+        #worst case complexity = O(1)
+        else:
+            #worst case complexity = O(1)
+            self.our_queue.serve() #using the queue method to remove layers from our queue if it is not empty 
+        #worst case complexity = O(1)
+        self.bump_version()
         #worst case complexity = O(1)
         return True #if a layer is removed return true 
         
@@ -209,7 +448,8 @@ class AdditiveLayerStore(LayerStore):
         returns a tuple in format (r,g,b) which is the colour for the current square
         worst case complexity is = O(n*apply) as we iterate through the queue and n is hte number of items in teh queue
         and the O(apply) is the complexity of hte apply function for the layer
-        best case complexity = O(1) where the queue is empty and we just return True
+        best case complexity = O(1) where the queue is empty and we just return start, or the colour is the one cached by the last call
+        the queue is only read, so no queue is built and the layers are not changed
         """
         #implmementing get colour 
         #worst case complexity = O(1)
@@ -217,51 +457,52 @@ class AdditiveLayerStore(LayerStore):
             #worst case complexity = O(1)
             return start #return the start tuple 
         #worst case complexity = O(1)
-        else:
-            #worst case complexity = O(1)
-            new_queue = CircularQueue(1000) #creating an empty circular queue
-            #worst case complexity = O(n) where n is the length of the queue
-            while not self.our_queue.is_empty(): #while our queue has layers in it
-                #worst case complexity = O(1)
-                oldest_layer = self.our_queue.serve() #remove the oldest layer that was added to the queue
-                #worst case complexity = O(1)
-                new_queue.append(oldest_layer) # add this oldest layer into our new circular queue
-                #worst case complexity = O(apply)
-                oldest_colour = oldest_layer.apply(start, timestamp, x, y) #using apply to get the oldest colour as a tuple from the oldest layer
-                #worst case complexity = O(1)
-                oldest_layer = None #oldest layer is updated to none so that it doesnt become more than one layer for the purpose of accessing the oldest colour only
-                #worst case complexity = O(1)
-                start = oldest_colour
-            #worst case complexity = O(1)
-            self.our_queue = new_queue
+        state = self.state() #read before the layers, so a change made during this read is not cached as seen
+        #worst case complexity = O(1)
+        colour = self.cached_color(start, timestamp, x, y, state) #the colour from last time, if nothing it depends on changed
+        #worst case complexity = O(1)
+        if colour is not None:
             #worst case complexity = O(1)
-            return oldest_colour
+            return colour
+        #worst case complexity = O(n) where n is the length of the queue
+        compiled = self.compiled(state) #the queue compiled once per change; layers before the last constant output layer cannot change the colour
+        #worst case complexity = O(s*apply) where s is the number of steps the chain compiled to
+        return self.remember_color(compiled.apply(start, timestamp, x, y), start, timestamp, x, y, compiled, state)
         
     def special(self):
         """
         When special is applied additive layer reverses the "ages" of each layer, so the oldest layer is now the youngest layer, etc
+        the queue is left as it is and is read from the other end from now on
         returns nothing
-        best and worst case complexity = O(1) as we will always transverse through the queue and the stack of length n
+        best and worst case complexity = O(1) only one assignment
         """
+        #worst case complexity = O(1)
+        self.catch_up() #applies any grid wide special this square has not seen yet
         #implementing special
         #worst case complexity = O(1)
-        temp_stack = ArrayStack(1000) #creating an empty array stack 
+        self.is_reversed = not self.is_reversed #acts as a toggle, like special in set layer store
         #worst case complexity = O(1)
-        new_queue = CircularQueue(1000) #creating a new circular queue
-        #worst case complexity = O(n) where n is hte length of the queue
-        for i in range (len(self.our_queue)): #going through the layers in our queue 
-            #worst case complexity = O(1)
-            self.current_layer = self.our_queue.serve() #removing each layer from our queue one by one in a first in first out order
-            #worst case complexity = O(1)
-            temp_stack.push(self.current_layer) # pushing each layer into a temporary stack 
-        #worst case complexity = O(n) where n is the length of the arraystack
-        for i in range(len(temp_stack)): #going through each layer pushed into the temporary stack
-            #worst case complexity = O(1)
-            current_item = temp_stack.pop() #popping/removing each layer in a last in first out orderr
+        self.bump_version()
+
+    def layers_in_order(self) -> Iterator[Layer]:
+        """
+        Iterates over the layers in the order they apply, without serving them from the queue.
+        best and worst case complexity = O(1) to start, and O(1) per layer
+        """
+        #worst case complexity = O(1)
+        if self.is_reversed != self.pending_special(): #grid wide specials this square has not seen yet are allowed for, not applied
             #worst case complexity = O(1)
-            new_queue.append(current_item) #as the layers are popped off the temp stack they are added into our new queue. this will be in reversed age order of layers
-        #worst case complexity = O(1) 
-        self.our_queue = new_queue # updating the self variable so it can be used everywhere else as the updated queue
+            return reversed(self.our_queue)
+        #worst case complexity = O(1)
+        return iter(self.our_queue)
+
+    def layer_chain(self) -> tuple[Layer, ...]:
+        """
+        Returns the layers applied to this square in order, without serving them from the queue.
+        best and worst case complexity = O(n) where n is the length of the queue
+        """
+        #worst case complexity = O(n) where n is the length of the queue
+        return tuple(self.layers_in_order())
 
 
 class SequenceLayerStore(LayerStore):
@@ -277,88 +518,147 @@ class SequenceLayerStore(LayerStore):
     def __init__(self):
         """
         initialises the Sequence layer store class
-        array sorted list = storing our layers in an array sorted list 
+        layer set = a bit set of the applying layers, holding layer.index + 1 (bset elements must be positive)
+        count = the number of applying layers, kept here as len() of a bset counts bits
+        index order = the applying layers sorted by index, worked out the first time it is needed after a change and None until then
+        name order = the name ranks of the applying layers in sorted order, for finding the median name.
+        it is only built the first time special is used, and kept up to date by add and erase from then on,
+        so it holds one int per applying layer however many layers are registered
+        name ranks = the registry name order the name order was built for
         returns nothing
         worst aand best case Big O complexity = O(1)
         """
         #worst case complexity = O(1)
-        self.array_sorted_list = ArraySortedList(1000) #creating an empty array sorted list
+        self.layer_set = BSet()
         #worst case complexity = O(1)
-        self.lexico = ArraySortedList(1000) #lexicogrphically ordered empty array sorted list
-    
+        self.count = 0
+        #worst case complexity = O(1)
+        self.index_order = ()
+        #worst case complexity = O(1)
+        self.name_order = None
+        #worst case complexity = O(1)
+        self.name_ranks = None
+
+    def __contains__(self, layer: Layer) -> bool:
+        """
+        checks whether a layer is applying in this store
+        argument-
+            layer: the layer to look for
+        return: true if the layer is applying
+        best and worst case complexity = O(1), a single bit test
+        """
+        #worst case complexity = O(1)
+        return bool((layer.index + 1) in self.layer_set)
+
     def add(self,layer):
         """
         adds a layer the sequential layer store 
-        if the sequential layer store list is full then no layer is added and the function will return boolean false
-        if the sequential layer store queue is not full then a layer is added and the function will return a boolean true
+        if the sequential layer store already holds MAX_LAYERS layers then no layer is added and the function will return boolean false
+        otherwise a layer is added and the function will return a boolean true
         layer: the layer type chosen to be applied by the user of type Layer
-        returns nothing
-
-        Worst case Big O complexity = O(N) where n is the length of the arraysortedlist, when we go through every
-        value in the array_Srotedlist to find the item
-        best case complexity = O(1) where the list is full and False is returned
+        returns a boolean, true if the layer is applying after the call
 
+        best case complexity = O(1), a bit test and a bit set
+        worst case complexity = O(n) where n is the number of applying layers, when the name order is kept up to date
         """
         #worst case complexity = O(1)
-        if self.array_sorted_list.is_full() or self.lexico.is_full():
+        if type(layer) != Layer:
             #worst case complexity = O(1)
             return False
         #worst case complexity = O(1)
-        else:
+        if layer in self: #the layer is already applying
             #worst case complexity = O(1)
-            if type(layer)==Layer:
-                #worst case complexity = O(n) where n is the length of the array sorted list
-                for i in range(len(self.array_sorted_list)):
-                    #worst case complexity = O(1)
-                    if self.lexico[i].value == layer:
-                        #worst case complexity = O(1)
-                        if self.lexico[i].key == layer.name:
-                            #worst case complexity = O(1)
-                            return True
-                    #worst case complexity = O(1)
-                    else: 
-                        #worst case complexity = O(1)
-                        continue
-                #worst case complexity = O(n) where n is the length of the array sorted list
-                self.array_sorted_list.add(ListItem(layer, layer.index))
-                #worst case complexity = O(n) where n is the length of the array sorted list
-                self.lexico.add(ListItem(layer, layer.name))
-                #worst case complexity = O(1)
-                return True
+            return True
+        #worst case complexity = O(1)
+        if self.count >= self.MAX_LAYERS:
             #worst case complexity = O(1)
-            else:
-                #worst case complexity = O(1)
-                return False
-
-
+            return False
+        #worst case complexity = O(1)
+        self.layer_set.add(layer.index + 1)
+        #worst case complexity = O(1)
+        self.count += 1
+        #worst case complexity = O(n)
+        self.changed(layer, 1)
+        #worst case complexity = O(1)
+        return True
 
     def erase(self,layer: Layer) ->bool:
         """
-        erase removes an item from the sequential layer store, by finding the positin that it is in and using the delete at index
-        returns a boolean value based on whether an item was erased or not
+        erase makes sure the layer is no longer applying
+        returns a boolean value, false only when the store was empty
         takes input of layer, of type Layer
-        worse case Big O complexity = O(n^2) as we go through every value in the arraysorted list and we delete at index which also has
-        a complexity of O(n).
-        best case complexity = O(1) where the list is empty and False is returned
-        
+        best case complexity = O(1), a bit test and a bit clear
+        worst case complexity = O(n) where n is the number of applying layers, when the name order is kept up to date
         """
         #worst case complexity = O(1)
-        if self.array_sorted_list.is_empty(): # makesure that the list is not empty
+        if self.count == 0: # makesure that the store is not empty
             #worst case complexity = O(1)
             return False
-        #worst case complexity = O(n) where n is the length of teh array sorted list
-        for i in range(self.array_sorted_list.length):
+        #worst case complexity = O(1)
+        if layer in self:
             #worst case complexity = O(1)
-            if self.array_sorted_list[i].value == layer and self.array_sorted_list[i].key == layer.index: #finding the index of the layer we are trying to delete
-                #worst case complexity = O(n) the complexitiy of delete at index is O(n) due to shuffle left
-                self.array_sorted_list.delete_at_index(i)#using the sorted lists method to delete the layer at the index we want
+            self.layer_set.remove(layer.index + 1)
             #worst case complexity = O(1)
-            if self.lexico[i].value == layer and self.lexico[i].key == layer.name:
-                #worst case complexity = O(n) the complexitiy of delete at index is O(n)
-                self.lexico.delete_at_index(i)
+            self.count -= 1
+            #worst case complexity = O(n)
+            self.changed(layer, -1)
         #worst case complexity = O(1)
         return True
-    
+
+    def changed(self, layer: Layer, delta: int) -> None:
+        """
+        records that a layer was added (delta 1) or erased (delta -1)
+        the index order is forgotten, so it is worked out again from the layer set when next needed
+        best case complexity = O(1) when there is no name order
+        worst case complexity = O(n) where n is the number of applying layers, to shift the name order along
+        """
+        #worst case complexity = O(1)
+        self.index_order = None
+        #worst case complexity = O(1)
+        self.bump_version()
+        #worst case complexity = O(1)
+        if self.name_order is not None and layer.index in self.name_ranks.rank:
+            #worst case complexity = O(1)
+            rank = self.name_ranks.rank[layer.index]
+            #worst case complexity = O(1)
+            if delta > 0:
+                #worst case complexity = O(n), a search then a shift of the ranks after it
+                insort(self.name_order, rank)
+            else:
+                #worst case complexity = O(n), a search then a shift of the ranks after it
+                del self.name_order[bisect_left(self.name_order, rank)]
+
+    def layers_by_index(self) -> tuple[Layer, ...]:
+        """
+        Returns the applying layers in order of index, reading the set bits from lowest to highest.
+        best case complexity = O(1) when nothing changed since it was last worked out
+        worst case complexity = O(n) where n is the number of applying layers
+        """
+        #worst case complexity = O(1)
+        if self.index_order is None:
+            #worst case complexity = O(n) where n is the number of applying layers
+            self.index_order = tuple(LAYERS[item - 1] for item in self.layer_set)
+        #worst case complexity = O(1)
+        return self.index_order
+
+    def layer_by_name_rank(self, k: int) -> Layer:
+        """
+        Returns the applying layer that comes k-th (from 0) in lexicographic order of name.
+        the name order is built here if there is none yet, or if layers were registered since it was built
+        best case complexity = O(1)
+        worst case complexity = O(n log n) where n is the number of applying layers, when the name order has to be built
+        """
+        #worst case complexity = O(1)
+        ranks = name_ranks()
+        #worst case complexity = O(1)
+        if self.name_order is None or self.name_ranks is not ranks:
+            #worst case complexity = O(n log n)
+            self.name_order = sorted(ranks.rank[item - 1] for item in self.layer_set)
+            #worst case complexity = O(1)
+            self.name_ranks = ranks
+        #worst case complexity = O(1)
+        return ranks.by_rank[self.name_order[k]]
+
     def get_color(self, start, timestamp, x, y) -> tuple[int, int, int]:
         """
         
@@ -370,47 +670,51 @@ class SequenceLayerStore(LayerStore):
             -y: of type integer, the y coordinate of the square
 
 
-        Worst Case Big O complexity = O(n) where n in the length of the array sorted list.
-        best base complexity = O(1) where the array sorted list is empty and start tuple is returned
+        Worst Case Big O complexity = O(n*apply) where n in the number of applying layers.
+        best base complexity = O(1) where the store is empty and start tuple is returned, or the colour is the one cached by the last call
         """
-        #worst case complexity = O(1) as is_empty() = O(1)
-        if not self.array_sorted_list.is_empty():
-            #worse case complexity = O(n) where n is the length of the array sorted list.
-            for i in range (len(self.array_sorted_list)):
-                #worse case complexity = O(1)
-                layer = self.array_sorted_list[i].value
-                #worse case complexity = O(1) #CHECK THIS ONE
-                colour = layer.apply(start, timestamp,x,y)
-                ##worse case complexity = O(1)
-                start = colour
+        #worse case complexity = O(1)
+        if self.count == 0:
             #worse case complexity = O(1)
-        return start
+            return start
+        #worse case complexity = O(1)
+        state = self.state() #read before the layers, so a change made during this read is not cached as seen
+        #worse case complexity = O(1)
+        colour = self.cached_color(start, timestamp, x, y, state) #the colour from last time, if nothing it depends on changed
+        #worse case complexity = O(1)
+        if colour is not None:
+            #worse case complexity = O(1)
+            return colour
+        #worse case complexity = O(n) where n is the number of applying layers
+        compiled = self.compiled(state) #evaluation starts at the topmost constant output layer
+        #worse case complexity = O(s*apply) where s is the number of steps the chain compiled to
+        return self.remember_color(compiled.apply(start, timestamp, x, y), start, timestamp, x, y, compiled, state)
 
-    
-    
     def special(self):
         """
          special for sequential layer store removes the median "applying" layer based on its name, lexicographically ordered.
          - in the case of an even number of layers we select the lexicographically smaller ordered name
          no values are returned
-         Worse case Big O = O(n) when the erase is called which has a complexity of O(n)
-        best case complexity = O(1) where the list is empty and an expeption is raised
+         best case complexity = O(1) where the store is empty and an expeption is raised
+         otherwise O(n) where n is the number of applying layers, to select the median and erase it from the name order
+         worst case complexity = O(n log n) the first time, when the name order is built
         """
         #worst case complexity = O(1)
-        if len(self.array_sorted_list) == 0:
+        if self.count == 0:
             #worst case complexity = O(1)
             raise ValueError("nothing to apply special to ")
-        #wost case complexity = O(1)
-        if len(self.lexico)%2!=0: # check if the length is even or not
-            #worst case complexity = O(1)
-            median_pos = self.lexico.length//2 #if it not even the median position is length divided by 2
-        # worst case complexitity = O(1)
-        elif len(self.lexico)%2 == 0: # if it is even
-            #worst case complexity = O(1)
-            median_pos = self.lexico.length//2 - 1 # median pos is hte len divided by 2 -1
-        #worse case complexity = O(1)
-        lexico_del = self.lexico[median_pos] #get the layer to delete
+        #worst case complexity = O(1)
+        median_pos = (self.count - 1) // 2 # the middle for an odd count, the lower middle for an even count
         #worse case complexity = O(1)
-        layer = lexico_del.value # get the layer from the listitem
+        layer = self.layer_by_name_rank(median_pos) #get the layer to delete
         #worse case complexity = O(n)
         self.erase(layer) #erase the layer
+
+    def layer_chain(self) -> tuple[Layer, ...]:
+        """
+        Returns the applying layers in order of index.
+        best case complexity = O(1) when nothing changed since it was last worked out
+        worst case complexity = O(n) where n is the number of applying layers
+        """
+        #worst case complexity = O(n) where n is the number of applying layers
+        return self.layers_by_index()
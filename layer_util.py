@@ -6,10 +6,8 @@ No need to edit unless adding new features.
 
 from __future__ import annotations
 from dataclasses import dataclass, field
-from data_structures.referential_array import ArrayR
-
-LAYERS: ArrayR[Layer] = ArrayR(20)
-cur_layer_index = 0
+import numpy as np
+import importlib
 
 @dataclass
 class Layer:
@@ -18,12 +16,53 @@ class Layer:
     apply: function
     name: str = field(init=False)
     bg: tuple[int, int, int] | None = None
+    vectorised: function | None = None
+    # What the output depends on. Unmarked layers are assumed to depend on
+    # position and colour; time_varying is opt in (see `layer_properties`).
+    time_varying: bool = False
+    position_varying: bool = True
+    color_dependent: bool = True
+    # Output ignores time, position and colour. Worked out from the flags above unless given.
+    constant_output: bool | None = None
+    # Per channel (a, b, lo, hi) if the layer maps each channel c to min(hi, max(lo, a*c + b)), see `channel_map`.
+    channel_map: tuple | None = None
+    # (3, 256) table of each channel's output for each input value, if the layer maps each channel
+    # on its own from its value alone. Built from channel_map, or tabulated for `per_channel` layers.
+    lut: np.ndarray | None = None
 
     def __post_init__(self):
         if hasattr(self.apply, "__bg__"):
             self.bg = self.apply.__bg__
+        if hasattr(self.apply, "__vectorised__"):
+            self.vectorised = self.apply.__vectorised__
+        if hasattr(self.apply, "__channel_map__"):
+            self.channel_map = self.apply.__channel_map__
+        for key, value in getattr(self.apply, "__layer_properties__", {}).items():
+            setattr(self, key, value)
+        if getattr(self.apply, "__layer_properties__", {}).get("constant_output") is None:
+            self.constant_output = not (self.time_varying or self.position_varying or self.color_dependent)
+        if self.channel_map is not None:
+            self.lut = channel_map_lut(self.channel_map)
+        elif getattr(self.apply, "__per_channel__", False):
+            self.lut = tabulate_lut(self.apply)
         self.name = self.apply.__name__
 
+    def apply_array(self, color: np.ndarray, timestamp, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Apply this layer to many squares at once.
+
+        `color` is a (3, n) array of channel planes and `x`, `y` hold the
+        n square positions. Returns the new (3, n) channel planes.
+        Uses the layer's array form if it has one, otherwise applies
+        the scalar function square by square.
+        """
+        if self.vectorised is not None:
+            return self.vectorised(color, timestamp, x, y)
+        return np.array([
+            self.apply(tuple(c), timestamp, px, py)
+            for c, px, py in zip(color.T.tolist(), x.tolist(), y.tolist())
+        ], dtype=np.int64).reshape(-1, 3).T
+
 class background(object):
     """Simple decorator to add a __bg__ property to a layer
 
@@ -43,22 +82,278 @@ class background(object):
         func.__bg__ = self.val
         return layer
 
-def register(func):
+class vectorised(object):
+    """Simple decorator to add an array form (__vectorised__) to a layer
+
+    The array form takes (3, n) channel planes plus arrays of the n x and y
+    positions, and must give the same colours as the scalar function.
+
+    Usage:  @register
+            @vectorised(my_special_layer_array)
+            def my_special_layer(...):
+    """
+    def __init__(self, array_func):
+        self.val = array_func
+
+    def __call__(self, layer: function|Layer):
+        # This could be applied before or after registration
+        if isinstance(layer, Layer):
+            layer.vectorised = self.val
+            func = layer.apply
+        else:
+            func = layer
+        func.__vectorised__ = self.val
+        return layer
+
+class layer_properties(object):
+    """Simple decorator to say what a layer's output depends on (__layer_properties__)
+
+    Takes any of time_varying, position_varying, color_dependent and
+    constant_output. If constant_output is not given, a layer is
+    constant_output when it varies with none of time, position and colour.
+    Layers before a constant_output layer in a chain cannot change its colour,
+    so they are skipped.
+
+    Usage:  @register
+            @layer_properties(position_varying=False, color_dependent=False)
+            def my_special_layer(...):
+    """
+    KEYS = ("time_varying", "position_varying", "color_dependent", "constant_output")
+
+    def __init__(self, **properties):
+        for key in properties:
+            if key not in self.KEYS:
+                raise TypeError(f"Unknown layer property {key}")
+        self.val = properties
+
+    def __call__(self, layer: function|Layer):
+        # This could be applied before or after registration
+        if isinstance(layer, Layer):
+            func = layer.apply
+        else:
+            func = layer
+        func.__layer_properties__ = {**getattr(func, "__layer_properties__", {}), **self.val}
+        if isinstance(layer, Layer):
+            for key, value in self.val.items():
+                setattr(layer, key, value)
+            if func.__layer_properties__.get("constant_output") is None:
+                layer.constant_output = not (layer.time_varying or layer.position_varying or layer.color_dependent)
+        return layer
+
+class channel_map(object):
+    """Simple decorator to describe a layer as a map on each channel (__channel_map__)
+
+    Takes one (a, b, lo, hi) for every channel, or a single one used for all
+    three, meaning the layer maps channel c to min(hi, max(lo, a*c + b)).
+    a must be -1, 0 or 1, and lo or hi may be None for no bound.
+    Runs of such layers are fused into a single map (see chain_compiler).
+    The map must give exactly the same colours as the scalar layer.
+
+    Usage:  @register
+            @channel_map((1, 40, None, 255))
+            def my_special_layer(...):
+    """
+    def __init__(self, *channels):
+        if len(channels) == 1:
+            channels = channels * 3
+        if len(channels) != 3 or any(a not in (-1, 0, 1) for a, _, _, _ in channels):
+            raise ValueError("channel_map needs (a, b, lo, hi) with a in (-1, 0, 1), for one or all three channels")
+        self.val = tuple(tuple(channel) for channel in channels)
+
+    def __call__(self, layer: function|Layer):
+        # This could be applied before or after registration
+        if isinstance(layer, Layer):
+            layer.channel_map = self.val
+            layer.lut = channel_map_lut(self.val)
+            func = layer.apply
+        else:
+            func = layer
+        func.__channel_map__ = self.val
+        return layer
+
+def per_channel(layer: function|Layer):
+    """Simple decorator to mark a layer that maps each channel on its own
+
+    The new value of each channel must depend only on its old value, not on
+    the other channels, the time or the position. The layer's LUT form is
+    then tabulated from the scalar function, and runs of such layers are
+    composed by table lookups (see chain_compiler). Also marks the layer
+    as not position_varying.
+    Layers with a `channel_map` get a LUT form without this.
+
+    Usage:  @register
+            @per_channel
+            def my_special_layer(...):
+    """
+    # This could be applied before or after registration
+    if isinstance(layer, Layer):
+        layer.lut = tabulate_lut(layer.apply)
+        func = layer.apply
+    else:
+        func = layer
+    func.__per_channel__ = True
+    return layer_properties(position_varying=False)(layer)
+
+def channel_map_lut(channels) -> np.ndarray:
+    """
+    The (3, 256) LUT of a channel map, as given to `channel_map`.
+    """
+    values = np.arange(256, dtype=np.int64)
+    return np.array([
+        np.clip(a * values + b, -np.inf if lo is None else lo, np.inf if hi is None else hi)
+        for a, b, lo, hi in channels
+    ]).astype(np.int64)
+
+def tabulate_lut(apply) -> np.ndarray:
+    """
+    The (3, 256) LUT of a per channel layer function, found by applying it to every grey.
+    Raises ValueError if an output is outside 0..255, as LUTs are composed by indexing.
+    """
+    lut = np.array([apply((value, value, value), 0, 0, 0) for value in range(256)], dtype=np.int64).T
+    if lut.min() < 0 or lut.max() > 255:
+        raise ValueError(f"{apply.__name__} gives channel values outside 0..255")
+    return lut
+
+def from_last_constant(chain) -> tuple[Layer, ...]:
+    """
+    The end of a layer chain that decides its colour: everything from the last
+    constant_output layer on, or the whole chain if it has none.
+    complexity- O(n) where n is the length of the chain, less when a constant layer is near the end
+    """
+    for i in range(len(chain) - 1, -1, -1):
+        if chain[i].constant_output:
+            return tuple(chain[i:])
+    return tuple(chain)
+
+class NameRanks:
+    """
+    Registered layers in lexicographic order of name (ties broken by index),
+    with the rank of each layer index in that order.
+    """
+
+    def __init__(self, layers) -> None:
+        """
+        complexity- O(n log n) where n is the number of layers, to sort them
+        """
+        self.by_rank = sorted(layers, key=lambda layer: (layer.name, layer.index))
+        self.rank = {layer.index: rank for rank, layer in enumerate(self.by_rank)}
+
+    def __len__(self) -> int:
+        return len(self.by_rank)
+
+class LayerRegistry:
+    """
+    Every registered layer, looked up by index or by name.
+
+    A layer's index is its id: layers are numbered 0, 1, 2, ... in the order
+    they are registered and keep their number for as long as the program runs,
+    so grids and files can refer to layers by small integers.
+    The registry grows as layers are registered.
+
+    Layer modules added with add_module are imported the first time the
+    registry is read, so their layers register themselves then.
+    """
+
+    def __init__(self, modules=()) -> None:
+        self.by_index: dict[int, Layer] = {}
+        self.by_name: dict[str, Layer] = {}
+        self.modules = list(modules)
+        self._name_ranks = None
+
+    def add_module(self, module: str) -> None:
+        """Import the layer module `module` the next time the registry is read."""
+        self.modules.append(module)
+
+    def load(self) -> None:
+        """Import any layer modules not imported yet."""
+        while self.modules:
+            importlib.import_module(self.modules.pop(0))
+
+    def register(self, func) -> Layer:
+        """
+        Register func as a new layer, with the next free index.
+        :raises ValueError: if a layer with the same name is registered.
+        """
+        if func.__name__ in self.by_name:
+            raise ValueError(f"A layer named {func.__name__} is already registered")
+        layer = Layer(len(self.by_index), func)
+        self.by_index[layer.index] = layer
+        self.by_name[layer.name] = layer
+        self._name_ranks = None
+        return layer
+
+    def __getitem__(self, index: int) -> Layer:
+        """
+        The layer with this index.
+        :raises IndexError: if no layer has this index.
+        """
+        if self.modules:
+            self.load()
+        try:
+            return self.by_index[index]
+        except KeyError:
+            raise IndexError(index) from None
+
+    def named(self, name: str) -> Layer:
+        """
+        The layer with this name.
+        :raises KeyError: if no layer has this name.
+        """
+        if self.modules:
+            self.load()
+        return self.by_name[name]
+
+    def __len__(self) -> int:
+        if self.modules:
+            self.load()
+        return len(self.by_index)
+
+    def __iter__(self):
+        """The layers in order of index."""
+        if self.modules:
+            self.load()
+        return iter(list(self.by_index.values()))
+
+    def name_ranks(self) -> NameRanks:
+        """
+        The NameRanks of the registered layers.
+        The same object is returned until another layer is registered.
+        """
+        if self.modules:
+            self.load()
+        if self._name_ranks is None:
+            self._name_ranks = NameRanks(self.by_index.values())
+        return self._name_ranks
+
+LAYERS = LayerRegistry(["layers"])
+
+def register(func=None, **properties):
     """
     Layer register function.
 
     Usage:  @register
             def my_special_layer(...):
 
+    or, with the same properties as `layer_properties`,
+            @register(position_varying=False)
+            def my_special_layer(...):
+
     In order to actually confirm this registration,
     you'll need to import the file containing the layer definition
     """
-    global cur_layer_index
-    LAYERS[cur_layer_index] = Layer(cur_layer_index, func)
-    cur_layer_index += 1
-    return LAYERS[cur_layer_index-1]
-#LAYER[layer.index] = 
+    if func is None:
+        return lambda func: register(func, **properties)
+    if properties:
+        layer_properties(**properties)(func)
+    return LAYERS.register(func)
+
+def name_ranks() -> NameRanks:
+    """
+    The NameRanks of the registered layers.
+    The same object is returned until another layer is registered.
+    """
+    return LAYERS.name_ranks()
 
 def get_layers():
-    import layers # Force all registrations to occur.
+    LAYERS.load() # Force all registrations to occur.
     return LAYERS
@@ -1,12 +1,46 @@
 """
 All layers are defined here.
+
+Each layer may also have an array form (see `vectorised`), which takes
+(3, n) channel planes and the x / y positions of n squares at once.
+Array forms must give exactly the same colours as the scalar layer.
+Layers that ignore the position or the incoming colour say so with
+`layer_properties`, so constant layers are known (see `from_last_constant`),
+and layers that change each channel by a clamped add or flip give it with
+`channel_map`, so runs of them can be fused (see chain_compiler).
 """
 
 import colorsys
-from layer_util import background, register
+import numpy as np
+from layer_util import background, channel_map, layer_properties, register, vectorised
+
+def _constant_array(color, value):
+    return np.broadcast_to(np.array(value, dtype=np.int64).reshape(3, 1), color.shape).copy()
+
+def _hls_channel_array(m1, m2, hue):
+    # Mirrors colorsys._v, with each branch as a np.select case.
+    hue = hue % 1.0
+    return np.select(
+        [hue < colorsys.ONE_SIXTH, hue < 0.5, hue < colorsys.TWO_THIRD],
+        [m1 + (m2-m1)*hue*6.0, m2, m1 + (m2-m1)*(colorsys.TWO_THIRD-hue)*6.0],
+        m1,
+    )
+
+def _rainbow_array(color, timestamp, x, y):
+    h = (timestamp/20 + x/20 + y/20)%1
+    l, s = 0.6, 0.6
+    # Same branch as colorsys.hls_to_rgb for l > 0.5
+    m2 = l+s-(l*s)
+    m1 = 2.0*l - m2
+    return np.stack([
+        np.trunc(255*_hls_channel_array(m1, m2, hue)).astype(np.int64)
+        for hue in (h+colorsys.ONE_THIRD, h, h-colorsys.ONE_THIRD)
+    ])
 
 @register
 @background(200, 0, 120)
+@vectorised(_rainbow_array)
+@layer_properties(time_varying=True, color_dependent=False)
 def rainbow(color, timestamp, x, y):
     return tuple(
         int(255*x)
@@ -15,11 +49,20 @@ def rainbow(color, timestamp, x, y):
 
 @register
 @background(170, 170, 170)
+@vectorised(lambda color, timestamp, x, y: _constant_array(color, (0, 0, 0)))
+@layer_properties(position_varying=False, color_dependent=False)
+@channel_map((0, 0, None, None))
 def black(color, timestamp, x, y):
     return (0, 0, 0)
 
+def _lighten_array(color, timestamp, x, y):
+    return np.minimum(255, color + 40)
+
 @register
 @background(240, 240, 240)
+@vectorised(_lighten_array)
+@layer_properties(position_varying=False)
+@channel_map((1, 40, None, 255))
 def lighten(color, timestamp, x, y):
     return tuple(
         min(255, x + 40)
@@ -28,6 +71,9 @@ def lighten(color, timestamp, x, y):
 
 @register
 @background(0, 255, 255)
+@vectorised(lambda color, timestamp, x, y: 255 - color)
+@layer_properties(position_varying=False)
+@channel_map((-1, 255, None, None))
 def invert(color, timestamp, x, y):
     return tuple(
         255 - c
@@ -36,21 +82,63 @@ def invert(color, timestamp, x, y):
 
 @register
 @background(255, 0, 0)
+@vectorised(lambda color, timestamp, x, y: _constant_array(color, (255, 0, 0)))
+@layer_properties(position_varying=False, color_dependent=False)
+@channel_map((0, 255, None, None), (0, 0, None, None), (0, 0, None, None))
 def red(color, timestamp, x, y):
     return (255, 0, 0)
 
 @register
 @background(0, 255, 0)
+@vectorised(lambda color, timestamp, x, y: _constant_array(color, (0, 255, 0)))
+@layer_properties(position_varying=False, color_dependent=False)
+@channel_map((0, 0, None, None), (0, 255, None, None), (0, 0, None, None))
 def green(color, timestamp, x, y):
     return (0, 255, 0)
 
 @register
 @background(0, 0, 255)
+@vectorised(lambda color, timestamp, x, y: _constant_array(color, (0, 0, 255)))
+@layer_properties(position_varying=False, color_dependent=False)
+@channel_map((0, 0, None, None), (0, 0, None, None), (0, 255, None, None))
 def blue(color, timestamp, x, y):
     return (0, 0, 255)
 
+def _lcg_jumps(max_steps):
+    """
+    Coefficients (a, c) such that n steps of sparkle's generator
+    take `other` to (a * other + c) % (1 << 31).
+    """
+    a, c = 1, 0
+    jumps = [(a, c)]
+    for _ in range(max_steps):
+        a, c = (1103515245 * a) % (1 << 31), (1103515245 * c + 12345) % (1 << 31)
+        jumps.append((a, c))
+    return np.array([a for a, _ in jumps], dtype=np.int64), np.array([c for _, c in jumps], dtype=np.int64)
+
+# sparkle runs its generator between 10 and 26 times.
+_SPARKLE_A, _SPARKLE_C = _lcg_jumps(10 + 16)
+
+def _sparkle_array(color, timestamp, x, y):
+    ts = np.trunc((timestamp + x/3 + y/5) * 3).astype(np.int64)
+    steps = 10 + (ts * 31 % 17)
+    a = _SPARKLE_A[steps]
+    c = _SPARKLE_C[steps]
+    # Both factors stay below 2 ** 32, so the product cannot overflow int64.
+    other = (a * x + c) % (1 << 31)
+    other += y
+    other = (a * other + c) % (1 << 31)
+    other = (other & ((1 << 31)-1)) >> 16
+    return np.where(
+        other/(1 << 15) < 0.1,
+        _lighten_array(color, timestamp, x, y),
+        _darken_array(color, timestamp, x, y),
+    )
+
 @register
 @background(100, 170, 255)
+@vectorised(_sparkle_array)
+@layer_properties(time_varying=True)
 def sparkle(color, timestamp, x, y):
     ts = int((timestamp + x/3 + y/5) * 3)
     other = x
@@ -65,8 +153,14 @@ def sparkle(color, timestamp, x, y):
         return lighten.apply(color, timestamp, x, y)
     return darken.apply(color, timestamp, x, y)
 
+def _darken_array(color, timestamp, x, y):
+    return np.maximum(0, color - 40)
+
 @register
 @background(30, 30, 30)
+@vectorised(_darken_array)
+@layer_properties(position_varying=False)
+@channel_map((1, -40, 0, None))
 def darken(color, timestamp, x, y):
     return tuple(
         max(0, x - 40)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+"""
+Lazily allocated LayerStores for a Grid.
+
+Every square of a lazy column starts out sharing one empty store per draw style,
+which is only ever read. The first time a square is changed (add, erase or special)
+it gets a LayerStore of its own, so a grid only holds stores for the squares that
+were actually painted.
+
+SET and ADD stores follow the grid's GridSpecials, so grid wide specials reach a new
+store too: it starts having seen none of them, allows for them when read, and catches up when first changed.
+"""
+
+from typing import Callable
+from layer_store import GridSpecials, LayerStore, SetLayerStore, AdditiveLayerStore, SequenceLayerStore
+from layer_util import Layer
+
+STORE_TYPES = {
+    "SET": SetLayerStore,
+    "ADD": AdditiveLayerStore,
+    "SEQUENCE": SequenceLayerStore,
+}
+
+# Shared by every untouched square of every grid. Never changed.
+EMPTY_STORES = {draw_style: store_type() for draw_style, store_type in STORE_TYPES.items()}
+
+class LazyColumn:
+    """One column of squares, holding stores only for squares that have been changed."""
+
+    def __init__(self, draw_style, height: int, specials: GridSpecials | None = None) -> None:
+        """
+        specials is the grid wide special count the column's stores follow, if any.
+        complexity- O(1), no store is allocated
+        """
+        self.store_type: Callable[[], LayerStore] = STORE_TYPES[draw_style]
+        self.empty = EMPTY_STORES[draw_style]
+        self.height = height
+        self.specials = specials
+        self.stores = {}
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __getitem__(self, y: int) -> LayerStore:
+        """
+        The store of square y, or a stand-in that allocates one when first changed.
+        complexity- O(1)
+        """
+        if not 0 <= y < self.height:
+            raise IndexError(y)
+        store = self.stores.get(y)
+        if store is None:
+            return LazyLayerStore(self, y)
+        return store
+
+    def store_at(self, y: int) -> LayerStore:
+        """
+        The store of square y for reading only. Untouched squares give the shared empty store.
+        complexity- O(1)
+        """
+        return self.stores.get(y, self.empty)
+
+    def materialise(self, y: int) -> LayerStore:
+        """
+        The store of square y, allocating it if the square is still untouched.
+        complexity- O(1) plus the cost of creating the store
+        """
+        store = self.stores.get(y)
+        if store is None:
+            store = self.store_type()
+            store.grid_specials = self.specials
+            self.stores[y] = store
+        return store
+
+
+class LazyLayerStore(LayerStore):
+    """Stand-in for an untouched square: reads from the shared empty store, and writes to a new one."""
+
+    def __init__(self, column: LazyColumn, y: int) -> None:
+        self.column = column
+        self.y = y
+
+    def __contains__(self, layer: Layer) -> bool:
+        return layer in self.column.store_at(self.y)
+
+    def add(self, layer: Layer) -> bool:
+        return self.column.materialise(self.y).add(layer)
+
+    def erase(self, layer: Layer) -> bool:
+        return self.column.materialise(self.y).erase(layer)
+
+    def special(self):
+        return self.column.materialise(self.y).special()
+
+    def get_color(self, start, timestamp, x, y) -> tuple[int, int, int]:
+        return self.column.store_at(self.y).get_color(start, timestamp, x, y)
+
+    def layer_chain(self) -> tuple[Layer, ...]:
+        return self.column.store_at(self.y).layer_chain()
@@ -1,17 +1,19 @@
+from __future__ import annotations
+import argparse
 import arcade
 import arcade.key as keys
-import math
+from canvas import CANVAS_MODES
 from grid import Grid
-from layer_util import get_layers, Layer
+from layer_util import get_layers
 from layers import lighten
-from undo import UndoTracker
 from action import *
 from layer_store import *
-from replay import ReplayTracker 
+from painter import Painter
+from rasteriser import segment_cells
 
 
-class MyWindow(arcade.Window):
-    """ Painter Window """
+class MyWindow(Painter, arcade.Window):
+    """ Painter Window. The painting logic (the STUDENT PART) is in painter.Painter. """
 
     SCREEN_WIDTH = 800
     SCREEN_HEIGHT = 700
@@ -26,11 +28,20 @@ class MyWindow(arcade.Window):
 
     BG = [255, 255, 255]
 
+    CANVAS_MODE = "texture"
+
+    # Where Ctrl+S saves the action log of the painting.
+    SAVE_PATH = "painting.json"
+
+    # Store grids as arrays, with squares sharing their layer stacks (see compact_grid.py).
+    # This saves memory on large grids, but compact squares recompile their layers on every read.
+    COMPACT_GRID = False
+
     # SCAFFOLD PART
     # Unless you're adding new features, you shouldn't need to touch this.
 
-    def __init__(self) -> None:
-        """Initialise visual and logic variables."""
+    def __init__(self, canvas_mode: str | None = None) -> None:
+        """Initialise visual and logic variables. canvas_mode picks one of canvas.CANVAS_MODES."""
         super().__init__(self.SCREEN_WIDTH, self.SCREEN_HEIGHT, self.SCREEN_TITLE)
         arcade.set_background_color(self.BG)
         self.grid: Grid = None
@@ -41,11 +52,12 @@ class MyWindow(arcade.Window):
         self.y_timer = 0
         self.enable_ui = True
         self.replay_timer = 0
+        self.canvas_mode = canvas_mode or self.CANVAS_MODE
         self.on_init()
 
     def reset(self) -> None:
         """Reset the screen."""
-        self.grid = Grid(self.draw_style, self.GRID_SIZE_X, self.GRID_SIZE_Y)
+        self.grid = Grid(self.draw_style, self.GRID_SIZE_X, self.GRID_SIZE_Y, compact=self.COMPACT_GRID)
         self.timestamp = 0
 
         self.selected_layer_index = -1
@@ -59,6 +71,9 @@ class MyWindow(arcade.Window):
         self.GRID_SQ_WIDTH = self.DRAW_PANEL / self.GRID_SIZE_X
         self.GRID_SQ_HEIGHT = self.SCREEN_HEIGHT / self.GRID_SIZE_Y
         self.LAYER_BUTTON_SIZE = self.SIDEBAR_WIDTH / 2
+        self.canvas = CANVAS_MODES[self.canvas_mode](
+            self.GRID_SIZE_X, self.GRID_SIZE_Y, self.GRID_SQ_WIDTH, self.GRID_SQ_HEIGHT,
+        )
         # Action button sprites
         self.action_buttons = arcade.SpriteList()
         self.draw_mode_button = arcade.Sprite(
@@ -110,7 +125,6 @@ class MyWindow(arcade.Window):
         self.clear()
         # UI - Layers
         for i, layer in enumerate(get_layers()):
-            if layer is None: break
             xstart = (i % 2) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
             xend = ((i % 2)+1) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
             ystart = self.SCREEN_HEIGHT - (i//2) * self.LAYER_BUTTON_SIZE
@@ -126,15 +140,7 @@ class MyWindow(arcade.Window):
         # UI - Draw Modes / Action buttons
         self.action_buttons.draw()
         # Grid
-        for x in range(self.GRID_SIZE_X):
-            for y in range(self.GRID_SIZE_Y):
-                arcade.draw_lrtb_rectangle_filled(
-                    self.GRID_SQ_WIDTH * x,
-                    self.GRID_SQ_WIDTH * (x+1),
-                    self.GRID_SQ_HEIGHT * (y+1),
-                    self.GRID_SQ_HEIGHT * y,
-                    self.grid[x][y].get_color(self.BG[:], self.timestamp, x, y),
-                )
+        self.canvas.draw_grid(self.grid, self.timestamp, self.BG)
 
     def on_mouse_press(self, x: int, y: int, button: int, modifiers: int) -> None:
         """Called when the mouse buttons are pressed."""
@@ -143,7 +149,6 @@ class MyWindow(arcade.Window):
                 return
             # Buttons
             for i, layer in enumerate(get_layers()):
-                if layer is None: break
                 xstart = (i % 2) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
                 xend = ((i % 2)+1) * self.LAYER_BUTTON_SIZE + self.DRAW_PANEL
                 ystart = self.SCREEN_HEIGHT - (i//2) * self.LAYER_BUTTON_SIZE
@@ -184,10 +189,15 @@ class MyWindow(arcade.Window):
                 self.on_special()
         else:
             self.dragging = True
+            if 0 <= self.selected_layer_index < len(get_layers()):
+                # Everything painted until the mouse is released is one stroke.
+                self.on_stroke_start(get_layers()[self.selected_layer_index])
             self.try_draw(x, y)
 
     def on_mouse_release(self, x: int, y: int, button: int, modifiers: int):
         """Called when the mouse buttons are released."""
+        if self.dragging:
+            self.on_stroke_end()
         self.dragging = False
         self.prev_drawn = None
         self.prev_pos = None
@@ -214,6 +224,8 @@ class MyWindow(arcade.Window):
         if self.y_pressed:
             self.on_redo()
             self.y_timer = 0.5
+        if keys.S == symbol and (modifiers & keys.MOD_CTRL):
+            self.on_save(self.SAVE_PATH)
 
     def on_key_release(self, symbol: int, modifiers: int) -> None:
         """Called when a keyboard key is released."""
@@ -226,34 +238,29 @@ class MyWindow(arcade.Window):
             return
         layer = get_layers()[self.selected_layer_index]
         if self.prev_pos is not None:
-            # Try draw in increments of 0.5 to avoid skipping squares.
-            mhat_dist = abs(x - self.prev_pos[0]) + abs(y - self.prev_pos[1])
-            increment = 0.5
-            points_to_draw = []
-            for d in range(1, math.ceil(mhat_dist/increment)+1):
-                distance = min(d * increment / mhat_dist, 1)
-                nx = distance * (x - self.prev_pos[0]) + self.prev_pos[0]
-                ny = distance * (y - self.prev_pos[1]) + self.prev_pos[1]
-                nx_pos = int(nx // self.GRID_SQ_WIDTH)
-                ny_pos = int(ny // self.GRID_SQ_HEIGHT)
-                points_to_draw.append((nx_pos, ny_pos))
+            # Every square the segment from the last mouse position passes through, each once and in order.
+            points_to_draw = segment_cells(self.prev_pos, (x, y), self.GRID_SQ_WIDTH, self.GRID_SQ_HEIGHT)
         else:
             x_pos = int(x // self.GRID_SQ_WIDTH)
             y_pos = int(y // self.GRID_SQ_HEIGHT)
             points_to_draw = [
                 (x_pos, y_pos)
             ]
+        stroke = []
         for px, py in points_to_draw:
             if self.prev_drawn is None or (px, py) != self.prev_drawn:
                 if 0 <= px < self.GRID_SIZE_X and 0 <= py < self.GRID_SIZE_Y:
-                    self.on_paint(layer, px, py)
+                    stroke.append((px, py))
                     self.prev_drawn = (px, py)
+        if stroke:
+            # Added to the stroke started when the mouse was pressed.
+            self.on_stroke(layer, stroke)
         self.prev_pos = (x, y)
 
     def start_replay(self) -> None:
         """Begin the replay mode."""
         self.enable_ui = False
-        self.grid = Grid(self.draw_style, self.GRID_SIZE_X, self.GRID_SIZE_Y)
+        self.grid = Grid(self.draw_style, self.GRID_SIZE_X, self.GRID_SIZE_Y, compact=self.COMPACT_GRID)
         self.replay_timer = self.REPLAY_TIMER_DELTA
         self.on_replay_start()
 
@@ -288,139 +295,17 @@ class MyWindow(arcade.Window):
             self.draw_style = Grid.DRAW_STYLE_SET
         self.reset()
 
-    # STUDENT PART
-
-    def on_init(self):
-        """
-        Initialisation that occurs after the system initialisation.
-        grid = creating grid object where the painting will occur of type Grid
-        tracker= undo tracker object is created to track the actions of type UndoTracker
-        replay tracker = keeps track of the actions that can be replayed later on of type ReplayTracker
-        action = the action of painting a layer of type PaintAction
-        complexity = as these are all assignments, the complexity is o(n) for best and worst case as  
-        the complexity of creating the grid is O(n) 
-        """
-        #worst case complexity = O(n) when creating hte grid
-        self.grid = Grid(Grid.DRAW_STYLE_SET, MyWindow.GRID_SIZE_X, MyWindow.GRID_SIZE_Y) 
-        #worst case complexity = O(1)
-        self.tracker = UndoTracker()
-        #worst case complexity = O(1)
-        self.replay_tracker = ReplayTracker()
-        #worst case complexity = O(1)
-        self.action = None
-       
-    
-    def on_reset(self):
-        """Called when a window reset is requested."""
-        pass
-
-    def on_paint(self, layer: Layer, px, py):
-        """
-        Called when a grid square is clicked on, which should trigger painting in the vicinity.
-        Vicinity squares outside of the range [0, GRID_SIZE_X) or [0, GRID_SIZE_Y) can be safely ignored.
-
-        arguments = 
-            layer: The layer being applied.(Layer)
-            px: x position of the brush. (int)
-            py: y position of the brush.(int)
-            action= action object is created to store all the steps when painting.(PaintAction)
-            steps= which layer has been added and where this has been applied. (PaintStep)
-        complexity = 
-        best- o(n) where n is the size of the coordinate_queue and this will only happen if we cannot call grid paint or grid paint is empty
-        worst- o(n) when in each iteration we call grid paint which has a complexity of o(n^2) and the coordinate queue is iterated through in the for loop which has a complexity of o(n)
-        
-        """
-        
-        # this implements our painting onto the grid and creates variable coordinate list
-        #worst case complexity = O(n)
-        coordinate_queue = self.grid.grid_paint(layer, px,  py, self.grid.brush_size)
-        #worst case complexity = O(1)
-        templist = []
-        
-        #this is to add the steps to paint action so that we can add the action to the undo tracker
-        #worst case complexity = O(n) where n is hte length of coordinate queue
-        for i in range(len(coordinate_queue)):
-            #worst case complexity = O(1)
-            values = coordinate_queue.serve()
-            #worst case complexity = O(1)
-            x_co = values[0] #assigning value to x coordinate
-            #worst case complexity = O(1)
-            y_co = values[1]  #assigning key to y coordinate
-            #worst case complexity = O(1)
-            affected_grid_square = tuple((x_co, y_co)) #the coordinates to which the layer in grid was applied 
-            #worst case complexity = O(1)
-            affected_layer = layer #the layer applied to the x y coordinates
-            #worst case complexity = O(1)
-            steps = PaintStep(affected_grid_square, affected_layer)
-            #worst case complexity = O(1)
-            templist.append(steps) # this is the list that we iinput into the paintaction.
-        #worst case complexity = O(1)
-        self.action = PaintAction(templist, False) # create the paint action object with all of the steps and whether it is a special or not. 
-        #worst case complexity = O(1)
-        self.tracker.add_action(self.action) #paintaction is pushed into undo stack and is special is passed as False
-        #add the action to the replay tracker too now.
-        #worst case complexity = O(1)
-        self.replay_tracker.add_action(self.action, False) #is undo is going to be false here.
-        
-    def on_undo(self):
-        """
-        Called when an undo is requested
-        will recognise if it is an undo action and add it to replay tracker
-        complexity- best and worst complexity is o(1) as add action has a complexity of o(1) and is constant CHECK THIS
-        """
-        #worst case complexity = O(1)
-        self.replay_tracker.add_action(self.action, True)   #undo action is added into replay tracker and marked true
-       
-    def on_redo(self):
-        """
-        Called when a redo is requested
-        will pass the redo action into the replay tracker 
-        complexity- best and worst complexity is o(1) as add action has a complexity of o(1) and constant.
-        """
-        #worst case complexity = O(1)
-        self.replay_tracker.add_action(self.action, False) #redo action is added into replay tracker and marked false
-
-    def on_special(self):
-        """
-        Called when the special action is requested.
-        will pass the special action into the replay tracker
-        complexity- best and worst complexity is o(1) as add action has a complexity of o(1) and constant.
-        """
-        #worst case complexity = O(1)
-        self.replay_tracker(self.action, False)
-
-    def on_replay_start(self):
-        """Called when the replay starting is requested."""
-        pass
-
-    def on_replay_next_step(self) -> bool:
-        """
-        Called when the next step of the replay is requested.
-        Returns whether the replay is finished.
-        """
-        return True
-
-    def on_increase_brush_size(self):
-        """
-        Called when an increase to the brush size is requested.
-        called from grid 
-        complexity- increase_brush_size function has a complexity of o(1) which is explained in grid.
-        """
-        #worst case complexity = O(1)
-        self.grid.increase_brush_size() #increases brush size by calling function made in grid
-
-    def on_decrease_brush_size(self):
-        """
-        Called when a decrease to the brush size is requested.
-        called from grids
-        complexity- decrease_brush_size function has a complexity of o(1) which is explained in grid.
-        """
-        #worst case complexity = O(1)
-        self.grid.decrease_brush_size() #decreases brush size by calling function made in grid 
-
 def main():
     """ Main function """
-    window = MyWindow()
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--canvas",
+        help="How the grid is drawn to the screen.",
+        choices=CANVAS_MODES.keys(),
+        default=MyWindow.CANVAS_MODE,
+    )
+    args = p.parse_args()
+    window = MyWindow(args.canvas)
     window.setup()
     arcade.run()
 
@@ -0,0 +1,203 @@
+from __future__ import annotations
+"""
+The painting logic of the window, apart from anything to do with arcade.
+
+MyWindow in main.py mixes Painter in, so the window's buttons and mouse call these
+methods. They only use self.grid and the trackers, so they can be used and tested
+without opening a window or importing arcade.
+"""
+
+from action import PaintAction
+from action_log import write_action_log
+from layer_util import Layer
+from replay import ReplayTracker
+from undo import UndoTracker
+
+class Painter:
+    """
+    Painting, undo/redo, special and replay for a window holding a grid in self.grid.
+    """
+
+    # STUDENT PART
+
+    def on_init(self):
+        """
+        Initialisation that occurs after the system initialisation.
+        The grid itself is created by reset, so the grid being painted is left alone here.
+        tracker= undo tracker object is created to track the actions of type UndoTracker
+        replay tracker = keeps track of the actions that can be replayed later on of type ReplayTracker
+        action = the action of painting a layer of type PaintAction
+        complexity = as these are all assignments, the complexity is o(1) for best and worst case
+        """
+        #worst case complexity = O(1)
+        self.tracker = UndoTracker()
+        #worst case complexity = O(1)
+        self.replay_tracker = ReplayTracker()
+        #worst case complexity = O(1)
+        self.action = None
+        #worst case complexity = O(1)
+        self.stroke_painted = None #the squares painted by the stroke being drawn, None between strokes
+       
+    
+    def on_reset(self):
+        """Called when a window reset is requested."""
+        pass
+
+    def on_paint(self, layer: Layer, px, py):
+        """
+        Called when a grid square is clicked on, which should trigger painting in the vicinity.
+        Vicinity squares outside of the range [0, GRID_SIZE_X) or [0, GRID_SIZE_Y) can be safely ignored.
+
+        arguments = 
+            layer: The layer being applied.(Layer)
+            px: x position of the brush. (int)
+            py: y position of the brush.(int)
+            action= action object is created to store all the steps when painting.(PaintAction)
+            steps= which layer has been added and where this has been applied, packed in the action.
+        complexity = 
+        best- o(n) where n is the size of the coordinate_queue and this will only happen if we cannot call grid paint or grid paint is empty
+        worst- o(n) when in each iteration we call grid paint which has a complexity of o(n^2) and the coordinate queue is iterated through in the for loop which has a complexity of o(n)
+        
+        """
+        
+        # this implements our painting onto the grid and creates variable coordinate list
+        #worst case complexity = O(n)
+        coordinate_queue = self.grid.grid_paint(layer, px,  py, self.grid.brush_size)
+        #worst case complexity = O(1)
+        self.action = PaintAction() # create the paint action object, which is not a special
+
+        #this is to add the steps to paint action so that we can add the action to the undo tracker
+        #worst case complexity = O(n) where n is hte length of coordinate queue
+        for i in range(len(coordinate_queue)):
+            #worst case complexity = O(1)
+            x_co, y_co = coordinate_queue.serve() #the coordinates to which the layer in grid was applied
+            #worst case complexity = O(1)
+            self.action.add_cell(x_co, y_co, layer) #the action packs the coordinates and the layer, no step object is made
+        #worst case complexity = O(1)
+        self.tracker.add_action(self.action) #paintaction is pushed into undo stack and is special is passed as False
+        #add the action to the replay tracker too now.
+        #worst case complexity = O(1)
+        self.replay_tracker.add_action(self.action, False) #is undo is going to be false here.
+        
+    def on_stroke_start(self, layer: Layer):
+        """
+        Called when the mouse is pressed on the grid, starting a stroke that lasts until on_stroke_end.
+        arguments-
+            layer: The layer being applied.(Layer)
+        complexity- best and worst complexity is o(1) as these are assignments
+        """
+        #worst case complexity = O(1)
+        self.action = PaintAction() #one action for the whole stroke
+        #worst case complexity = O(1)
+        self.stroke_painted = set()
+
+    def on_stroke(self, layer: Layer, points):
+        """
+        Called with the brush positions the mouse moved over, which are added to the stroke being drawn.
+        They are painted straight away, but every square of the stroke is painted once however many
+        positions cover it, and the whole stroke is one action.
+        A stroke is started if none is being drawn.
+        arguments-
+            layer: The layer being applied.(Layer)
+            points: the (x, y) brush positions, in order (list of tuples)
+        complexity- the complexity of grid paint stroke, O(p*b^2 + s*add)
+        """
+        #worst case complexity = O(1)
+        if self.stroke_painted is None:
+            self.on_stroke_start(layer)
+        #worst case complexity = O(p*b^2 + s*add), see Grid.paint_stroke
+        self.grid.paint_stroke(layer, points, self.grid.brush_size, self.action, self.stroke_painted)
+
+    def on_stroke_end(self):
+        """
+        Called when the mouse is released, ending the stroke.
+        The stroke is recorded as one action in the undo tracker and the replay tracker, unless it painted nothing.
+        complexity- best and worst complexity is o(1) as adding the action to the trackers is o(1)
+        """
+        #worst case complexity = O(1)
+        if self.stroke_painted is None:
+            return
+        #worst case complexity = O(1)
+        self.stroke_painted = None
+        #worst case complexity = O(1)
+        if len(self.action.refs) == 0: #nothing was painted, e.g. the stroke was outside of the grid
+            return
+        #worst case complexity = O(1)
+        self.tracker.add_action(self.action)
+        #worst case complexity = O(1)
+        self.replay_tracker.add_action(self.action, False)
+
+    def on_undo(self):
+        """
+        Called when an undo is requested
+        will recognise if it is an undo action and add it to replay tracker
+        complexity- best and worst complexity is o(1) as add action has a complexity of o(1) and is constant CHECK THIS
+        """
+        #worst case complexity = O(1)
+        self.replay_tracker.add_action(self.action, True)   #undo action is added into replay tracker and marked true
+       
+    def on_redo(self):
+        """
+        Called when a redo is requested
+        will pass the redo action into the replay tracker 
+        complexity- best and worst complexity is o(1) as add action has a complexity of o(1) and constant.
+        """
+        #worst case complexity = O(1)
+        self.replay_tracker.add_action(self.action, False) #redo action is added into replay tracker and marked false
+
+    def on_special(self):
+        """
+        Called when the special action is requested.
+        applies special to the whole grid, and records it as a special action in the undo tracker and the replay tracker
+        complexity- best and worst complexity is o(1) for SET and ADD grids, as grid special only counts the special
+        and add action has a complexity of o(1). for SEQUENCE grids it is the complexity of grid special.
+        """
+        #worst case complexity = O(1) for SET and ADD grids
+        self.grid.special()
+        #worst case complexity = O(1)
+        self.action = PaintAction([], True) #a special action has no steps
+        #worst case complexity = O(1)
+        self.tracker.add_action(self.action)
+        #worst case complexity = O(1)
+        self.replay_tracker.add_action(self.action, False)
+
+    def on_replay_start(self):
+        """Called when the replay starting is requested."""
+        pass
+
+    def on_replay_next_step(self) -> bool:
+        """
+        Called when the next step of the replay is requested.
+        Returns whether the replay is finished.
+        """
+        return True
+
+    def on_save(self, path):
+        """
+        Called when saving is requested.
+        writes the grid's style and size and the actions in the replay tracker to path, as an action log
+        so the painting can be replayed or rendered later (see action_log.py and headless_render.py).
+        arguments-
+            path: the file to write
+        complexity- best and worst complexity is o(s) where s is the number of steps of every action saved
+        """
+        #worst case complexity = O(s)
+        write_action_log(path, self.grid.draw_style, self.grid.x, self.grid.y, self.replay_tracker.actions())
+
+    def on_increase_brush_size(self):
+        """
+        Called when an increase to the brush size is requested.
+        called from grid 
+        complexity- increase_brush_size function has a complexity of o(1) which is explained in grid.
+        """
+        #worst case complexity = O(1)
+        self.grid.increase_brush_size() #increases brush size by calling function made in grid
+
+    def on_decrease_brush_size(self):
+        """
+        Called when a decrease to the brush size is requested.
+        called from grids
+        complexity- decrease_brush_size function has a complexity of o(1) which is explained in grid.
+        """
+        #worst case complexity = O(1)
+        self.grid.decrease_brush_size() #decreases brush size by calling function made in grid
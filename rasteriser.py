@@ -0,0 +1,82 @@
+"""
+Turning mouse movement into grid squares, without a window.
+
+The window paints along the segment between two mouse positions by sampling
+it every half pixel of manhattan distance and painting the square under each
+sample. segment_cells gives the squares those samples fall in, each once and in
+order, without visiting every sample: it works out the next sample at which the
+column or the row changes and jumps straight there, stepping from square to
+square, so a segment costs O(squares) rather than O(pixels).
+
+Samples are placed with the same floating point arithmetic as before, and each
+jump is checked against it, so the squares are exactly the ones the per sample
+loop painted.
+"""
+
+from math import ceil
+from typing import Callable, Iterator
+
+# Pixels of manhattan distance between samples.
+INCREMENT = 0.5
+
+def _next_change(coordinate: Callable[[int], int], d: int, last: int, estimate: float) -> int | None:
+    """
+    The first sample after d, up to last, whose coordinate differs from sample d's, or None.
+    coordinate must be monotonic in the sample number, and estimate is roughly where it changes.
+    complexity- O(1), the estimate is at most a sample or two out
+    """
+    value = coordinate(d)
+    candidate = min(max(ceil(estimate), d + 1), last + 1)
+    while candidate > d + 1 and coordinate(candidate - 1) != value:
+        candidate -= 1
+    while candidate <= last and coordinate(candidate) == value:
+        candidate += 1
+    return candidate if candidate <= last else None
+
+def _change_estimate(start, delta, cell: int, size, samples_per_unit) -> float:
+    """
+    Roughly the sample number at which start + t * delta leaves cell, the cell of width size it is in,
+    where t is the sample number over samples_per_unit.
+    complexity- O(1)
+    """
+    boundary = (cell + 1) * size if delta > 0 else cell * size
+    return (boundary - start) / delta * samples_per_unit
+
+def segment_cells(start, end, cell_width, cell_height) -> Iterator[tuple[int, int]]:
+    """
+    The squares painted when the mouse moves from start to end, in pixels, on a grid of
+    cell_width x cell_height pixel squares. These are the squares of the samples every INCREMENT
+    pixels of manhattan distance along the segment, up to and including end. The start itself is not
+    sampled, as it was painted when the mouse got there. Each square is given once, in order.
+    Nothing is given if start and end are the same.
+    complexity- O(s) where s is the number of squares given
+    """
+    x0, y0 = start
+    dx, dy = end[0] - x0, end[1] - y0
+    distance = abs(dx) + abs(dy)
+    if distance == 0:
+        return
+    last = ceil(distance / INCREMENT)
+    samples_per_unit = distance / INCREMENT
+
+    def column(d: int) -> int:
+        return int((min(d * INCREMENT / distance, 1) * dx + x0) // cell_width)
+
+    def row(d: int) -> int:
+        return int((min(d * INCREMENT / distance, 1) * dy + y0) // cell_height)
+
+    # the next sample at which the column and the row change, None if they do not change again
+    x, y = column(1), row(1)
+    next_x = _next_change(column, 1, last, _change_estimate(x0, dx, x, cell_width, samples_per_unit)) if dx else None
+    next_y = _next_change(row, 1, last, _change_estimate(y0, dy, y, cell_height, samples_per_unit)) if dy else None
+    yield (x, y)
+    while next_x is not None or next_y is not None:
+        d = min(change for change in (next_x, next_y) if change is not None)
+        # only the coordinate that changed needs its next change worked out again
+        if d == next_x:
+            x = column(d)
+            next_x = _next_change(column, d, last, _change_estimate(x0, dx, x, cell_width, samples_per_unit))
+        if d == next_y:
+            y = row(d)
+            next_y = _next_change(row, d, last, _change_estimate(y0, dy, y, cell_height, samples_per_unit))
+        yield (x, y)
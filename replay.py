@@ -1,4 +1,5 @@
 from __future__ import annotations
+from typing import Iterator
 from action import PaintAction
 from grid import Grid
 from data_structures.queue_adt import CircularQueue
@@ -70,6 +71,14 @@ class ReplayTracker:
             action.redo_apply(grid)
         return False
 
+    def actions(self) -> Iterator[tuple[PaintAction, bool]]:
+        """
+        The (action, is_undo) pairs still to be played, from the next one on, without playing them.
+        complexity- o(1) per action, the queue is read in place
+        """
+        #worst case complexities = O(1)
+        return iter(self.queue)
+
 
 if __name__ == "__main__":
     action1 = PaintAction([], is_special=True)
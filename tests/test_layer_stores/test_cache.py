@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+from ed_utils.decorators import number
+
+from layer_store import LayerStore, SetLayerStore, AdditiveLayerStore, SequenceLayerStore, colour_cache_stats
+from layers import black, lighten, rainbow, invert
+
+class TestColourCache(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = colour_cache_stats()
+        self.stats.reset()
+
+    @number("15.1")
+    def test_static_hits(self):
+        for store in (SetLayerStore(), AdditiveLayerStore(), SequenceLayerStore()):
+            store.add(lighten)
+            self.assertEqual(store.get_color((100, 100, 100), 0, 1, 1), (140, 140, 140))
+            # No layer depends on time, so any timestamp reuses the colour.
+            self.assertEqual(store.get_color((100, 100, 100), 5, 1, 1), (140, 140, 140))
+            self.assertEqual(store.get_color([100, 100, 100], 9, 1, 1), (140, 140, 140))
+        self.assertEqual((self.stats.hits, self.stats.misses), (6, 3))
+
+    @number("15.2")
+    def test_changes_miss(self):
+        s = AdditiveLayerStore()
+        s.add(black)
+        self.assertEqual(s.get_color((100, 100, 100), 0, 1, 1), (0, 0, 0))
+        s.add(lighten)
+        self.assertEqual(s.get_color((100, 100, 100), 0, 1, 1), (40, 40, 40))
+        s.special()
+        self.assertEqual(s.get_color((100, 100, 100), 0, 1, 1), (0, 0, 0))
+        # Erases lighten, which is first after special.
+        s.erase(black)
+        self.assertEqual(s.get_color((100, 100, 100), 0, 1, 1), (0, 0, 0))
+        self.assertEqual((self.stats.hits, self.stats.misses), (0, 4))
+
+    @number("15.5")
+    def test_ignored_inputs(self):
+        s = SequenceLayerStore()
+        s.add(lighten)
+        s.add(black)
+        # black is constant, so the start colour and position no longer matter.
+        self.assertEqual(s.get_color((100, 100, 100), 0, 1, 1), (40, 40, 40))
+        self.assertEqual(s.get_color((7, 8, 9), 3, 5, 6), (40, 40, 40))
+        s.erase(black)
+        # lighten ignores the position, but not the start colour.
+        self.assertEqual(s.get_color((100, 100, 100), 0, 1, 1), (140, 140, 140))
+        self.assertEqual(s.get_color((100, 100, 100), 0, 5, 6), (140, 140, 140))
+        self.assertEqual(s.get_color((7, 8, 9), 0, 5, 6), (47, 48, 49))
+        self.assertEqual((self.stats.hits, self.stats.misses), (2, 3))
+
+    @number("15.3")
+    def test_time_varying(self):
+        s = SequenceLayerStore()
+        s.add(rainbow)
+        s.add(invert)
+        self.assertEqual(s.get_color((100, 100, 100), 7, 0, 0), (255-91, 255-214, 255-104))
+        self.assertEqual(s.get_color((100, 100, 100), 7, 0, 0), (255-91, 255-214, 255-104))
+        self.assertNotEqual(s.get_color((100, 100, 100), 7.5, 0, 0), (255-91, 255-214, 255-104))
+        self.assertEqual((self.stats.hits, self.stats.misses), (1, 2))
+
+    @number("15.4")
+    def test_time_quantum(self):
+        s = SetLayerStore()
+        s.TIME_QUANTUM = 1
+        s.add(rainbow)
+        colour = s.get_color((100, 100, 100), 7, 0, 0)
+        self.assertEqual(s.get_color((100, 100, 100), 7.5, 0, 0), colour)
+        self.assertNotEqual(s.get_color((100, 100, 100), 8, 0, 0), colour)
+        self.assertEqual(LayerStore.TIME_QUANTUM, None)
+
+    @number("15.6")
+    def test_change_during_read(self):
+        import layer_store
+        compile_chain = layer_store.compile_chain
+        for store in (SetLayerStore(), AdditiveLayerStore(), SequenceLayerStore()):
+            store.add(black)
+            painted = []
+
+            def compile_and_paint(chain):
+                # A paint landing while the read is between working out the state and caching the colour.
+                if not painted:
+                    painted.append(store.add(lighten))
+                return compile_chain(chain)
+            with mock.patch.object(layer_store, "compile_chain", compile_and_paint):
+                store.get_color((100, 100, 100), 0, 1, 1)
+            self.assertEqual(painted, [True])
+            expected = (100, 100, 100)
+            for layer in store.layer_chain():
+                expected = layer.apply(expected, 0, 1, 1)
+            # The paint is seen by every read after it.
+            self.assertEqual(store.get_color((100, 100, 100), 0, 1, 1), expected)
+            self.assertEqual(store.get_color((100, 100, 100), 0, 1, 1), expected)
@@ -0,0 +1,122 @@
+import random
+import unittest
+from ed_utils.decorators import number
+
+from layer_util import get_layers
+from layer_store import LayerStore, AdditiveLayerStore, SequenceLayerStore
+from layers import black, lighten, darken, red, green, blue
+
+class TestCapacity(unittest.TestCase):
+
+    @number("12.1")
+    def test_starts_small(self):
+        self.assertLessEqual(len(AdditiveLayerStore().our_queue.array), LayerStore.INITIAL_CAPACITY)
+
+    @number("12.2")
+    def test_add_grows(self):
+        s = AdditiveLayerStore()
+        # Wrap the queue around before it has to grow.
+        s.add(red)
+        s.add(red)
+        s.erase(red)
+        s.erase(red)
+        for layer in [black] + [lighten] * 9:
+            self.assertTrue(s.add(layer))
+        self.assertEqual(s.layer_chain(), (black,) + (lighten,) * 9)
+        self.assertEqual(s.get_color((100, 100, 100), 0, 0, 0), (255, 255, 255))
+
+    @number("12.3")
+    def test_add_limit(self):
+        s = AdditiveLayerStore()
+        for _ in range(LayerStore.MAX_LAYERS):
+            self.assertTrue(s.add(darken))
+        self.assertFalse(s.add(darken))
+        self.assertLessEqual(len(s.our_queue.array), LayerStore.MAX_LAYERS)
+        s.special()
+        self.assertTrue(s.erase(darken))
+        self.assertTrue(s.add(lighten))
+        self.assertEqual(s.layer_chain()[-1], lighten)
+
+    @number("12.4")
+    def test_sequence_grows(self):
+        s = SequenceLayerStore()
+        for layer in [red, green, blue, black, lighten, darken]:
+            self.assertTrue(s.add(layer))
+        # Applied in index order: black, lighten, red, green, blue, darken.
+        self.assertEqual(s.layer_chain(), (black, lighten, red, green, blue, darken))
+        self.assertEqual(s.get_color((100, 100, 100), 0, 0, 0), (0, 0, 215))
+
+    @number("12.5")
+    def test_add_read_only(self):
+        s = AdditiveLayerStore()
+        s.add(black)
+        s.add(lighten)
+        queue, front = s.our_queue, s.our_queue.front
+        self.assertEqual(s.get_color((100, 100, 100), 0, 0, 0), (40, 40, 40))
+        self.assertIs(s.our_queue, queue)
+        self.assertEqual(s.our_queue.front, front)
+        # Painting while a read is part way through leaves that read unchanged.
+        layers = iter(s.our_queue)
+        self.assertEqual(next(layers), black)
+        s.add(darken)
+        self.assertEqual(list(layers), [lighten])
+        self.assertEqual(s.get_color((100, 100, 100), 0, 0, 0), (0, 0, 0))
+
+    @number("12.6")
+    def test_add_special_in_place(self):
+        s = AdditiveLayerStore()
+        model = []
+        layers = [black, lighten, darken, red, green, blue]
+        for i in range(40):
+            queue = s.our_queue
+            if i % 7 == 3:
+                s.special()
+                model.reverse()
+                self.assertIs(s.our_queue, queue)
+            elif i % 5 == 4:
+                s.erase(black)
+                model.pop(0)
+            else:
+                s.add(layers[i % len(layers)])
+                model.append(layers[i % len(layers)])
+            self.assertEqual(list(s.layer_chain()), model)
+
+    @number("12.7")
+    def test_sequence_set(self):
+        s = SequenceLayerStore()
+        self.assertFalse(s.erase(red))
+        self.assertTrue(s.add(darken))
+        self.assertTrue(s.add(red))
+        self.assertTrue(s.add(red))
+        self.assertIn(red, s)
+        self.assertNotIn(green, s)
+        self.assertEqual(s.layer_chain(), (red, darken))
+        self.assertTrue(s.erase(green))
+        self.assertTrue(s.erase(red))
+        self.assertNotIn(red, s)
+        self.assertEqual(s.layer_chain(), (darken,))
+        self.assertEqual(s.get_color((100, 100, 100), 0, 0, 0), (60, 60, 60))
+
+    @number("12.8")
+    def test_sequence_median(self):
+        layers = list(get_layers())
+        rng = random.Random(13)
+        s = SequenceLayerStore()
+        applying = set()
+        for _ in range(300):
+            layer = rng.choice(layers)
+            op = rng.choice(["add", "add", "erase", "special"])
+            if op == "add":
+                s.add(layer)
+                applying.add(layer.name)
+            elif op == "erase":
+                s.erase(layer)
+                applying.discard(layer.name)
+            elif applying:
+                by_name = sorted(applying)
+                applying.remove(by_name[(len(by_name) - 1) // 2])
+                s.special()
+            self.assertEqual(sorted(layer.name for layer in s.layer_chain()), sorted(applying))
+            if s.name_order is not None:
+                # The name order holds the applying layers only, not the whole registry.
+                self.assertEqual(len(s.name_order), s.count)
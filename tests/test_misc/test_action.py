@@ -0,0 +1,63 @@
+import unittest
+from ed_utils.decorators import number
+
+from layers import darken, lighten, red
+from action import PaintAction, PaintStep
+from grid import Grid
+
+class TestPaintAction(unittest.TestCase):
+
+    @number("20.1")
+    def test_packed_steps(self):
+        steps = [PaintStep((0, 1), lighten), PaintStep((2, 3), red), PaintStep((4, 5), lighten)]
+        action = PaintAction(steps)
+        self.assertEqual(action.steps, steps)
+        self.assertEqual(list(action.cells()), [(0, 1, lighten), (2, 3, red), (4, 5, lighten)])
+        # Each layer is kept once, and the steps refer to it by position.
+        self.assertEqual(action.layers, [lighten, red])
+        self.assertEqual(list(action.refs), [0, 1, 0])
+        self.assertEqual(action.xs.itemsize, 2)
+        # The steps are made from the packed arrays, so changing the list leaves the action alone.
+        action.steps.append(PaintStep((6, 7), red))
+        self.assertEqual(len(action.steps), 3)
+        action.steps = steps[1:]
+        self.assertEqual(list(action.cells()), [(2, 3, red), (4, 5, lighten)])
+        self.assertEqual(action.layers, [red, lighten])
+        action.steps = steps
+
+        other = PaintAction()
+        for x, y, layer in action.cells():
+            other.add_cell(x, y, layer)
+        self.assertEqual(action, other)
+        other.add_cell(0, 0, darken)
+        self.assertNotEqual(action, other)
+        self.assertNotEqual(PaintAction(), PaintAction(is_special=True))
+        special = PaintAction(is_special=True)
+        self.assertTrue(special.is_special)
+        self.assertEqual(list(special.cells()), [])
+        self.assertEqual(special.nbytes(), PaintAction().nbytes())
+        # Each step adds two bytes to each of the three arrays.
+        self.assertEqual(action.nbytes(), PaintAction([steps[0], steps[1]]).nbytes() + 6)
+
+    @number("20.2")
+    def test_widening(self):
+        action = PaintAction()
+        action.add_cell(1, 2, lighten)
+        action.add_cell(70000, 3, red)
+        action.add_cell(4, 100000, red)
+        self.assertEqual(list(action.cells()), [(1, 2, lighten), (70000, 3, red), (4, 100000, red)])
+        self.assertEqual(len(action.xs), len(action.ys))
+        self.assertEqual(action.xs.itemsize, 4)
+
+    @number("20.3")
+    def test_undo_redo(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 4, 4)
+        action = PaintAction()
+        for x, y in [(0, 0), (1, 2), (3, 3)]:
+            grid[x][y].add(lighten)
+            action.add_cell(x, y, lighten)
+        action.undo_apply(grid)
+        self.assertTrue(all(grid[x][y].layer_chain() == () for x in range(4) for y in range(4)))
+        action.redo_apply(grid)
+        self.assertEqual(grid[1][2].layer_chain(), (lighten,))
+        self.assertEqual(grid[2][1].layer_chain(), ())
@@ -0,0 +1,112 @@
+import random
+import unittest
+import numpy as np
+from ed_utils.decorators import number
+
+from chain_compiler import ChannelLUT, ChannelMap, compile_chain, fuse
+from layer_util import Layer, get_layers, per_channel
+from layers import black, darken, invert, lighten, rainbow, red, sparkle
+from layer_store import AdditiveLayerStore
+
+class TestChainCompiler(unittest.TestCase):
+
+    ALGEBRAIC = [black, lighten, darken, invert, red]
+
+    def fold(self, chain, color, timestamp, x, y):
+        for layer in chain:
+            color = layer.apply(color, timestamp, x, y)
+        return color
+
+    @number("16.1")
+    def test_channel_maps(self):
+        for layer in get_layers():
+            if layer.channel_map is None:
+                continue
+            step = ChannelMap(layer.channel_map)
+            for value in range(256):
+                for color in [(value, 0, 0), (0, value, 0), (0, 0, value)]:
+                    self.assertEqual(step.apply(color, 0, 0, 0), layer.apply(color, 0, 0, 0), layer.name)
+                    looked_up = tuple(int(layer.lut[channel, c]) for channel, c in enumerate(color))
+                    self.assertEqual(looked_up, layer.apply(color, 0, 0, 0), layer.name)
+
+    @number("16.2")
+    def test_fused_matches_folding(self):
+        rng = random.Random(0)
+        colors = np.array([[0, 255, 20, 39], [0, 255, 130, 216], [0, 255, 250, 41]], dtype=np.int64)
+        xs = np.arange(4)
+        ys = np.arange(4)
+        for _ in range(200):
+            chain = [rng.choice(self.ALGEBRAIC + [sparkle]) for _ in range(rng.randint(1, 12))]
+            compiled = fuse(chain)
+            for color in colors.T:
+                color = tuple(int(c) for c in color)
+                self.assertEqual(compiled.apply(color, 3, 5, 7), self.fold(chain, color, 3, 5, 7))
+            expected = colors
+            for layer in chain:
+                expected = layer.apply_array(expected, 3, xs, ys)
+            np.testing.assert_array_equal(compiled.apply_array(colors, 3, xs, ys), expected)
+
+    @number("16.3")
+    def test_runs_fuse(self):
+        rng = random.Random(1)
+        chain = [rng.choice([lighten, darken, invert]) for _ in range(200)]
+        self.assertEqual(len(fuse(chain)), 1)
+        self.assertEqual(len(fuse([lighten, red, darken, invert])), 1)
+        self.assertTrue(fuse([lighten, red, darken, invert]).steps[0].constant_output)
+        # Layers with no channel map are kept as steps of their own.
+        compiled = fuse([lighten, invert, rainbow, darken, sparkle, lighten, lighten])
+        self.assertEqual(len(compiled), 5)
+        self.assertIs(compiled.steps[1], rainbow)
+        self.assertIs(compiled.steps[3], sparkle)
+        self.assertTrue(compiled.time_varying)
+        self.assertFalse(fuse([darken, black, lighten]).color_dependent)
+
+    @number("16.4")
+    def test_cache(self):
+        self.assertIs(compile_chain([lighten, darken]), compile_chain((lighten, darken)))
+        self.assertIsNot(compile_chain([lighten, darken]), compile_chain([darken, lighten]))
+
+    @number("16.5")
+    def test_store(self):
+        store = AdditiveLayerStore()
+        for layer in [lighten] * 100 + [invert] + [darken] * 50:
+            store.add(layer)
+        self.assertEqual(len(store.compiled()), 1)
+        self.assertEqual(
+            store.get_color((20, 130, 250), 0, 0, 0),
+            self.fold(store.layer_chain(), (20, 130, 250), 0, 0, 0),
+        )
+        store.special()
+        self.assertEqual(
+            store.get_color((20, 130, 250), 0, 0, 0),
+            self.fold(store.layer_chain(), (20, 130, 250), 0, 0, 0),
+        )
+
+    @number("16.6")
+    def test_per_channel_luts(self):
+        def square(color, timestamp, x, y):
+            return tuple(c * c // 255 for c in color)
+        layer = Layer(-1, per_channel(square))
+        self.assertFalse(layer.position_varying)
+        self.assertEqual(list(layer.lut[1, :4]), [0, 0, 0, 0])
+        self.assertEqual(list(layer.lut[2, 253:]), [251, 253, 255])
+
+        chain = [lighten, layer, invert, layer, darken]
+        compiled = fuse(chain)
+        self.assertEqual(len(compiled), 1)
+        self.assertIsInstance(compiled.steps[0], ChannelLUT)
+        colors = np.array([[0, 255, 20, 39], [0, 255, 130, 216], [0, 255, 250, 41]], dtype=np.int64)
+        xs = np.arange(4)
+        expected = colors
+        for step in chain:
+            expected = step.apply_array(expected, 0, xs, xs)
+        np.testing.assert_array_equal(compiled.apply_array(colors, 0, xs, xs), expected)
+        for color in colors.T.tolist():
+            self.assertEqual(compiled.apply(tuple(color), 0, 0, 0), self.fold(chain, tuple(color), 0, 0, 0))
+        # A solid colour after the tables still leaves one constant step.
+        self.assertTrue(fuse([layer, lighten, red]).steps[0].constant_output)
+        self.assertFalse(fuse([layer, red]).color_dependent)
+
+        def brighter(color, timestamp, x, y):
+            return tuple(c + 1 for c in color)
+        self.assertRaises(ValueError, Layer, -1, per_channel(brighter))
@@ -0,0 +1,151 @@
+import random
+import unittest
+from ed_utils.decorators import number
+
+from compact_grid import LayerStackPool
+from layer_util import Layer, get_layers, layer_properties, vectorised
+from layers import darken, invert, lighten, red
+from grid import Grid
+
+class TestCompactGrid(unittest.TestCase):
+
+    @number("10.1")
+    def test_set(self):
+        self.assertSameAsStores(Grid.DRAW_STYLE_SET)
+
+    @number("10.2")
+    def test_add(self):
+        self.assertSameAsStores(Grid.DRAW_STYLE_ADD)
+
+    @number("10.3")
+    def test_sequence(self):
+        self.assertSameAsStores(Grid.DRAW_STYLE_SEQUENCE)
+
+    @number("10.4")
+    def test_shared_stacks(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 20, 20, compact=True)
+        layers = list(get_layers())
+        for layer in layers:
+            grid.grid_paint(layer, 10, 10, 5)
+        # Every painted square holds one of a handful of stacks.
+        self.assertLessEqual(len(grid.compact.pool), len(layers) + 1)
+
+    @number("10.5")
+    def test_stack_nodes(self):
+        pool = LayerStackPool()
+        a = pool.push(0, 3)
+        b = pool.push(a, 5)
+        self.assertEqual(pool.push(0, 3), a)
+        self.assertEqual(pool.intern((3, 5)), b)
+        self.assertEqual(pool[b], (3, 5))
+        self.assertEqual(pool.depth(b), 2)
+        self.assertEqual(len(pool), 3)
+
+        grid = Grid(Grid.DRAW_STYLE_ADD, 30, 30, compact=True)
+        for _ in range(50):
+            grid.grid_paint(lighten, 15, 15, 5)
+        # One node per depth, shared by every painted square.
+        self.assertEqual(len(grid.compact.pool), 51)
+        self.assertEqual(grid.compact.pool[int(grid.compact.stack_ids[15, 15])], (lighten.index,) * 50)
+
+    @number("10.6")
+    def test_broadcast(self):
+        sizes = []
+
+        def counted_array(color, timestamp, x, y):
+            sizes.append(color.shape[1])
+            return 255 - color
+
+        @layer_properties(position_varying=False)
+        @vectorised(counted_array)
+        def counted(color, timestamp, x, y):
+            return tuple(255 - c for c in color)
+        grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        grid.grid_paint(Layer(-1, counted), 5, 5, 3)
+        frame = grid.render(0, (10, 20, 30))
+        # The 25 painted squares share one evaluation.
+        self.assertEqual(sizes, [1])
+        self.assertEqual(frame[5][5].tolist(), [245, 235, 225])
+        self.assertEqual(frame[0][0].tolist(), [10, 20, 30])
+
+    @number("10.7")
+    def test_nodes_freed(self):
+        for draw_style in (Grid.DRAW_STYLE_ADD, Grid.DRAW_STYLE_SEQUENCE):
+            grid = Grid(draw_style, 20, 20, compact=True)
+            for i in range(200):
+                layer = (lighten, darken, red, invert)[i % 4]
+                action = grid.paint_stroke(layer, [(i % 20, 5), (i % 20, 6), (10, i % 20)], 3)
+                action.undo_apply(grid)
+                # Nothing is painted, so only the empty stack is left.
+                self.assertEqual(len(grid.compact.pool), 1, draw_style)
+            grid.grid_paint(lighten, 10, 10, 2)
+            grid.grid_paint(red, 10, 11, 2)
+            pool = grid.compact.pool
+            self.assertEqual(len(pool), 4)
+            self.assertEqual(len(pool.children), len(pool) - 1)
+
+    @number("10.8")
+    def test_erase_bottom(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 3, 3, compact=True)
+        layers = list(get_layers())
+        square = grid[1][1]
+        for i in range(200):
+            square.add(layers[i % len(layers)])
+        pool = grid.compact.pool
+        # Dropping the bottom layers one by one only remakes the stack a few times, not once for each.
+        for i in range(199):
+            self.assertTrue(square.erase(lighten))
+            self.assertEqual(len(square.layer_chain()), 199 - i)
+            self.assertEqual(square.layer_chain()[0], layers[(i + 1) % len(layers)])
+        self.assertLess(len(pool.parents), 600)
+        self.assertTrue(square.erase(lighten))
+        self.assertFalse(square.erase(lighten))
+        self.assertEqual(len(pool), 1)
+
+    @number("10.9")
+    def test_contains(self):
+        grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 4, 4, compact=True)
+        square = grid[2][2]
+        self.assertNotIn(red, square)
+        square.add(red)
+        square.add(lighten)
+        self.assertIn(red, grid[2][2])
+        self.assertIn(lighten, grid[2][2])
+        self.assertNotIn(darken, grid[2][2])
+        self.assertNotIn(red, grid[2][3])
+        square.erase(red)
+        self.assertNotIn(red, grid[2][2])
+
+    def assertSameAsStores(self, draw_style):
+        rng = random.Random(draw_style)
+        layers = list(get_layers())
+        compact = Grid(draw_style, 6, 5, compact=True)
+        stores = Grid(draw_style, 6, 5)
+        for _ in range(400):
+            x, y = rng.randrange(6), rng.randrange(5)
+            layer = rng.choice(layers)
+            op = rng.choice(["add", "add", "add", "erase", "special", "grid special"])
+            if op == "grid special":
+                compact.special()
+                stores.special()
+                result = [None, None]
+            elif op == "add":
+                result = compact[x][y].add(layer), stores[x][y].add(layer)
+            elif op == "erase":
+                result = compact[x][y].erase(layer), stores[x][y].erase(layer)
+            else:
+                result = []
+                for grid in (compact, stores):
+                    try:
+                        grid[x][y].special()
+                        result.append(None)
+                    except ValueError:
+                        result.append(ValueError)
+            self.assertEqual(result[0], result[1], f"{op} returned differently")
+            self.assertEqual(
+                compact[x][y].get_color((100, 150, 200), 3, x, y),
+                stores[x][y].get_color((100, 150, 200), 3, x, y),
+            )
+        self.assertEqual(len(compact.grid), 6)
+        self.assertEqual(len(compact[0]), 5)
+        self.assertEqual(compact.render(4.5).tolist(), stores.render(4.5).tolist())
@@ -0,0 +1,143 @@
+import unittest
+from unittest import mock
+from ed_utils.decorators import number
+
+from layers import black, blue, darken, green, invert, lighten, red
+from layer_store import AdditiveLayerStore, SequenceLayerStore, SetLayerStore
+from action import PaintAction
+from grid import Grid
+from lazy_grid import LazyColumn
+from painter import Painter
+
+class FakeWindow:
+    def __init__(self, grid: Grid):
+        self.grid = grid
+
+FakeWindow.on_init = Painter.on_init
+FakeWindow.on_special = Painter.on_special
+
+class TestGridSpecial(unittest.TestCase):
+
+    START = (100, 150, 200)
+
+    def stores(self, grid: Grid) -> int:
+        return sum(len(grid[x].stores) for x in range(grid.x))
+
+    @number("21.1")
+    def test_set(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 4, 4)
+        controls = [[SetLayerStore() for _ in range(4)] for _ in range(4)]
+        grid[1][1].add(lighten)
+        controls[1][1].add(lighten)
+        grid[2][2].add(red)
+        controls[2][2].add(red)
+        grid[2][2].special()
+        controls[2][2].special()
+        grid.special()
+        for row in controls:
+            for store in row:
+                store.special()
+        # Untouched squares were given the special too.
+        grid[3][0].add(darken)
+        controls[3][0].add(darken)
+        grid[2][2].special()
+        controls[2][2].special()
+        self.assertSameColours(grid, controls)
+        grid.special()
+        for row in controls:
+            for store in row:
+                store.special()
+        self.assertSameColours(grid, controls)
+
+    @number("21.2")
+    def test_add(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 3, 3)
+        controls = [[AdditiveLayerStore() for _ in range(3)] for _ in range(3)]
+        for layer in (black, lighten, invert):
+            grid[1][1].add(layer)
+            controls[1][1].add(layer)
+        grid.special()
+        for row in controls:
+            for store in row:
+                store.special()
+        for layer in (darken, green):
+            grid[1][1].add(layer)
+            controls[1][1].add(layer)
+            grid[0][2].add(layer)
+            controls[0][2].add(layer)
+        grid[1][1].erase(black)
+        controls[1][1].erase(black)
+        self.assertSameColours(grid, controls)
+        self.assertEqual(grid.render(0, self.START)[1][1].tolist(), list(controls[1][1].get_color(self.START, 0, 1, 1)))
+
+    @number("21.3")
+    def test_constant_time(self):
+        for draw_style, store_type in ((Grid.DRAW_STYLE_SET, SetLayerStore), (Grid.DRAW_STYLE_ADD, AdditiveLayerStore)):
+            grid = Grid(draw_style, 2000, 2000)
+            grid.grid_paint(blue, 10, 10, 1)
+            # No square is visited: no store's special runs, and no store is looked up or made.
+            with mock.patch.object(store_type, "special") as special, \
+                    mock.patch.object(LazyColumn, "__getitem__") as getitem, \
+                    mock.patch.object(LazyColumn, "materialise") as materialise:
+                for _ in range(1001):
+                    grid.special()
+            self.assertEqual((special.call_count, getitem.call_count, materialise.call_count), (0, 0, 0))
+            self.assertEqual(grid.specials.count, 1001)
+            self.assertEqual(self.stores(grid), 5)
+            self.assertEqual(grid[10][10].get_color(self.START, 0, 10, 10), (255, 255, 0) if draw_style == "SET" else (0, 0, 255))
+
+    @number("21.4")
+    def test_sequence(self):
+        grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 3, 3)
+        control = SequenceLayerStore()
+        for layer in (black, lighten, red):
+            grid[0][0].add(layer)
+            control.add(layer)
+        # Empty squares have no median, and are left alone.
+        grid.special()
+        control.special()
+        self.assertEqual(grid[0][0].get_color(self.START, 0, 0, 0), control.get_color(self.START, 0, 0, 0))
+        self.assertEqual(self.stores(grid), 1)
+
+    @number("21.5")
+    def test_undo_redo(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 3, 3)
+        grid[0][0].add(red)
+        window = FakeWindow(grid)
+        window.on_init()
+        window.on_special()
+        self.assertEqual(grid[0][0].get_color(self.START, 0, 0, 0), (0, 255, 255))
+        self.assertTrue(window.action.is_special)
+        self.assertIs(window.tracker.undo(grid), window.action)
+        self.assertEqual(grid[0][0].get_color(self.START, 0, 0, 0), (255, 0, 0))
+        self.assertIs(window.tracker.redo(grid), window.action)
+        self.assertEqual(grid[0][0].get_color(self.START, 0, 0, 0), (0, 255, 255))
+        PaintAction([], is_special=True).redo_apply(grid)
+        self.assertEqual(grid[0][0].get_color(self.START, 0, 0, 0), (255, 0, 0))
+
+    @number("21.6")
+    def test_reads_do_not_change_stores(self):
+        for draw_style, layers in ((Grid.DRAW_STYLE_SET, (red,)), (Grid.DRAW_STYLE_ADD, (red, lighten))):
+            grid = Grid(draw_style, 2, 2)
+            for layer in layers:
+                grid[0][0].add(layer)
+            store = grid[0].store_at(0)
+            before = grid[0][0].get_color(self.START, 0, 0, 0)
+            grid.special()
+            state = dict(vars(store))
+            after = grid[0][0].get_color(self.START, 0, 0, 0)
+            chain = grid[0][0].layer_chain()
+            # The special shows, and is not served from the colour cached before it.
+            self.assertNotEqual(after, before)
+            self.assertEqual(chain, (red, invert) if draw_style == "SET" else (lighten, red))
+            # Only the colour cache was written.
+            changed = {name for name in vars(store) if state.get(name, None) is not vars(store)[name]}
+            self.assertLessEqual(changed, {"cache_version", "cache_start", "cache_position", "cache_time", "cache_colour", "compiled_version", "compiled_chain"})
+            self.assertEqual(store.specials_seen, 0)
+            grid.special()
+            self.assertEqual(grid[0][0].get_color(self.START, 0, 0, 0), before)
+
+    def assertSameColours(self, grid: Grid, controls):
+        for x, row in enumerate(controls):
+            for y, store in enumerate(row):
+                self.assertEqual(grid[x][y].get_color(self.START, 0, x, y), store.get_color(self.START, 0, x, y), (x, y))
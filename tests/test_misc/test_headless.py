@@ -0,0 +1,176 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+import numpy as np
+from ed_utils.decorators import number
+
+from action import PaintAction, PaintStep
+from action_log import write_action_log, read_action_log, replay_action_log
+from headless_render import render_pngs, render_apng, timestamps_between
+from layers import rainbow, red, lighten
+from grid import Grid
+from painter import Painter
+
+class FakeWindow:
+    def __init__(self, grid: Grid):
+        self.grid = grid
+
+FakeWindow.on_init = Painter.on_init
+FakeWindow.on_stroke_start = Painter.on_stroke_start
+FakeWindow.on_stroke = Painter.on_stroke
+FakeWindow.on_stroke_end = Painter.on_stroke_end
+FakeWindow.on_special = Painter.on_special
+FakeWindow.on_save = Painter.on_save
+
+def read_chunks(path) -> list[tuple[bytes, bytes]]:
+    """The (type, data) of each chunk of a PNG file, checking the signature and every CRC."""
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n", "not a PNG"
+    chunks = []
+    at = 8
+    while at < len(data):
+        length, = struct.unpack(">I", data[at:at + 4])
+        kind = data[at + 4:at + 8]
+        body = data[at + 8:at + 8 + length]
+        crc, = struct.unpack(">I", data[at + 8 + length:at + 12 + length])
+        assert crc == zlib.crc32(kind + body), f"bad CRC in {kind}"
+        chunks.append((kind, body))
+        at += 12 + length
+    return chunks
+
+def decode_images(path) -> list[np.ndarray]:
+    """
+    The images of a PNG or APNG written by headless_render, as (height, width, 3) arrays, top row first.
+    Only 8 bit RGB with no filtering is understood, which is all headless_render writes.
+    """
+    chunks = read_chunks(path)
+    assert chunks[0][0] == b"IHDR" and chunks[-1] == (b"IEND", b"")
+    width, height, depth, color_type = struct.unpack(">IIBB", chunks[0][1][:10])
+    assert (depth, color_type) == (8, 2)
+    images = []
+    for kind, body in chunks:
+        if kind == b"fdAT":
+            body = body[4:]
+        elif kind != b"IDAT":
+            continue
+        rows = np.frombuffer(zlib.decompress(body), dtype=np.uint8).reshape(height, 1 + width * 3)
+        assert not rows[:, 0].any(), "filtered scanline"
+        images.append(rows[:, 1:].reshape(height, width, 3))
+    return images
+
+class TestHeadless(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.dir.name, "painting.json")
+        self.steps1 = [PaintStep((1, 1), rainbow), PaintStep((1, 2), rainbow), PaintStep((2, 1), red)]
+        self.steps2 = [PaintStep((1, 1), lighten), PaintStep((3, 3), red)]
+        write_action_log(self.log, Grid.DRAW_STYLE_ADD, 5, 4, [
+            (PaintAction(self.steps1[:]), False),
+            (PaintAction(self.steps2[:]), False),
+            (PaintAction(self.steps2[:]), True),
+            (PaintAction(self.steps2[:]), False),
+        ])
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    @number("9.1")
+    def test_action_log(self):
+        grid, entries = read_action_log(self.log)
+        self.assertEqual((grid.draw_style, grid.x, grid.y), (Grid.DRAW_STYLE_ADD, 5, 4))
+        self.assertEqual([is_undo for _, is_undo in entries], [False, False, True, False])
+        self.assertEqual(entries[0][0].steps, self.steps1)
+
+        grid = replay_action_log(self.log)
+        control_grid = Grid(Grid.DRAW_STYLE_ADD, 5, 4)
+        for step in self.steps1 + self.steps2:
+            step.redo_apply(control_grid)
+        for step in self.steps2:
+            step.undo_apply(control_grid)
+        for step in self.steps2:
+            step.redo_apply(control_grid)
+        self.assertEqual(grid.render(3).tolist(), control_grid.render(3).tolist())
+
+    @number("9.2")
+    def test_pngs(self):
+        grid = replay_action_log(self.log)
+        timestamps = timestamps_between(0, 1, 4)
+        out = os.path.join(self.dir.name, "frames")
+        self.assertEqual(render_pngs(grid, out, timestamps, scale=2), 4)
+        for i, timestamp in enumerate(timestamps):
+            images = decode_images(os.path.join(out, f"frame_{i:05d}.png"))
+            self.assertEqual(len(images), 1)
+            self.assertEqual(images[0].shape, (8, 10, 3))
+            self.assertImageMatches(images[0], grid.render(timestamp), 2)
+
+    @number("9.3")
+    def test_apng(self):
+        grid = replay_action_log(self.log)
+        timestamps = timestamps_between(2, 5, 2)
+        out = os.path.join(self.dir.name, "painting.png")
+        self.assertEqual(render_apng(grid, out, timestamps, 2), 6)
+        actl = dict(read_chunks(out))[b"acTL"]
+        self.assertEqual(struct.unpack(">II", actl), (6, 0))
+        images = decode_images(out)
+        self.assertEqual(len(images), 6)
+        for image, timestamp in zip(images, timestamps):
+            self.assertImageMatches(image, grid.render(timestamp), 1)
+
+    @number("9.4")
+    def test_apng_streamed(self):
+        grid = replay_action_log(self.log)
+        out = os.path.join(self.dir.name, "painting.png")
+        # A generator, whose length is only known once it runs out.
+        streamed = (i / 3 for i in range(7))
+        self.assertEqual(render_apng(grid, out, streamed, 3), 7)
+        self.assertEqual(struct.unpack(">II", dict(read_chunks(out))[b"acTL"]), (7, 0))
+        images = decode_images(out)
+        self.assertEqual(len(images), 7)
+        self.assertImageMatches(images[6], grid.render(2), 1)
+
+        empty = os.path.join(self.dir.name, "empty.png")
+        self.assertRaises(ValueError, render_apng, grid, empty, iter([]), 3)
+        self.assertRaises(ValueError, render_apng, grid, empty, timestamps_between(1, 1, 3), 3)
+        self.assertFalse(os.path.exists(empty))
+
+    @number("9.5")
+    def test_save(self):
+        window = FakeWindow(Grid(Grid.DRAW_STYLE_SET, 6, 5))
+        window.on_init()
+        window.on_stroke_start(rainbow)
+        window.on_stroke(rainbow, [(1, 1), (2, 1), (3, 2)])
+        window.on_stroke_end()
+        window.on_special()
+        window.on_stroke_start(red)
+        window.on_stroke(red, [(4, 4)])
+        window.on_stroke_end()
+        window.on_save(self.log)
+
+        grid, entries = read_action_log(self.log)
+        self.assertEqual((grid.draw_style, grid.x, grid.y), (Grid.DRAW_STYLE_SET, 6, 5))
+        self.assertEqual([action.is_special for action, _ in entries], [False, True, False])
+        grid = replay_action_log(self.log)
+        out = os.path.join(self.dir.name, "painting.png")
+        timestamps = timestamps_between(0, 2, 2)
+        self.assertEqual(render_apng(grid, out, timestamps, 2), 4)
+        for image, timestamp in zip(decode_images(out), timestamps):
+            self.assertImageMatches(image, window.grid.render(timestamp), 1)
+
+    @number("9.6")
+    def test_apng_delay(self):
+        grid = replay_action_log(self.log)
+        out = os.path.join(self.dir.name, "painting.png")
+        for fps, delay in [(20, (1, 20)), (30, (1, 30)), (0.01, (100, 1)), (1e-6, (0xFFFF, 1))]:
+            render_apng(grid, out, [0, 1], fps)
+            fctl = [body for kind, body in read_chunks(out) if kind == b"fcTL"]
+            self.assertEqual(len(fctl), 2)
+            self.assertEqual(struct.unpack(">HH", fctl[0][20:24]), delay)
+
+    def assertImageMatches(self, image, frame, scale):
+        # Images are stored top row first, frames bottom row first.
+        expected = frame[::-1].repeat(scale, axis=0).repeat(scale, axis=1)
+        self.assertEqual(image.tolist(), expected.tolist())
@@ -0,0 +1,18 @@
+import subprocess
+import sys
+import unittest
+from ed_utils.decorators import number
+
+LOGIC_MODULES = ["grid", "layer_store", "undo", "replay", "action", "painter", "action_log", "headless_render"]
+
+class TestImports(unittest.TestCase):
+
+    @number("14.1")
+    def test_logic_without_arcade(self):
+        # A fresh interpreter, as this one may have imported arcade for other tests.
+        code = (
+            f"import {', '.join(LOGIC_MODULES)}, sys\n"
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in ('arcade', 'pyglet')))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
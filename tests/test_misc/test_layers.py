@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+from ed_utils.decorators import number
+
+from layer_util import get_layers, layer_properties, Layer
+from layers import rainbow, sparkle, lighten, red
+from grid import Grid
+
+class TestLayerArrays(unittest.TestCase):
+
+    COLORS = [(0, 0, 0), (255, 255, 255), (20, 130, 250), (39, 216, 41)]
+    TIMESTAMPS = [0, 1, 7, 13.37, 250.05]
+
+    @number("8.1")
+    def test_all_layers(self):
+        for layer in get_layers():
+            self.assertIsNotNone(layer.vectorised, f"{layer.name} has no array form")
+            self.assertArrayMatches(layer, 16, 16)
+
+    @number("8.2")
+    def test_sparkle_large(self):
+        # Large coordinates exercise the most steps of the generator.
+        self.assertArrayMatches(sparkle, 64, 64, offset=1000)
+
+    @number("8.3")
+    def test_fallback(self):
+        layer = Layer(-1, lighten.apply)
+        layer.vectorised = None
+        self.assertArrayMatches(layer, 4, 4)
+
+    @number("8.4")
+    def test_properties(self):
+        self.assertEqual([layer.name for layer in get_layers() if layer.constant_output], ["black", "red", "green", "blue"])
+        self.assertFalse(lighten.position_varying)
+        self.assertTrue(lighten.color_dependent)
+        self.assertFalse(rainbow.color_dependent)
+        self.assertTrue(sparkle.time_varying and sparkle.position_varying and sparkle.color_dependent)
+
+        def unmarked(color, timestamp, x, y):
+            return color
+        self.assertFalse(Layer(-1, unmarked).constant_output)
+        layer = layer_properties(position_varying=False)(Layer(-1, unmarked))
+        self.assertFalse(layer.constant_output)
+        layer = layer_properties(color_dependent=False)(layer)
+        self.assertTrue(layer.constant_output)
+        self.assertRaises(TypeError, layer_properties, spooky=True)
+
+    @number("8.5")
+    def test_constant_skips_below(self):
+        calls = []
+
+        def counted(color, timestamp, x, y):
+            calls.append((x, y))
+            return color
+        layer = Layer(-1, counted)
+        grid = Grid(Grid.DRAW_STYLE_ADD, 3, 3)
+        for x in range(3):
+            grid[x][1].add(layer)
+            grid[x][1].add(red)
+        grid[2][2].add(layer)
+        frame = grid.render(0)
+        self.assertEqual(calls, [(2, 2)])
+        self.assertEqual(frame[1, 0].tolist(), [255, 0, 0])
+        self.assertEqual(grid[0][1].get_color((0, 0, 0), 0, 0, 1), (255, 0, 0))
+        self.assertEqual(calls, [(2, 2)])
+
+    def assertArrayMatches(self, layer: Layer, width: int, height: int, offset: int = 0):
+        xs, ys = np.meshgrid(np.arange(width) + offset, np.arange(height) + offset)
+        xs, ys = xs.ravel(), ys.ravel()
+        for start in self.COLORS:
+            color = np.empty((3, len(xs)), dtype=np.int64)
+            color[:] = np.array(start).reshape(3, 1)
+            for timestamp in self.TIMESTAMPS:
+                result = layer.apply_array(color, timestamp, xs, ys)
+                for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+                    self.assertEqual(
+                        tuple(result[:, i].tolist()),
+                        tuple(layer.apply(start, timestamp, x, y)),
+                        f"{layer.name} array form differs at ({x}, {y}), t={timestamp}",
+                    )
@@ -0,0 +1,63 @@
+import unittest
+from ed_utils.decorators import number
+
+from layers import black, lighten, red
+from layer_store import SetLayerStore
+from grid import Grid
+
+class TestLazyGrid(unittest.TestCase):
+
+    def stores(self, grid: Grid) -> int:
+        return sum(len(grid[x].stores) for x in range(grid.x))
+
+    @number("11.1")
+    def test_untouched(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 2000, 2000)
+        self.assertEqual(self.stores(grid), 0)
+        self.assertEqual(grid[1999][1999].get_color((1, 2, 3), 0, 1999, 1999), (1, 2, 3))
+        grid = Grid(Grid.DRAW_STYLE_SET, 200, 200)
+        grid.render(0)
+        self.assertEqual(self.stores(grid), 0)
+
+    @number("11.2")
+    def test_paint(self):
+        grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 100, 100)
+        grid.grid_paint(red, 50, 50, 2)
+        self.assertEqual(self.stores(grid), 13)
+        self.assertEqual(grid[50][50].get_color((0, 0, 0), 0, 50, 50), (255, 0, 0))
+        self.assertEqual(grid[60][60].get_color((0, 0, 0), 0, 60, 60), (0, 0, 0))
+
+    @number("11.3")
+    def test_copy_on_write(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        square = grid[3][3]
+        square.add(black)
+        square.add(lighten)
+        self.assertEqual(grid[3][3].get_color((100, 100, 100), 0, 3, 3), (40, 40, 40))
+        # Other squares and other grids still see an empty store.
+        self.assertEqual(grid[3][4].get_color((100, 100, 100), 0, 3, 4), (100, 100, 100))
+        other = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        self.assertEqual(other[3][3].get_color((100, 100, 100), 0, 3, 3), (100, 100, 100))
+
+    @number("11.4")
+    def test_special_untouched(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 10, 10)
+        control = SetLayerStore()
+        grid[2][2].special()
+        control.special()
+        grid[2][2].add(lighten)
+        control.add(lighten)
+        self.assertEqual(
+            grid[2][2].get_color((100, 100, 100), 0, 2, 2),
+            control.get_color((100, 100, 100), 0, 2, 2),
+        )
+
+    @number("11.5")
+    def test_contains(self):
+        grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 10, 10)
+        self.assertNotIn(red, grid[4][4])
+        grid[4][4].add(red)
+        self.assertIn(red, grid[4][4])
+        self.assertNotIn(lighten, grid[4][4])
+        self.assertNotIn(red, grid[4][5])
+        self.assertEqual(self.stores(grid), 1)
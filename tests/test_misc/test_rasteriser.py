@@ -0,0 +1,51 @@
+import math
+import random
+import unittest
+from ed_utils.decorators import number
+
+from rasteriser import segment_cells
+
+def sampled_cells(start, end, width, height):
+    """The squares painted by sampling every half pixel, as the window used to."""
+    mhat_dist = abs(end[0] - start[0]) + abs(end[1] - start[1])
+    cells = []
+    for d in range(1, math.ceil(mhat_dist / 0.5) + 1):
+        distance = min(d * 0.5 / mhat_dist, 1)
+        nx = distance * (end[0] - start[0]) + start[0]
+        ny = distance * (end[1] - start[1]) + start[1]
+        cell = (int(nx // width), int(ny // height))
+        if not cells or cells[-1] != cell:
+            cells.append(cell)
+    return cells
+
+class TestRasteriser(unittest.TestCase):
+
+    @number("19.1")
+    def test_same_as_sampling(self):
+        rng = random.Random(0)
+        for width, height in [(700 / 32, 700 / 32), (25, 21.875), (8, 8)]:
+            for _ in range(1000):
+                start = (rng.randrange(700), rng.randrange(700))
+                reach = rng.choice([1, 3, 10, 40, 150, 700])
+                end = (start[0] + rng.randint(-reach, reach), start[1] + rng.randint(-reach, reach))
+                self.assertEqual(list(segment_cells(start, end, width, height)), sampled_cells(start, end, width, height), (start, end))
+        # High DPI screens give fractional positions.
+        for _ in range(1000):
+            start = (rng.uniform(0, 700), rng.uniform(0, 700))
+            end = (start[0] + rng.uniform(-50, 50), start[1] + rng.uniform(-50, 50))
+            self.assertEqual(list(segment_cells(start, end, 7.3, 3.1)), sampled_cells(start, end, 7.3, 3.1), (start, end))
+
+    @number("19.2")
+    def test_each_once(self):
+        cells = list(segment_cells((3, 5), (690, 400), 21.875, 21.875))
+        self.assertEqual(len(cells), len(set(cells)))
+        self.assertEqual(cells[0], (0, 0))
+        self.assertEqual(cells[-1], (31, 18))
+        for (x1, y1), (x2, y2) in zip(cells, cells[1:]):
+            self.assertLessEqual(max(abs(x2 - x1), abs(y2 - y1)), 1)
+
+    @number("19.3")
+    def test_short_segments(self):
+        self.assertEqual(list(segment_cells((10, 10), (10, 10), 21.875, 21.875)), [])
+        self.assertEqual(list(segment_cells((10, 10), (12, 11), 21.875, 21.875)), [(0, 0)])
+        self.assertEqual(list(segment_cells((21.25, 0.25), (22.25, 0.25), 21.875, 21.875)), [(0, 0), (1, 0)])
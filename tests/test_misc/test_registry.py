@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from ed_utils.decorators import number
+
+from action_log import read_action_log
+from layer_util import LayerRegistry, get_layers
+from layers import rainbow, red
+
+class TestRegistry(unittest.TestCase):
+
+    @number("13.1")
+    def test_grows(self):
+        registry = LayerRegistry()
+        for i in range(500):
+            def apply(color, timestamp, x, y):
+                return color
+            apply.__name__ = f"layer_{i}"
+            self.assertEqual(registry.register(apply).index, i)
+        self.assertEqual(len(registry), 500)
+        self.assertEqual(registry[321].name, "layer_321")
+        self.assertEqual(registry.named("layer_7").index, 7)
+        self.assertEqual([layer.index for layer in registry], list(range(500)))
+        self.assertRaises(IndexError, registry.__getitem__, 500)
+        self.assertRaises(KeyError, registry.named, "layer_500")
+
+    @number("13.2")
+    def test_duplicate_name(self):
+        registry = LayerRegistry()
+        registry.register(red.apply)
+        self.assertRaises(ValueError, registry.register, red.apply)
+
+    @number("13.3")
+    def test_lazy_modules(self):
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, "lazy_layer_pack.py"), "w") as f:
+                f.write("LOADED = True\n")
+            sys.path.insert(0, folder)
+            try:
+                registry = LayerRegistry()
+                registry.add_module("lazy_layer_pack")
+                self.assertNotIn("lazy_layer_pack", sys.modules)
+                self.assertEqual(len(registry), 0)
+                self.assertIn("lazy_layer_pack", sys.modules)
+            finally:
+                sys.path.remove(folder)
+                sys.modules.pop("lazy_layer_pack", None)
+
+    @number("13.4")
+    def test_log_layer_names(self):
+        self.assertIs(get_layers().named("rainbow"), rainbow)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "painting.json")
+            with open(path, "w") as f:
+                json.dump({
+                    "draw_style": "SET", "width": 3, "height": 3, "layers": ["rainbow", "red"],
+                    "actions": [{"undo": False, "special": False, "steps": [[1, 1, 1], [1, 2, 0]]}],
+                }, f)
+            _, entries = read_action_log(path)
+        self.assertEqual([step.affected_layer for step in entries[0][0].steps], [red, rainbow])
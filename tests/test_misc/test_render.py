@@ -0,0 +1,87 @@
+import unittest
+from ed_utils.decorators import number
+
+from layers import rainbow, black, lighten, invert, red, green, blue, sparkle, darken
+from grid import Grid
+from action import PaintStep
+
+class TestRender(unittest.TestCase):
+
+    @number("7.1")
+    def test_set(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 8, 6)
+        self.paint(grid)
+        self.assertRenderMatches(grid)
+        grid[3][2].special()
+        grid[0][0].special()
+        self.assertRenderMatches(grid)
+
+    @number("7.2")
+    def test_add(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 8, 6)
+        self.paint(grid)
+        self.assertRenderMatches(grid)
+        grid[3][2].special()
+        grid[4][4].erase(rainbow)
+        self.assertRenderMatches(grid)
+
+    @number("7.3")
+    def test_sequence(self):
+        grid = Grid(Grid.DRAW_STYLE_SEQUENCE, 8, 6)
+        self.paint(grid)
+        self.assertRenderMatches(grid)
+        grid[3][2].special()
+        self.assertRenderMatches(grid)
+
+    @number("7.4")
+    def test_empty(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 3, 2)
+        frame = grid.render(0, (12, 34, 56))
+        self.assertEqual(frame.shape, (2, 3, 3))
+        self.assertEqual(frame.tolist(), [[[12, 34, 56]] * 3] * 2)
+
+    @number("7.5")
+    def test_refresh_dirty(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 6, 6)
+        self.assertEqual(len(grid.refresh_frame(0)), 36)
+        self.assertEqual(grid.refresh_frame(1), [])
+        grid.grid_paint(lighten, 2, 2, 1)
+        self.assertEqual(sorted(grid.refresh_frame(2)), [(1, 2), (2, 1), (2, 2), (2, 3), (3, 2)])
+        PaintStep((5, 5), black).redo_apply(grid)
+        self.assertEqual(grid.refresh_frame(3), [(5, 5)])
+        PaintStep((5, 5), black).undo_apply(grid)
+        self.assertEqual(grid.refresh_frame(3), [(5, 5)])
+        self.assertEqual(grid.frame.tolist(), grid.render(3).tolist())
+
+    @number("7.6")
+    def test_refresh_time_varying(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 6, 6)
+        grid.grid_paint(rainbow, 0, 0, 1)
+        grid.grid_paint(red, 4, 4, 0)
+        grid.refresh_frame(0)
+        # Same timestamp, nothing to redraw.
+        self.assertEqual(grid.refresh_frame(0), [])
+        self.assertEqual(sorted(grid.refresh_frame(1.5)), [(0, 0), (0, 1), (1, 0)])
+        self.assertEqual(grid.frame.tolist(), grid.render(1.5).tolist())
+        # Painting over the rainbow stops it animating.
+        grid.grid_paint(red, 0, 0, 0)
+        self.assertEqual(grid.refresh_frame(1.5), [(0, 0)])
+        self.assertEqual(sorted(grid.refresh_frame(3)), [(0, 1), (1, 0)])
+
+    def paint(self, grid: Grid):
+        layers = [rainbow, black, lighten, invert, red, green, blue, sparkle, darken]
+        for i, layer in enumerate(layers):
+            grid.grid_paint(layer, (i * 3) % grid.x, (i * 5) % grid.y, 2)
+        grid.grid_paint(lighten, 4, 4, 3)
+        grid.grid_paint(rainbow, 1, 1, 1)
+
+    def assertRenderMatches(self, grid: Grid):
+        for timestamp in [0, 7, 13.37]:
+            frame = grid.render(timestamp, (255, 255, 255))
+            for x in range(grid.x):
+                for y in range(grid.y):
+                    self.assertEqual(
+                        tuple(frame[y][x]),
+                        tuple(grid[x][y].get_color((255, 255, 255), timestamp, x, y)),
+                        "Rendered colour differs from get_color."
+                    )
@@ -0,0 +1,89 @@
+import unittest
+from ed_utils.decorators import number
+
+from layers import lighten, red
+from grid import Grid, brush_stamp
+from painter import Painter
+
+class FakeWindow:
+    def __init__(self, grid: Grid):
+        self.grid = grid
+
+FakeWindow.on_init = Painter.on_init
+FakeWindow.on_stroke_start = Painter.on_stroke_start
+FakeWindow.on_stroke = Painter.on_stroke
+FakeWindow.on_stroke_end = Painter.on_stroke_end
+
+class TestStroke(unittest.TestCase):
+
+    @number("18.1")
+    def test_union(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        points = [(2, 2), (3, 2), (4, 2), (4, 3)]
+        action = grid.paint_stroke(lighten, points, 1)
+        cells = [step.affected_grid_square for step in action.steps]
+        expected = []
+        for x, y in points:
+            for dx, dy in brush_stamp(1):
+                if (x + dx, y + dy) not in expected:
+                    expected.append((x + dx, y + dy))
+        self.assertEqual(cells, expected)
+        self.assertFalse(action.is_special)
+        # Squares under several points get the layer once.
+        self.assertEqual(grid[3][2].layer_chain(), (lighten,))
+        self.assertEqual(grid[0][0].layer_chain(), ())
+
+    @number("18.2")
+    def test_edges_and_undo(self):
+        grid = Grid(Grid.DRAW_STYLE_SET, 5, 5)
+        action = grid.paint_stroke(red, [(0, 0), (0, 1), (4, 4)], 2)
+        cells = [step.affected_grid_square for step in action.steps]
+        self.assertTrue(all(0 <= x < 5 and 0 <= y < 5 for x, y in cells))
+        self.assertEqual(grid[4][2].get_color((0, 0, 0), 0, 4, 2), (255, 0, 0))
+        action.undo_apply(grid)
+        frame = grid.render(0, (0, 0, 0))
+        self.assertFalse(frame.any())
+        action.redo_apply(grid)
+        self.assertEqual(grid[4][2].get_color((0, 0, 0), 0, 4, 2), (255, 0, 0))
+
+    @number("18.3")
+    def test_long_drag(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 512, 512)
+        points = [(i, i // 2) for i in range(512)]
+        window = FakeWindow(grid)
+        window.on_init()
+        window.on_stroke(lighten, points)
+        window.on_stroke_end()
+        action = window.action
+        self.assertEqual(window.tracker.undo(grid), action)
+        self.assertEqual(grid[100][50].layer_chain(), ())
+        window.tracker.redo(grid)
+        self.assertEqual(grid[100][50].layer_chain(), (lighten,))
+        self.assertEqual(len(action.steps), len({step.affected_grid_square for step in action.steps}))
+
+    @number("18.4")
+    def test_drag_is_one_stroke(self):
+        points = [(i, 10 + i // 3) for i in range(40)]
+        whole = Grid(Grid.DRAW_STYLE_ADD, 64, 64)
+        expected = whole.paint_stroke(lighten, points, 2)
+        # However the drag is split into motion events, it paints the same squares once, as one action.
+        for cuts in ([1, 2, 3], [20], list(range(1, 40))):
+            grid = Grid(Grid.DRAW_STYLE_ADD, 64, 64)
+            window = FakeWindow(grid)
+            window.on_init()
+            window.on_stroke_start(lighten)
+            for start, end in zip([0] + cuts, cuts + [40]):
+                # Each motion event starts on the square the last one ended on.
+                window.on_stroke(lighten, points[max(start - 1, 0):end])
+            self.assertIsNone(window.tracker.undo(grid))
+            window.on_stroke_end()
+            self.assertEqual(window.action, expected)
+            self.assertEqual(grid.render(0).tolist(), whole.render(0).tolist())
+            self.assertIs(window.tracker.undo(grid), window.action)
+            self.assertIsNone(window.tracker.undo(grid))
+            self.assertFalse(grid.render(0, (0, 0, 0)).any())
+
+        # A stroke that paints nothing is not recorded.
+        window.on_stroke_start(red)
+        window.on_stroke_end()
+        self.assertIsNone(window.tracker.undo(grid))
@@ -3,7 +3,7 @@ from ed_utils.decorators import number
 
 from action import PaintAction, PaintStep
 from undo import UndoTracker
-from layers import green, red, blue
+from layers import green, red, blue, lighten
 from grid import Grid
 
 class TestUndo(unittest.TestCase):
@@ -65,6 +65,54 @@ class TestUndo(unittest.TestCase):
         action = undo.undo(grid)
         self.assertEqual(action, None)
 
+    @number("4.2")
+    def test_unbounded(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        undo = UndoTracker()
+        actions = [PaintAction([PaintStep((i % 10, i // 10 % 10), green)]) for i in range(12000)]
+        for action in actions:
+            action.redo_apply(grid)
+            undo.add_action(action)
+        self.assertEqual(undo.stats().undo_depth, 12000)
+        self.assertIs(undo.undo(grid), actions[-1])
+        self.assertIs(undo.redo(grid), actions[-1])
+        self.assertEqual(undo.stats().evictions, 0)
+
+    @number("4.3")
+    def test_memory_budget(self):
+        grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        control_grid = Grid(Grid.DRAW_STYLE_ADD, 10, 10)
+        layers = [red] * 20 + [lighten] * 20 + [blue] * 20
+        actions = [PaintAction([PaintStep((i % 10, i % 7), layer), PaintStep((i % 3, 9), layer)]) for i, layer in enumerate(layers)]
+        budget = sum(action.nbytes() for action in actions) // 4
+        undo = UndoTracker(budget)
+        for action in actions:
+            action.redo_apply(grid)
+            action.redo_apply(control_grid)
+            undo.add_action(action)
+        stats = undo.stats()
+        self.assertLessEqual(stats.bytes_held, budget)
+        self.assertGreater(stats.merges, 0)
+        self.assertEqual(stats.bytes_held, sum(action.nbytes() for action in undo.undo_stack))
+        # The actions given to the tracker are left as they were.
+        self.assertEqual(len(actions[0].steps), 2)
+
+        # Undoing everything held undoes every step it still holds, merged or not.
+        held = [step for action in undo.undo_stack for step in action.steps]
+        while undo.undo(grid) is not None:
+            pass
+        for step in reversed(held):
+            step.undo_apply(control_grid)
+        self.assertGridEqual(grid, control_grid)
+        self.assertEqual(undo.stats().redo_depth, stats.undo_depth)
+
+        # A big new action drops redo actions, but is itself kept.
+        big = PaintAction([PaintStep((x, y), green) for x in range(10) for y in range(10)] * 20)
+        undo.add_action(big)
+        self.assertEqual(undo.stats().undo_depth, 1)
+        self.assertEqual(undo.stats().redo_depth, 0)
+        self.assertIs(undo.undo(grid), big)
+
     def assertGridEqual(self, grid1: Grid, grid2: Grid):
         for x in range(len(grid1.grid)):
             for y in range(len(grid1[x])):
@@ -1,33 +1,143 @@
 from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass
 from action import PaintAction
 from grid import Grid
-from data_structures.stack_adt import ArrayStack
+
+@dataclass
+class UndoStats:
+    """
+    How much history an UndoTracker holds, and how much it has had to give up.
+    - undo_depth, redo_depth: actions that can be undone and redone
+    - bytes_held: the bytes of every action held, as given by PaintAction.nbytes
+    - evictions: oldest actions dropped to keep under the budget
+    - merges: pairs of oldest actions merged into one to keep under the budget
+    """
+    undo_depth: int
+    redo_depth: int
+    bytes_held: int
+    evictions: int
+    merges: int
+
+def can_merge(older: PaintAction, newer: PaintAction) -> bool:
+    """
+    True if two actions next to each other in the history can be undone as one:
+    both paint, and with the same single layer.
+    complexity- O(1)
+    """
+    return (
+        not older.is_special and not newer.is_special
+        and len(older.layers) == 1 and len(newer.layers) == 1
+        and older.layers[0] is newer.layers[0]
+    )
 
 class UndoTracker:
-    def __init__(self) -> None: 
+
+    # Bytes of history kept by default, a few hundred thousand brush strokes.
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
         """
-        inititalising where actions are stored for undo and redo by creating stacks
+        inititalising where actions are stored for undo and redo.
+        there is no limit on the number of actions, only on the bytes they hold, once the actions
+        are over max_bytes the oldest ones are merged or dropped.
+        arguments-
+         max_bytes: the memory budget of the history in bytes, of type int
         best and worst case complexity = O(1) all of the items are assigments
         """
         #worst complexity = O(1)
-        self.redo_stack = ArrayStack(10000)# creatinig an empty arraystack for redo
+        self.max_bytes = max_bytes
+        #worst complexity = O(1)
+        self.undo_stack: deque[PaintAction] = deque() #the right end is the top, the left end the oldest action
+        #worst complexity = O(1)
+        self.redo_stack: deque[PaintAction] = deque() #the right end is the top
+        #worst complexity = O(1)
+        self.bytes_held = 0
+        #worst complexity = O(1)
+        self.evictions = 0
         #worst complexity = O(1)
-        self.undo_stack = ArrayStack(10000)#creating an empty arraystack for undo
-        
+        self.merges = 0
+        #worst complexity = O(1)
+        self.merged: PaintAction | None = None #an action made by merging, held only here, so it can be extended in place
 
     def add_action(self, action: PaintAction) -> None:
         """
         Adds an action to the undo tracker.
-
-        If your collection is already full,
-        feel free to exit early and not add the action.
-        arguments= 
+        If the history is then over its memory budget, the oldest actions are compacted.
+        arguments=
          action: is an object of painaction with steps of type painstep
-        complexity best and worst = O(1)
+        complexity best = O(1) when the history is under budget
+        complexity worst = O(compact), which is O(1) amortised over the steps added
         """
         #worst complexity = O(1)
-        self.undo_stack.push(action)#paintaction is pushed into undo stack 
-        
+        self.undo_stack.append(action) #paintaction is pushed onto the undo stack
+        #worst complexity = O(1)
+        self.bytes_held += action.nbytes()
+        #worst complexity = O(compact)
+        self.compact()
+
+    def compact(self) -> None:
+        """
+        Brings the history under its memory budget, working from the oldest action.
+        The oldest two actions are merged into one if they paint the same single layer, which frees the bytes
+        of one action while keeping every step undoable. Otherwise the oldest action is dropped.
+        Once the undo stack is down to its newest action, the redo actions furthest from being redone are dropped,
+        the newest action itself is always kept so the last thing done can be undone.
+        complexity best = O(1) when the history is under budget
+        complexity worst = O(n + s) where n is the number of actions held and s the steps of the actions merged
+        """
+        #worst complexity = O(n + s)
+        while self.bytes_held > self.max_bytes:
+            #worst complexity = O(1)
+            if len(self.undo_stack) > 1:
+                #worst complexity = O(1)
+                oldest = self.undo_stack.popleft()
+                #worst complexity = O(1)
+                if can_merge(oldest, self.undo_stack[0]):
+                    #worst complexity = O(s)
+                    self.undo_stack[0] = self.merge(oldest, self.undo_stack[0])
+                    #worst complexity = O(1)
+                    self.merges += 1
+                else:
+                    #worst complexity = O(1)
+                    self.bytes_held -= oldest.nbytes()
+                    #worst complexity = O(1)
+                    self.evictions += 1
+            elif len(self.redo_stack) > 0:
+                #worst complexity = O(1)
+                self.bytes_held -= self.redo_stack.popleft().nbytes() #the first action undone is the last that would be redone
+                #worst complexity = O(1)
+                self.evictions += 1
+            else:
+                #worst complexity = O(1)
+                return
+
+    def merge(self, older: PaintAction, newer: PaintAction) -> PaintAction:
+        """
+        One action with the steps of older followed by those of newer, keeping bytes_held up to date.
+        The actions given to add_action may be held elsewhere too (the replay keeps them), so they are copied
+        the first time they are merged, an action this tracker made is extended in place.
+        arguments-
+         older, newer: actions next to each other in the undo stack, of type PaintAction
+        return: the merged action of type PaintAction
+        complexity best and worst = O(s) where s is the number of steps copied
+        """
+        #worst complexity = O(1)
+        self.bytes_held -= older.nbytes() + newer.nbytes()
+        #worst complexity = O(1)
+        if older is not self.merged:
+            #worst complexity = O(steps in older)
+            merged = PaintAction()
+            merged.extend(older)
+            older = merged
+        #worst complexity = O(steps in newer)
+        older.extend(newer)
+        #worst complexity = O(1)
+        self.merged = older
+        #worst complexity = O(1)
+        self.bytes_held += older.nbytes()
+        #worst complexity = O(1)
+        return older
 
     def undo(self, grid: Grid) -> PaintAction|None:
         """
@@ -40,18 +150,22 @@ class UndoTracker:
         best complexity = O(1) where the undostack is empty
         """
         #worst complexity = O(1)
-        if len (self.undo_stack)>0:  #check if undo stack is empty 
+        if len (self.undo_stack)>0:  #check if undo stack is empty
             #worst complexity = O(1)
             action = self.undo_stack.pop()#paintaction is removed from undo stack
             #worst complexity = O(1)
-            self.redo_stack.push(action) #paintaction is added to redo stack
+            if action is self.merged:
+                #worst complexity = O(1)
+                self.merged = None #it is handed out now, so it is no longer only held here
+            #worst complexity = O(1)
+            self.redo_stack.append(action) #paintaction is added to redo stack
             #worst complexity = O(undo_apply)
             action.undo_apply(grid) #this removes the item we are undoing from the grid object
             #worst complexity = O(1)
             return action
         #worst complexity = O(1)
-        return None #if undo stack is empty 
-        
+        return None #if undo stack is empty
+
     def redo(self, grid: Grid) -> PaintAction|None:
         """
         Redo an operation that was previously undone.
@@ -64,11 +178,20 @@ class UndoTracker:
         """
         #worst complexity = O(1)
         if len (self.redo_stack)>0:  #check if redo stack is empty
-            #worst complexity = O(1) 
+            #worst complexity = O(1)
             item = self.redo_stack.pop()#paintaction is removed from redo stack
             #worst complexity = O(1)
-            self.undo_stack.push(item) #paintaction is added to undo stack
+            self.undo_stack.append(item) #paintaction is added to undo stack
             #worst complexity = O(redo_apply)
             item.redo_apply(grid) #this adds the item we are redoing to the grid object
-            return grid 
-        return None #if redo stack is empty     
\ No newline at end of file
+            #worst complexity = O(1)
+            return item
+        return None #if redo stack is empty
+
+    def stats(self) -> UndoStats:
+        """
+        The depth of the history, the bytes it holds, and how many actions were dropped or merged to keep it under budget.
+        complexity best and worst = O(1)
+        """
+        #worst complexity = O(1)
+        return UndoStats(len(self.undo_stack), len(self.redo_stack), self.bytes_held, self.evictions, self.merges)